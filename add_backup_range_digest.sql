@@ -0,0 +1,58 @@
+-- Yedek doğrulama için anahtar aralığı özeti (python backup_database.py verify).
+-- [p_lo, p_hi) tamsayı anahtar aralığını p_buckets eşit parçaya böler; her parça için
+-- satır sayısı ve sıradan bağımsız özet (satır md5'lerinin ilk 60 bitinin toplamı,
+-- mod 2^60) döndürür. Satır metni: sütun adına göre (C sıralı) "ad=değer" parçaları,
+-- chr(1) ile birleştirilir; NULL için "ad" + chr(2), sayılar float8 metni olarak.
+-- Python tarafı aynı özeti yedek dosyalarından hesaplar, yalnızca farklı aralıklara iner.
+-- Yalnızca Service Role çağırabilir.
+-- Supabase SQL Editor'da çalıştırın.
+
+CREATE OR REPLACE FUNCTION backup_range_digest(
+  p_table text,
+  p_key text,
+  p_lo bigint,
+  p_hi bigint,
+  p_buckets integer DEFAULT 16
+)
+RETURNS TABLE (bucket integer, row_count bigint, digest text)
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+BEGIN
+  IF p_buckets < 1 OR p_hi <= p_lo THEN
+    RAISE EXCEPTION 'Geçersiz aralık: [%, %) / %', p_lo, p_hi, p_buckets;
+  END IF;
+
+  RETURN QUERY EXECUTE format($q$
+    SELECT
+      ((t.%1$I::bigint - $1) * $3 / ($2 - $1))::integer AS bucket,
+      COUNT(*)::bigint AS row_count,
+      (SUM(('x' || substr(md5(r.canon), 1, 15))::bit(60)::bigint::numeric)
+        %% 1152921504606846976)::text AS digest
+    FROM %2$I t
+    CROSS JOIN LATERAL (
+      SELECT string_agg(
+        e.key || CASE
+          WHEN jsonb_typeof(e.value) = 'null' THEN chr(2)
+          WHEN jsonb_typeof(e.value) = 'number' THEN '=' || (e.value::text)::float8::text
+          WHEN jsonb_typeof(e.value) = 'string' THEN '=' || (e.value #>> '{}')
+          ELSE '=' || e.value::text
+        END,
+        chr(1) ORDER BY e.key COLLATE "C"
+      ) AS canon
+      FROM jsonb_each(to_jsonb(t)) e
+    ) r
+    WHERE t.%1$I >= $1 AND t.%1$I < $2
+    GROUP BY 1
+  $q$, p_key, p_table)
+  USING p_lo, p_hi, p_buckets;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION backup_range_digest(text, text, bigint, bigint, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION backup_range_digest(text, text, bigint, bigint, integer) TO service_role;
+
+COMMENT ON FUNCTION backup_range_digest(text, text, bigint, bigint, integer)
+  IS 'Yedek doğrulama: anahtar aralığı parçaları için satır sayısı ve sıradan bağımsız özet';
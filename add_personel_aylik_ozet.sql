@@ -0,0 +1,112 @@
+-- Personel günlük / aylık çalışma özeti tabloları.
+-- Python tarafındaki özet işi (src/payroll.py) personel_giris_cikis_duzenli'den
+-- hesaplayıp yazar; Maaş Hesabı ekranı ham çiftler yerine bu satırları okur.
+-- Ay, ekrandaki gibi giris_tarihi'nin ayıdır (ayın ilk günü olarak tutulur).
+-- Düzenli tablodaki her ekleme, güncelleme ve silme (admin düzeltmeleri dahil)
+-- ilgili ayı personel_aylik_ozet_kirli'de işaretler; payroll.py işaretli ayları
+-- yeniden hesaplar, ekran işaretli ayda özet yerine düzenli kayıtları toplar.
+-- Tekrar çalıştırılabilir. Supabase SQL Editor'da çalıştırın.
+
+CREATE TABLE IF NOT EXISTS personel_gunluk_ozet (
+  kullanici_id integer NOT NULL,
+  gun date NOT NULL,
+  ay date NOT NULL,
+  toplam_saat numeric(10, 4) NOT NULL DEFAULT 0,
+  kayit_sayisi integer NOT NULL DEFAULT 0,
+  acik_vardiya integer NOT NULL DEFAULT 0,
+  hesaplama_zamani timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (kullanici_id, ay, gun)
+);
+
+CREATE INDEX IF NOT EXISTS personel_gunluk_ozet_ay_idx ON personel_gunluk_ozet (ay);
+
+CREATE TABLE IF NOT EXISTS personel_aylik_ozet (
+  kullanici_id integer NOT NULL,
+  ay date NOT NULL,
+  toplam_saat numeric(10, 4) NOT NULL DEFAULT 0,
+  calisilan_gun integer NOT NULL DEFAULT 0,
+  acik_vardiya integer NOT NULL DEFAULT 0,
+  kayit_sayisi integer NOT NULL DEFAULT 0,
+  hesaplama_zamani timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (kullanici_id, ay)
+);
+
+CREATE INDEX IF NOT EXISTS personel_aylik_ozet_ay_idx ON personel_aylik_ozet (ay);
+
+-- Özeti güncel olmayan aylar; surum her değişiklikte artar. payroll.py yazdığı ayın
+-- satırını okuduğu sürümle siler, hesaplama sırasında gelen değişiklik işaretli kalır.
+CREATE TABLE IF NOT EXISTS personel_aylik_ozet_kirli (
+  ay date PRIMARY KEY,
+  surum bigint NOT NULL DEFAULT 1,
+  degisiklik_zamani timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION personel_aylik_ozet_kirlet()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    INSERT INTO personel_aylik_ozet_kirli AS k (ay)
+    SELECT DISTINCT date_trunc('month', giris_tarihi)::date FROM yeni WHERE giris_tarihi IS NOT NULL
+    ON CONFLICT (ay) DO UPDATE SET surum = k.surum + 1, degisiklik_zamani = now();
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    INSERT INTO personel_aylik_ozet_kirli AS k (ay)
+    SELECT DISTINCT date_trunc('month', giris_tarihi)::date FROM eski WHERE giris_tarihi IS NOT NULL
+    ON CONFLICT (ay) DO UPDATE SET surum = k.surum + 1, degisiklik_zamani = now();
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Satır başına değil, komut başına bir kez çalışır (toplu insert'te tek upsert)
+DROP TRIGGER IF EXISTS personel_aylik_ozet_kirli_ekle ON personel_giris_cikis_duzenli;
+CREATE TRIGGER personel_aylik_ozet_kirli_ekle
+  AFTER INSERT ON personel_giris_cikis_duzenli
+  REFERENCING NEW TABLE AS yeni
+  FOR EACH STATEMENT EXECUTE FUNCTION personel_aylik_ozet_kirlet();
+
+DROP TRIGGER IF EXISTS personel_aylik_ozet_kirli_guncelle ON personel_giris_cikis_duzenli;
+CREATE TRIGGER personel_aylik_ozet_kirli_guncelle
+  AFTER UPDATE ON personel_giris_cikis_duzenli
+  REFERENCING OLD TABLE AS eski NEW TABLE AS yeni
+  FOR EACH STATEMENT EXECUTE FUNCTION personel_aylik_ozet_kirlet();
+
+DROP TRIGGER IF EXISTS personel_aylik_ozet_kirli_sil ON personel_giris_cikis_duzenli;
+CREATE TRIGGER personel_aylik_ozet_kirli_sil
+  AFTER DELETE ON personel_giris_cikis_duzenli
+  REFERENCING OLD TABLE AS eski
+  FOR EACH STATEMENT EXECUTE FUNCTION personel_aylik_ozet_kirlet();
+
+-- Trigger kurulmadan önce yapılan düzeltmeler için mevcut tüm aylar bir kez işaretlenir
+INSERT INTO personel_aylik_ozet_kirli (ay)
+SELECT DISTINCT ay FROM personel_aylik_ozet
+ON CONFLICT (ay) DO NOTHING;
+
+ALTER TABLE personel_gunluk_ozet ENABLE ROW LEVEL SECURITY;
+ALTER TABLE personel_aylik_ozet ENABLE ROW LEVEL SECURITY;
+ALTER TABLE personel_aylik_ozet_kirli ENABLE ROW LEVEL SECURITY;
+
+-- Yazma yalnızca Service Role (sync) ile; oturum açmış kullanıcılar okuyabilir
+DROP POLICY IF EXISTS personel_gunluk_ozet_select ON personel_gunluk_ozet;
+CREATE POLICY personel_gunluk_ozet_select ON personel_gunluk_ozet
+  FOR SELECT TO authenticated USING (true);
+
+DROP POLICY IF EXISTS personel_aylik_ozet_select ON personel_aylik_ozet;
+CREATE POLICY personel_aylik_ozet_select ON personel_aylik_ozet
+  FOR SELECT TO authenticated USING (true);
+
+DROP POLICY IF EXISTS personel_aylik_ozet_kirli_select ON personel_aylik_ozet_kirli;
+CREATE POLICY personel_aylik_ozet_kirli_select ON personel_aylik_ozet_kirli
+  FOR SELECT TO authenticated USING (true);
+
+COMMENT ON TABLE personel_gunluk_ozet IS 'Personel başına iş günü toplamları (src/payroll.py yazar)';
+COMMENT ON TABLE personel_aylik_ozet IS 'Personel başına aylık çalışma saati, gün ve açık vardiya (src/payroll.py yazar)';
+COMMENT ON COLUMN personel_gunluk_ozet.gun IS 'workday_date, yoksa giris_tarihi günü';
+COMMENT ON COLUMN personel_aylik_ozet.toplam_saat IS 'Çıkışı olan çiftlerin (cikis - giris) toplamı, saat';
+COMMENT ON COLUMN personel_aylik_ozet.calisilan_gun IS 'Kaydı olan farklı iş günü sayısı (açık vardiyalar dahil)';
+COMMENT ON COLUMN personel_aylik_ozet.acik_vardiya IS 'Çıkışı olmayan çift sayısı';
+COMMENT ON TABLE personel_aylik_ozet_kirli IS 'Düzenli kayıtları değişmiş, özeti yeniden hesaplanacak aylar (trigger yazar, src/payroll.py siler)';
@@ -0,0 +1,88 @@
+-- Personel yıllık çalışma günü özeti.
+-- get_personel_leave_summary her çağrıda düzenli kayıtları taramak yerine bu
+-- tablodaki sayıları toplar. Sync tarafı (src/rollup.py) değişen personel/yıl
+-- satırlarını günceller; ilk kurulumda bir kez çalıştırın:
+--   python -m src.rollup --rebuild
+-- Ardından update_get_personel_leave_summary.sql'i çalıştırın.
+-- Düzenli tablodaki her ekleme, güncelleme ve silme (admin düzeltmeleri dahil)
+-- ilgili personel/yılı personel_yillik_calisma_kirli'de işaretler; sync döngüsü
+-- (SYNC_WORKDAY_ROLLUP=true) ya da python -m src.rollup işaretli satırları yeniden sayar.
+-- Tekrar çalıştırılabilir. Supabase SQL Editor'da çalıştırın.
+
+CREATE TABLE IF NOT EXISTS personel_yillik_calisma (
+  kullanici_id integer NOT NULL,
+  yil integer NOT NULL,
+  calisilan_gun integer NOT NULL DEFAULT 0 CHECK (calisilan_gun >= 0),
+  hesaplama_zamani timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (kullanici_id, yil)
+);
+
+-- Sayısı güncel olmayan personel/yıl satırları; surum her değişiklikte artar.
+-- rollup.py yazdığı satırın işaretini okuduğu sürümle siler.
+CREATE TABLE IF NOT EXISTS personel_yillik_calisma_kirli (
+  kullanici_id integer NOT NULL,
+  yil integer NOT NULL,
+  surum bigint NOT NULL DEFAULT 1,
+  degisiklik_zamani timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (kullanici_id, yil)
+);
+
+CREATE OR REPLACE FUNCTION personel_yillik_calisma_kirlet()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP <> 'DELETE' THEN
+    INSERT INTO personel_yillik_calisma_kirli AS k (kullanici_id, yil)
+    SELECT DISTINCT kullanici_id, EXTRACT(YEAR FROM COALESCE(workday_date, giris_tarihi::date))::integer
+    FROM yeni WHERE kullanici_id IS NOT NULL AND COALESCE(workday_date, giris_tarihi::date) IS NOT NULL
+    ON CONFLICT (kullanici_id, yil) DO UPDATE SET surum = k.surum + 1, degisiklik_zamani = now();
+  END IF;
+  IF TG_OP <> 'INSERT' THEN
+    INSERT INTO personel_yillik_calisma_kirli AS k (kullanici_id, yil)
+    SELECT DISTINCT kullanici_id, EXTRACT(YEAR FROM COALESCE(workday_date, giris_tarihi::date))::integer
+    FROM eski WHERE kullanici_id IS NOT NULL AND COALESCE(workday_date, giris_tarihi::date) IS NOT NULL
+    ON CONFLICT (kullanici_id, yil) DO UPDATE SET surum = k.surum + 1, degisiklik_zamani = now();
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Satır başına değil, komut başına bir kez çalışır (toplu insert'te tek upsert)
+DROP TRIGGER IF EXISTS personel_yillik_calisma_kirli_ekle ON personel_giris_cikis_duzenli;
+CREATE TRIGGER personel_yillik_calisma_kirli_ekle
+  AFTER INSERT ON personel_giris_cikis_duzenli
+  REFERENCING NEW TABLE AS yeni
+  FOR EACH STATEMENT EXECUTE FUNCTION personel_yillik_calisma_kirlet();
+
+DROP TRIGGER IF EXISTS personel_yillik_calisma_kirli_guncelle ON personel_giris_cikis_duzenli;
+CREATE TRIGGER personel_yillik_calisma_kirli_guncelle
+  AFTER UPDATE ON personel_giris_cikis_duzenli
+  REFERENCING OLD TABLE AS eski NEW TABLE AS yeni
+  FOR EACH STATEMENT EXECUTE FUNCTION personel_yillik_calisma_kirlet();
+
+DROP TRIGGER IF EXISTS personel_yillik_calisma_kirli_sil ON personel_giris_cikis_duzenli;
+CREATE TRIGGER personel_yillik_calisma_kirli_sil
+  AFTER DELETE ON personel_giris_cikis_duzenli
+  REFERENCING OLD TABLE AS eski
+  FOR EACH STATEMENT EXECUTE FUNCTION personel_yillik_calisma_kirlet();
+
+-- Trigger kurulmadan önce yapılan düzeltmeler için mevcut tüm satırlar bir kez işaretlenir
+INSERT INTO personel_yillik_calisma_kirli (kullanici_id, yil)
+SELECT kullanici_id, yil FROM personel_yillik_calisma
+ON CONFLICT (kullanici_id, yil) DO NOTHING;
+
+ALTER TABLE personel_yillik_calisma ENABLE ROW LEVEL SECURITY;
+ALTER TABLE personel_yillik_calisma_kirli ENABLE ROW LEVEL SECURITY;
+
+-- RPC SECURITY INVOKER olduğu için oturum açmış kullanıcılar okuyabilmeli;
+-- yazma yalnızca Service Role (sync) ile
+DROP POLICY IF EXISTS personel_yillik_calisma_select ON personel_yillik_calisma;
+CREATE POLICY personel_yillik_calisma_select ON personel_yillik_calisma
+  FOR SELECT TO authenticated USING (true);
+
+COMMENT ON TABLE personel_yillik_calisma IS 'Personel başına yıl bazında çalışılan gün sayısı (src/rollup.py yazar)';
+COMMENT ON COLUMN personel_yillik_calisma.calisilan_gun IS 'COALESCE(workday_date, giris_tarihi günü) farklı gün sayısı';
+COMMENT ON TABLE personel_yillik_calisma_kirli IS 'Düzenli kayıtları değişmiş, yeniden sayılacak personel/yıl satırları (trigger yazar, src/rollup.py siler)';
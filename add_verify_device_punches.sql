@@ -0,0 +1,44 @@
+-- Cihaz temizleme öncesi doğrulama (src/clearing.py).
+-- Cihaz dökümündeki (kullanici_id, giris_tarihi) anahtarlarından kaçının
+-- personel_giris_cikis'te bulunduğunu tek sorguda sayar; eksiklerden ilk 20'sini döndürür.
+-- Eksik varsa cihaz temizlenmez. Yalnızca Service Role çağırabilir.
+-- Supabase SQL Editor'da çalıştırın.
+
+CREATE OR REPLACE FUNCTION verify_device_punches(
+  p_kullanici_ids bigint[],
+  p_zamanlar timestamp[]
+)
+RETURNS TABLE (toplam bigint, bulunan bigint, eksik jsonb)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  WITH anahtar AS (
+    SELECT DISTINCT k.kullanici_id, k.giris_tarihi
+    FROM unnest(p_kullanici_ids, p_zamanlar) AS k(kullanici_id, giris_tarihi)
+  ),
+  sonuc AS (
+    SELECT a.kullanici_id, a.giris_tarihi,
+           EXISTS (
+             SELECT 1 FROM personel_giris_cikis p
+             WHERE p.kullanici_id = a.kullanici_id AND p.giris_tarihi = a.giris_tarihi
+           ) AS var
+    FROM anahtar a
+  )
+  SELECT
+    COUNT(*)::bigint,
+    COUNT(*) FILTER (WHERE var)::bigint,
+    COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('kullanici_id', e.kullanici_id, 'giris_tarihi', e.giris_tarihi)
+                       ORDER BY e.giris_tarihi)
+      FROM (SELECT * FROM sonuc WHERE NOT var ORDER BY giris_tarihi LIMIT 20) e
+    ), '[]'::jsonb)
+  FROM sonuc;
+$$;
+
+REVOKE ALL ON FUNCTION verify_device_punches(bigint[], timestamp[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION verify_device_punches(bigint[], timestamp[]) TO service_role;
+
+COMMENT ON FUNCTION verify_device_punches(bigint[], timestamp[])
+  IS 'Cihaz temizleme öncesi: döküm anahtarlarının ham tabloda bulunma sayısı';
@@ -1,8 +1,17 @@
 import os
 import json
 import csv
+import gzip
+import hashlib
+import itertools
+import bisect
+import queue
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from supabase import create_client, Client
 
 # .env dosyasını yükle
 try:
@@ -11,128 +20,977 @@ try:
 except ImportError:
     print("⚠️ python-dotenv yüklü değil. Environment değişkenlerini manuel olarak ayarlayın.")
 
-# Supabase bağlantı bilgileri
-SUPABASE_URL = os.getenv('SUPABASE_URL') or os.getenv('REACT_APP_SUPABASE_URL')
-SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
+# Supabase istemcisi ilk kullanımda oluşturulur ve paralel okumalarda paylaşılır
+from src.db import get_client
+
+# Yedeklenecek tablolar
+tables_to_backup = [
+    'personel',
+    'personel_giris_cikis',
+    'personel_giris_cikis_duzenli',
+    'maas_ayarlari',
+    'kullanici_profilleri',
+    'admin_users',
+    'hata_bildirimleri'
+]
+
+# Keyset sayfalama için birincil anahtarlar (belirtilmeyenler 'id')
+PRIMARY_KEYS = {
+    'personel': 'kullanici_id',
+    'admin_users': 'user_id',
+}
+
+# Geri yükleme sırası: personel, ona bağlı tablolardan önce gelmeli
+RESTORE_ORDER = [
+    'personel',
+    'maas_ayarlari',
+    'personel_giris_cikis',
+    'personel_giris_cikis_duzenli',
+    'kullanici_profilleri',
+    'admin_users',
+    'hata_bildirimleri',
+]
+
+# Artımlı yedek için tablo başına değişim sütunu (watermark).
+# personel_giris_cikis yalnızca eklenir; updated_at olan tablolar güncellemeleri de yakalar.
+# Listede olmayan tablolar (güncellenen ama değişim sütunu olmayanlar) her yedekte tam alınır.
+WATERMARK_COLUMNS = {
+    'personel_giris_cikis': 'id',
+    'maas_ayarlari': 'updated_at',
+    'kullanici_profilleri': 'updated_at',
+}
+
+BACKUPS_ROOT = 'backups'
+PAGE_SIZE = int(os.getenv('BACKUP_PAGE_SIZE', '1000'))
+RESTORE_CHUNK_SIZE = int(os.getenv('RESTORE_CHUNK_SIZE', '500'))
+MANIFEST_NAME = 'manifest.json'
+CHECKPOINT_NAME = 'restore_checkpoint.json'
+
+# Paralel yedekleme ayarları
+BACKUP_CONCURRENCY = int(os.getenv('BACKUP_CONCURRENCY', '1'))   # Aynı anda en fazla HTTP isteği
+BACKUP_STRIPES = int(os.getenv('BACKUP_STRIPES', '4'))           # Büyük tablolar için paralel anahtar aralığı
+BACKUP_PREFETCH = int(os.getenv('BACKUP_PREFETCH', '2'))         # Aralık başına önden okunan sayfa
+BACKUP_RETRIES = int(os.getenv('BACKUP_RETRIES', '3'))
+BACKUP_RETRY_DELAY = float(os.getenv('BACKUP_RETRY_DELAY', '1.0'))
+# chunks: içerik adresli, tekilleştirilmiş parça deposu; stream: tablo başına CSV + NDJSON
+BACKUP_FORMAT = os.getenv('BACKUP_FORMAT', 'chunks')
+CHUNKS_DIR_NAME = 'chunks'
+BACKUP_CHUNK_KEYS = int(os.getenv('BACKUP_CHUNK_KEYS', '2000'))   # Parça başına anahtar aralığı
+# Çalışan bir yedeğin henüz manifest'e yazılmamış parçaları silinmesin
+BACKUP_GC_GRACE_SECONDS = int(os.getenv('BACKUP_GC_GRACE_SECONDS', '3600'))
+# Doğrulama: aralık başına alt parça sayısı ve satır satır karşılaştırılan en büyük aralık
+VERIFY_FANOUT = int(os.getenv('VERIFY_FANOUT', '16'))
+VERIFY_LEAF_ROWS = int(os.getenv('VERIFY_LEAF_ROWS', '500'))
+VERIFY_REPORT_LIMIT = 20
+DIGEST_MOD = 1 << 60
+
+def primary_key(table):
+    return PRIMARY_KEYS.get(table, 'id')
+
+def with_retry(fn, retries=BACKUP_RETRIES, base_delay=BACKUP_RETRY_DELAY, limiter=None):
+    """fn()'i üstel bekleme ile yeniden dene; limiter verilirse eşzamanlı istek sayısını sınırlar"""
+    attempt = 0
+    while True:
+        try:
+            if limiter is None:
+                return fn()
+            with limiter:
+                return fn()
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            print(f"🔁 İstek hatası ({e}), {delay:.1f} sn sonra tekrar denenecek ({attempt}/{retries})")
+            time.sleep(delay)
+
+def iter_table_pages(supabase, table, page_size=PAGE_SIZE, lower=None, upper=None, limiter=None,
+                     since=None):
+    """Tabloyu birincil anahtara göre keyset sayfalama ile sayfa sayfa oku.
+    PostgREST'in max-rows sınırı sayfayı kısaltabileceği için boş sayfa gelene kadar devam eder.
+    lower (dahil) / upper (hariç) verilirse yalnızca o anahtar aralığı okunur.
+    since=(sütun, değer) verilirse yalnızca watermark'tan sonraki satırlar okunur.
+    """
+    pk = primary_key(table)
+    last = None
+    since_column, since_value = since or (None, None)
+    if since_column == pk and since_value is not None and (lower is None or lower <= since_value):
+        # Watermark birincil anahtarsa keyset başlangıcı olarak kullanılır
+        last = since_value
+    while True:
+        query = supabase.table(table).select('*').order(pk).limit(page_size)
+        if last is not None:
+            query = query.gt(pk, last)
+        elif lower is not None:
+            query = query.gte(pk, lower)
+        if upper is not None:
+            query = query.lt(pk, upper)
+        if since_column and since_column != pk and since_value is not None:
+            # Aynı zaman damgasıyla sonradan yazılan satırları kaçırmamak için dahil
+            query = query.gte(since_column, since_value)
+        rows = with_retry(query.execute, limiter=limiter).data or []
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][pk]
+
+def _key_bounds(supabase, table, limiter=None):
+    """Tam sayı birincil anahtarın (min, max) değerleri; sayı değilse None"""
+    pk = primary_key(table)
+    bounds = []
+    for desc in (False, True):
+        query = supabase.table(table).select(pk).order(pk, desc=desc).limit(1)
+        rows = with_retry(query.execute, limiter=limiter).data or []
+        if not rows or not isinstance(rows[0][pk], int):
+            return None
+        bounds.append(rows[0][pk])
+    return tuple(bounds)
+
+def iter_table_pages_parallel(supabase, table, page_size=PAGE_SIZE, stripes=BACKUP_STRIPES,
+                              prefetch=BACKUP_PREFETCH, limiter=None, since=None):
+    """Büyük tabloyu anahtar aralıklarına bölüp aralıkları paralel oku.
+    Sayfalar yine anahtar sırasıyla döner; her aralık en fazla `prefetch` sayfa önden okur.
+    """
+    bounds = _key_bounds(supabase, table, limiter) if stripes > 1 else None
+    if not bounds or bounds[1] - bounds[0] < page_size * stripes:
+        yield from iter_table_pages(supabase, table, page_size, limiter=limiter, since=since)
+        return
+
+    lo, hi = bounds
+    step = (hi - lo) // stripes + 1
+    edges = [lo + i * step for i in range(stripes)] + [hi + 1]
+    queues = [queue.Queue(maxsize=max(1, prefetch)) for _ in range(stripes)]
+    stop = threading.Event()
+    done = object()
+
+    def worker(i):
+        q = queues[i]
+        try:
+            for page in iter_table_pages(supabase, table, page_size, edges[i], edges[i + 1], limiter, since):
+                while not stop.is_set():
+                    try:
+                        q.put(page, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            q.put(done)
+        except Exception as e:
+            q.put(e)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(stripes)]
+    for t in threads:
+        t.start()
+    try:
+        for q in queues:
+            while True:
+                item = q.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        stop.set()
+
+def _open_text(path, use_gzip, encoding='utf-8'):
+    if use_gzip:
+        return gzip.open(path, 'wt', encoding=encoding, newline='')
+    return open(path, 'w', encoding=encoding, newline='')
+
+def _file_info(path, backup_dir):
+    """Dosyanın sha256 özeti ve boyutu (parça parça okunur)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return {
+        'path': os.path.relpath(path, backup_dir).replace(os.sep, '/'),
+        'sha256': digest.hexdigest(),
+        'bytes': os.path.getsize(path),
+    }
+
+def export_table(supabase, table, backup_dir, use_gzip=False, page_size=PAGE_SIZE, pages=None,
+                 watermark_column=None):
+    """Tabloyu CSV ve NDJSON olarak akış halinde yaz, manifest girdisini döndür.
+    watermark_column verilirse yazılan satırlardaki en büyük değer 'watermark' olarak döner.
+    """
+    if pages is None:
+        pages = iter_table_pages(supabase, table, page_size)
+    started = time.monotonic()
+    suffix = '.gz' if use_gzip else ''
+    csv_path = f"{backup_dir}/{table}.csv{suffix}"
+    ndjson_path = f"{backup_dir}/{table}.ndjson{suffix}"
+
+    rows = 0
+    watermark = None
+    with _open_text(csv_path, use_gzip, encoding='utf-8-sig') as csvfile, \
+            _open_text(ndjson_path, use_gzip) as jsonfile:
+        writer = None
+        for page in pages:
+            if writer is None:
+                writer = csv.DictWriter(csvfile, fieldnames=list(page[0].keys()), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerows(page)
+            for record in page:
+                jsonfile.write(json.dumps(record, ensure_ascii=False, default=str))
+                jsonfile.write('\n')
+            rows += len(page)
+            if watermark_column:
+                values = [r[watermark_column] for r in page if r.get(watermark_column) is not None]
+                if values and (watermark is None or max(values) > watermark):
+                    watermark = max(values)
+
+    seconds = time.monotonic() - started
+    return {
+        'rows': rows,
+        'primary_key': primary_key(table),
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+        'watermark': watermark,
+        'files': {
+            'csv': _file_info(csv_path, backup_dir),
+            'ndjson': _file_info(ndjson_path, backup_dir),
+        },
+    }
+
+def chunk_store_dir():
+    return os.path.join(BACKUPS_ROOT, CHUNKS_DIR_NAME)
+
+def _chunk_path(digest):
+    return os.path.join(chunk_store_dir(), digest[:2], f"{digest}.ndjson.gz")
+
+def _chunk_id(key):
+    """Tamsayı anahtarlarda sabit aralık numarası; anahtar eklenince diğer parçalar değişmez"""
+    if isinstance(key, int) and not isinstance(key, bool):
+        return key // BACKUP_CHUNK_KEYS
+    return 0
+
+def put_chunk(rows, pk):
+    """Satırları anahtar sırasıyla NDJSON'a çevirip içerik özetiyle depoya yaz.
+    Aynı içerik zaten varsa yeniden yazılmaz. Dönüş: (manifest girdisi, yeni mi)
+    """
+    rows.sort(key=lambda r: r[pk])
+    data = ''.join(json.dumps(r, ensure_ascii=False, default=str) + '\n' for r in rows).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    path = _chunk_path(digest)
+    new = not os.path.exists(path)
+    if new:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            # mtime=0: aynı içerik her zaman aynı bayt dizisi
+            f.write(gzip.compress(data, compresslevel=6, mtime=0))
+        os.replace(tmp_path, path)
+    else:
+        # Yeniden kullanılan parçanın GC bekleme süresi baştan başlasın
+        os.utime(path)
+    return {
+        'sha256': digest,
+        'rows': len(rows),
+        'first': rows[0][pk],
+        'last': rows[-1][pk],
+        'bytes': len(data),
+        'stored_bytes': os.path.getsize(path),
+    }, new
+
+def read_chunk(digest):
+    """Parçayı oku, içerik özetini doğrula, satırları döndür"""
+    with open(_chunk_path(digest), 'rb') as f:
+        data = gzip.decompress(f.read())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Bozuk yedek parçası: {digest}")
+    return [json.loads(line) for line in data.decode('utf-8').splitlines() if line.strip()]
+
+def export_table_chunks(supabase, table, page_size=PAGE_SIZE, pages=None, watermark_column=None):
+    """Tabloyu anahtar aralığı parçalarına bölüp içerik adresli depoya yaz, manifest girdisini döndür.
+    Değişmeyen aralıklar önceki yedeklerle aynı parçayı paylaşır (yalnızca bir kez saklanır).
+    """
+    if pages is None:
+        pages = iter_table_pages(supabase, table, page_size)
+    started = time.monotonic()
+    pk = primary_key(table)
+    buckets = {}
+    chunks = []
+    stats = {'rows': 0, 'new_chunks': 0, 'new_bytes': 0}
+    watermark = None
+
+    def flush(chunk_id):
+        info, new = put_chunk(buckets.pop(chunk_id), pk)
+        chunks.append(info)
+        if new:
+            stats['new_chunks'] += 1
+            stats['new_bytes'] += info['stored_bytes']
+
+    for page in pages:
+        for record in page:
+            chunk_id = _chunk_id(record.get(pk))
+            # Sayfalar anahtar sırasıyla gelir: daha küçük aralıklar tamamlanmıştır, beklemeden
+            # yazılır (anahtar boşluğu olan aralık da belleğe birikmez)
+            for done in [c for c in buckets if c < chunk_id]:
+                flush(done)
+            bucket = buckets.setdefault(chunk_id, [])
+            bucket.append(record)
+            if len(bucket) >= BACKUP_CHUNK_KEYS:
+                flush(chunk_id)
+        stats['rows'] += len(page)
+        if watermark_column:
+            values = [r[watermark_column] for r in page if r.get(watermark_column) is not None]
+            if values and (watermark is None or max(values) > watermark):
+                watermark = max(values)
+    for chunk_id in sorted(buckets):
+        flush(chunk_id)
+    chunks.sort(key=lambda c: c['first'])
+
+    seconds = time.monotonic() - started
+    return {
+        'rows': stats['rows'],
+        'primary_key': pk,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(stats['rows'] / seconds, 1) if seconds > 0 else None,
+        'watermark': watermark,
+        'chunks': chunks,
+        'new_chunks': stats['new_chunks'],
+        'new_bytes': stats['new_bytes'],
+    }
+
+def _has_rows_file(entry):
+    """Manifest girdisi okunabilir veri içeriyor mu (dosya ya da parça listesi)"""
+    return bool(entry) and (bool(entry.get('files')) or 'chunks' in entry)
+
+def write_manifest(backup_dir, manifest):
+    tmp_path = f"{backup_dir}/{MANIFEST_NAME}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, f"{backup_dir}/{MANIFEST_NAME}")
+
+def read_manifest(backup_dir):
+    path = f"{backup_dir}/{MANIFEST_NAME}"
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def list_backup_dirs():
+    """Yedek klasörleri, eskiden yeniye"""
+    if not os.path.exists(BACKUPS_ROOT):
+        return []
+    return sorted(d for d in os.listdir(BACKUPS_ROOT) if d.startswith('backup_'))
+
+def _parent_watermarks(parent_dir):
+    """Önceki yedekteki tablo watermark'ları {tablo: değer}"""
+    manifest = read_manifest(parent_dir) or {}
+    marks = {}
+    for table, entry in manifest.get('tables', {}).items():
+        watermark = entry.get('watermark')
+        if isinstance(watermark, dict) and watermark.get('value') is not None:
+            marks[table] = watermark['value']
+    return marks
+
+def create_backup(use_gzip=None, concurrency=None, incremental=False, backup_format=None):
+    """Database'in yedeğini al (sayfalı, akış halinde).
+    concurrency > 1 ise tablolar ve büyük tabloların anahtar aralıkları paralel okunur.
+    incremental=True ise WATERMARK_COLUMNS'taki tablolar için yalnızca son yedekten
+    sonraki satırlar alınır; yedek önceki yedeğe 'base' ile bağlanır (zincir).
+    backup_format='chunks' (varsayılan, BACKUP_FORMAT) ise satırlar backups/chunks/
+    altındaki içerik adresli parçalara yazılır ve yedek yalnızca bir manifest olur;
+    'stream' ise tablo başına CSV + NDJSON dosyaları yazılır.
+    """
+    kind = "artımlı" if incremental else "tam"
+    print(f"🗄️ Database yedeği alınıyor ({kind})...")
+
+    if use_gzip is None:
+        use_gzip = os.getenv('BACKUP_GZIP', 'false').lower() == 'true'
+    concurrency = max(1, concurrency or BACKUP_CONCURRENCY)
+    backup_format = backup_format or BACKUP_FORMAT
+    if backup_format not in ('chunks', 'stream'):
+        raise ValueError(f"Bilinmeyen yedek formatı: {backup_format}")
+
+    supabase = get_client()
+
+    parent = None
+    parent_marks = {}
+    if incremental:
+        candidates = [d for d in list_backup_dirs() if read_manifest(f"{BACKUPS_ROOT}/{d}")]
+        if candidates:
+            parent = candidates[-1]
+            parent_marks = _parent_watermarks(f"{BACKUPS_ROOT}/{parent}")
+            print(f"🔗 Önceki yedek: {parent}")
+        else:
+            print("ℹ️ Önceki yedek bulunamadı, tam yedek alınacak")
 
-def create_backup():
-    """Database'in tam yedeğini al"""
-    print("🗄️ Database yedeği alınıyor...")
-    
-    # Supabase client oluştur
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-    
     # Yedek klasörü oluştur
-    backup_dir = f"backups/backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    backup_dir = f"{BACKUPS_ROOT}/backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     os.makedirs(backup_dir, exist_ok=True)
-    
-    # Tüm tabloları yedekle
-    tables_to_backup = [
-        'personel',
-        'personel_giris_cikis',
-        'personel_giris_cikis_duzenli',
-        'maas_ayarlari',
-        'kullanici_profilleri',
-        'admin_users',
-        'hata_bildirimleri'
-    ]
-    
-    backup_data = {}
-    
-    for table in tables_to_backup:
+
+    manifest = {
+        'format': 'chunks-v1' if backup_format == 'chunks' else 'stream-v1',
+        'type': 'incremental' if parent else 'full',
+        'base': parent,
+        'created_at': datetime.now().isoformat(),
+        'gzip': use_gzip if backup_format == 'stream' else True,
+        'concurrency': concurrency,
+        'tables': {},
+    }
+
+    limiter = threading.BoundedSemaphore(concurrency) if concurrency > 1 else None
+
+    def backup_table(table):
         try:
-            print(f"📋 {table} tablosu yedekleniyor...")
-            
-            # Tabloyu çek
-            response = supabase.table(table).select('*').execute()
-            
-            if response.data:
-                backup_data[table] = response.data
-                
-                # CSV olarak da kaydet
-                csv_path = f"{backup_dir}/{table}.csv"
-                if response.data:
-                    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                        fieldnames = response.data[0].keys()
-                        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                        writer.writeheader()
-                        writer.writerows(response.data)
-                print(f"✅ {table}: {len(response.data)} kayıt -> {csv_path}")
+            column = WATERMARK_COLUMNS.get(table)
+            since_value = parent_marks.get(table) if column else None
+            since = (column, since_value) if since_value is not None else None
+            if since:
+                op = '>' if column == primary_key(table) else '>='
+                print(f"📋 {table} tablosu yedekleniyor ({column} {op} {since_value})...")
+            else:
+                print(f"📋 {table} tablosu yedekleniyor...")
+            if limiter is None:
+                pages = iter_table_pages(supabase, table, since=since)
+            else:
+                pages = iter_table_pages_parallel(supabase, table, limiter=limiter, since=since)
+            if backup_format == 'chunks':
+                entry = export_table_chunks(supabase, table, pages=pages, watermark_column=column)
+            else:
+                entry = export_table(supabase, table, backup_dir, use_gzip, pages=pages,
+                                     watermark_column=column)
+            entry['mode'] = 'incremental' if since else 'full'
+            if column:
+                value = entry.pop('watermark')
+                entry['watermark'] = {'column': column, 'value': value if value is not None else since_value}
+                if since:
+                    entry['since'] = since_value
+            else:
+                entry.pop('watermark')
+            if entry['rows'] and 'chunks' in entry:
+                print(f"✅ {table}: {entry['rows']} kayıt -> {len(entry['chunks'])} parça, "
+                      f"{entry['new_chunks']} yeni ({entry['new_bytes']/1024:.1f} KB) "
+                      f"({entry['seconds']:.1f} sn, {entry['rows_per_sec'] or 0:.0f} kayıt/sn)")
+            elif entry['rows']:
+                print(f"✅ {table}: {entry['rows']} kayıt -> {entry['files']['ndjson']['path']} "
+                      f"({entry['seconds']:.1f} sn, {entry['rows_per_sec'] or 0:.0f} kayıt/sn)")
             else:
                 print(f"⚠️ {table}: Veri bulunamadı")
-                
+            return entry
         except Exception as e:
             print(f"❌ {table} yedekleme hatası: {e}")
-    
-    # JSON olarak da kaydet
-    json_path = f"{backup_dir}/full_backup.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, ensure_ascii=False, indent=2, default=str)
-    
+            return {'error': str(e)}
+
+    if limiter is None:
+        for table in tables_to_backup:
+            manifest['tables'][table] = backup_table(table)
+    else:
+        # postgrest istemcisi ilk erişimde oluşturulur; thread'lerden önce hazırla
+        getattr(supabase, 'postgrest', None)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            entries = list(pool.map(backup_table, tables_to_backup))
+        manifest['tables'] = dict(zip(tables_to_backup, entries))
+
+    manifest['total_rows'] = sum(t.get('rows', 0) for t in manifest['tables'].values())
+    write_manifest(backup_dir, manifest)
+
     print(f"\n🎉 Yedekleme tamamlandı!")
     print(f"📁 Klasör: {backup_dir}")
-    print(f"📄 JSON: {json_path}")
-    print(f"📊 Toplam tablo: {len(backup_data)}")
-    
+    print(f"📄 Manifest: {backup_dir}/{MANIFEST_NAME}")
+    print(f"📊 Toplam tablo: {sum(1 for t in manifest['tables'].values() if t.get('rows'))}")
+
     # Özet bilgi
-    total_records = sum(len(data) for data in backup_data.values())
-    print(f"📈 Toplam kayıt: {total_records}")
-    
+    print(f"📈 Toplam kayıt: {manifest['total_rows']}")
+
     return backup_dir
 
-def restore_backup(backup_dir):
-    """Yedekten geri yükle"""
-    print(f"🔄 {backup_dir} yedeğinden geri yükleniyor...")
-    
-    # Supabase client oluştur
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-    
+def iter_ndjson(path):
+    """NDJSON dosyasını (gzip olabilir) satır satır oku"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_csv(path):
+    """CSV dosyasını satır satır oku; boş hücreler NULL olarak döner"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            yield {k: (v if v != '' else None) for k, v in row.items()}
+
+def backup_tables(backup_dir):
+    """Yedekteki tablolar, geri yükleme (bağımlılık) sırasına göre"""
+    manifest = read_manifest(backup_dir)
+    if manifest:
+        tables = [t for t, entry in manifest['tables'].items() if _has_rows_file(entry)]
+    else:
+        legacy = _load_legacy_backup(backup_dir)
+        if legacy is None:
+            return None
+        tables = list(legacy.keys())
+    ordered = [t for t in RESTORE_ORDER if t in tables]
+    return ordered + [t for t in tables if t not in ordered]
+
+def _load_legacy_backup(backup_dir):
     json_path = f"{backup_dir}/full_backup.json"
-    
     if not os.path.exists(json_path):
-        print(f"❌ Yedek dosyası bulunamadı: {json_path}")
-        return
-    
-    # JSON'u oku
+        return None
     with open(json_path, 'r', encoding='utf-8') as f:
-        backup_data = json.load(f)
-    
-    # Tabloları geri yükle
-    for table, data in backup_data.items():
-        if not data:
+        return json.load(f)
+
+def backup_chain(backup_dir):
+    """Artımlı yedeğin tam yedekten başlayan zinciri [base, ..., backup_dir]"""
+    chain = [backup_dir]
+    seen = {os.path.normpath(backup_dir)}
+    while True:
+        manifest = read_manifest(chain[0]) or {}
+        base = manifest.get('base')
+        if not base:
+            return chain
+        base_dir = os.path.join(os.path.dirname(chain[0]), base)
+        if os.path.normpath(base_dir) in seen or not os.path.isdir(base_dir):
+            raise FileNotFoundError(f"Yedek zinciri kopuk: {base} bulunamadı")
+        seen.add(os.path.normpath(base_dir))
+        chain.insert(0, base_dir)
+
+def table_segments(backup_dir, table):
+    """Tabloyu yeniden kurmak için okunacak yedekler: son tam kopya ve sonraki artımlar"""
+    chain = backup_chain(backup_dir)
+    segments = []
+    for directory in chain:
+        manifest = read_manifest(directory)
+        entry = (manifest or {}).get('tables', {}).get(table) if manifest else None
+        if manifest and not _has_rows_file(entry):
+            continue
+        if not manifest or entry.get('mode', 'full') == 'full':
+            segments = []
+        segments.append(directory)
+    return segments
+
+def iter_backup_rows(backup_dir, table):
+    """Yedekteki tablonun satırlarını akış halinde döndür.
+    Artımlı yedeklerde zincirdeki son tam kopya ve sonraki artımlar sırayla okunur;
+    aynı anahtar için sonraki satır öncekini ezer (upsert).
+    """
+    for directory in table_segments(backup_dir, table):
+        yield from _iter_own_rows(directory, table)
+
+def _iter_own_rows(backup_dir, table):
+    """Tek yedek klasöründeki tablo satırları (parçalar > NDJSON > CSV > eski full_backup.json)"""
+    manifest = read_manifest(backup_dir)
+    if manifest:
+        entry = manifest['tables'].get(table, {})
+        if 'chunks' in entry:
+            for chunk in entry['chunks']:
+                yield from read_chunk(chunk['sha256'])
+            return
+        files = entry.get('files') or {}
+        if 'ndjson' in files:
+            yield from iter_ndjson(f"{backup_dir}/{files['ndjson']['path']}")
+        elif 'csv' in files:
+            yield from iter_csv(f"{backup_dir}/{files['csv']['path']}")
+        return
+    # Eski format tek JSON dosyası, bellekte okunmak zorunda
+    yield from (_load_legacy_backup(backup_dir) or {}).get(table, [])
+
+def _read_checkpoint(backup_dir):
+    path = f"{backup_dir}/{CHECKPOINT_NAME}"
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_checkpoint(backup_dir, checkpoint):
+    tmp_path = f"{backup_dir}/{CHECKPOINT_NAME}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, f"{backup_dir}/{CHECKPOINT_NAME}")
+
+def _chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _last_by_key(chunk, pk):
+    """Parçada aynı anahtar birden çok kez varsa sonuncusunu tut"""
+    latest = {}
+    keyless = []
+    for row in chunk:
+        key = row.get(pk)
+        if key is None:
+            keyless.append(row)
+        else:
+            latest[key] = row
+    return keyless + list(latest.values())
+
+def restore_chunks(backup_dir, table, chunk_size, skip=0):
+    """Geri yüklenecek parçalar: (okunan satır sayısı, satırlar).
+    Parçalar yedek sınırını aşmaz ve aynı anahtarı iki kez içermez. Artımlı yedekler
+    sınırdaki satırı ve güncellenen satırları yeniden içerir; aynı upsert'te bir
+    anahtar iki kez olursa Postgres "cannot affect row a second time" hatası verir.
+    """
+    pk = primary_key(table)
+    for directory in table_segments(backup_dir, table):
+        rows = _iter_own_rows(directory, table)
+        if skip:
+            skip -= sum(1 for _ in itertools.islice(rows, skip))
+        for chunk in _chunked(rows, chunk_size):
+            yield len(chunk), _last_by_key(chunk, pk)
+
+def restore_backup(backup_dir, dry_run=False, chunk_size=None, reset=False):
+    """Yedekten geri yükle.
+    Tablolar bağımlılık sırasıyla, parçalar halinde upsert edilir. Her parçadan sonra
+    ilerleme restore_checkpoint.json'a yazılır; yarıda kalan geri yükleme kaldığı yerden devam eder.
+    dry_run=True ise hiçbir şey yazılmaz, yalnızca dosyalar doğrulanıp sayılır.
+    """
+    chunk_size = chunk_size or RESTORE_CHUNK_SIZE
+    mode = "doğrulanıyor (dry-run)" if dry_run else "geri yükleniyor"
+    print(f"🔄 {backup_dir} yedeği {mode}...")
+
+    tables = backup_tables(backup_dir)
+    if tables is None:
+        print(f"❌ Yedek dosyası bulunamadı: {backup_dir}")
+        return
+    try:
+        chain = backup_chain(backup_dir)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return
+    if len(chain) > 1:
+        print("🔗 Zincir: " + " → ".join(os.path.basename(d) for d in chain))
+
+    checkpoint = {} if (reset or dry_run) else _read_checkpoint(backup_dir)
+    supabase = None if dry_run else get_client()
+
+    for table in tables:
+        state = checkpoint.get(table, {'rows': 0, 'done': False})
+        if state.get('done'):
+            print(f"⏭️ {table}: daha önce tamamlanmış ({state['rows']} kayıt)")
+            continue
+
+        pk = primary_key(table)
+        skip = state.get('rows', 0)
+        if skip:
+            print(f"📋 {table} tablosu {skip}. kayıttan devam ediyor...")
+        else:
+            print(f"📋 {table} tablosu {mode}...")
+
+        count = 0
+        missing_pk = 0
+        try:
+            for read, chunk in restore_chunks(backup_dir, table, chunk_size, skip):
+                missing_pk += sum(1 for r in chunk if r.get(pk) is None)
+                if not dry_run:
+                    with_retry(
+                        supabase.table(table).upsert(chunk, on_conflict=pk, returning='minimal').execute
+                    )
+                    state['rows'] = skip + count + read
+                    checkpoint[table] = state
+                    _write_checkpoint(backup_dir, checkpoint)
+                count += read
+        except Exception as e:
+            print(f"❌ {table} geri yükleme hatası ({skip + count}. kayıtta): {e}")
+            print("   Tekrar çalıştırıldığında kaldığı yerden devam edecek.")
+            return
+
+        expected = None
+        counts = [
+            (read_manifest(d) or {}).get('tables', {}).get(table, {}).get('rows')
+            for d in table_segments(backup_dir, table)
+        ]
+        if counts and None not in counts:
+            expected = sum(counts)
+        if dry_run:
+            note = ""
+            if expected is not None and expected != count:
+                note = f" ⚠️ manifest {expected} kayıt diyor"
+            if missing_pk:
+                note += f" ⚠️ {missing_pk} kayıtta '{pk}' eksik"
+            print(f"✅ {table}: {count} kayıt geçerli{note}")
+        else:
+            state['done'] = True
+            checkpoint[table] = state
+            _write_checkpoint(backup_dir, checkpoint)
+            print(f"✅ {table}: {skip + count} kayıt geri yüklendi")
+
+    if not dry_run:
+        # Tamamlanan geri yükleme için checkpoint'e gerek yok
+        # (hiç tablo yazılmadıysa checkpoint oluşmamıştır)
+        try:
+            os.remove(f"{backup_dir}/{CHECKPOINT_NAME}")
+        except FileNotFoundError:
+            pass
+        print("🎉 Geri yükleme tamamlandı!")
+
+def _pg_number(value):
+    """Sayıyı Postgres float8 metni gibi yaz (1500.0 -> 1500)"""
+    text = repr(float(value))
+    return text[:-2] if text.endswith('.0') else text
+
+def row_digest(row):
+    """Satırın özeti; add_backup_range_digest.sql'deki satır metniyle aynı kurallar"""
+    parts = []
+    for key in sorted(row):
+        value = row[key]
+        if value is None:
+            parts.append(key + '\x02')
+        elif isinstance(value, bool):
+            parts.append(f"{key}={'true' if value else 'false'}")
+        elif isinstance(value, (int, float)):
+            parts.append(f"{key}={_pg_number(value)}")
+        elif isinstance(value, str):
+            parts.append(f"{key}={value}")
+        else:
+            parts.append(f"{key}={json.dumps(value, ensure_ascii=False, separators=(', ', ': '))}")
+    return int(hashlib.md5('\x01'.join(parts).encode('utf-8')).hexdigest()[:15], 16)
+
+class _LocalDigests:
+    """Yedekteki tablo için anahtar -> satır özeti; aralık sayısı/özeti önek toplamlarıyla O(log n)"""
+
+    def __init__(self, rows, pk):
+        self.hashes = {}
+        for row in rows:
+            # Artımlı zincirde aynı anahtarın sonraki satırı öncekini ezer
+            self.hashes[row[pk]] = row_digest(row)
+        self.integer = all(isinstance(k, int) and not isinstance(k, bool) for k in self.hashes)
+        self.keys = sorted(self.hashes) if self.integer else list(self.hashes)
+        self.prefix = [0]
+        if self.integer:
+            total = 0
+            for key in self.keys:
+                total = (total + self.hashes[key]) % DIGEST_MOD
+                self.prefix.append(total)
+
+    def range(self, lo, hi):
+        i = bisect.bisect_left(self.keys, lo)
+        j = bisect.bisect_left(self.keys, hi)
+        return j - i, (self.prefix[j] - self.prefix[i]) % DIGEST_MOD
+
+    def keys_between(self, lo, hi):
+        return self.keys[bisect.bisect_left(self.keys, lo):bisect.bisect_left(self.keys, hi)]
+
+def _compare_rows(supabase, table, local, result, lo=None, hi=None):
+    """Aralığın satırlarını veritabanından okuyup yedekle satır satır karşılaştır"""
+    pk = primary_key(table)
+    remote = {}
+    for page in iter_table_pages(supabase, table, PAGE_SIZE, lo, hi):
+        for row in page:
+            remote[row[pk]] = row_digest(row)
+    result['fetched_rows'] += len(remote)
+    local_keys = local.keys_between(lo, hi) if lo is not None else local.keys
+    for key in local_keys:
+        if key not in remote:
+            result['extra'].append(key)
+        elif remote[key] != local.hashes[key]:
+            result['different'].append(key)
+    result['missing'].extend(k for k in remote if k not in local.hashes)
+
+def verify_table(supabase, backup_dir, table, fanout=None, leaf_rows=None):
+    """Yedekteki tabloyu canlı veritabanıyla aralık özetleriyle karşılaştır.
+    Özetleri eşleşen aralıklar atlanır; farklı aralıklar alt parçalara bölünür ve
+    yeterince küçülünce yalnızca o satırlar okunur (Merkle benzeri iniş).
+    """
+    fanout = max(2, fanout or VERIFY_FANOUT)
+    leaf_rows = leaf_rows or VERIFY_LEAF_ROWS
+    pk = primary_key(table)
+    local = _LocalDigests(iter_backup_rows(backup_dir, table), pk)
+    result = {'rows_backup': len(local.hashes), 'rows_live': None, 'missing': [], 'extra': [],
+              'different': [], 'rpc_calls': 0, 'fetched_rows': 0}
+
+    bounds = _key_bounds(supabase, table)
+    if not local.integer or (bounds is None and not local.keys):
+        # Tamsayı olmayan anahtar (küçük tablolar) ya da boş yedek: doğrudan karşılaştır
+        _compare_rows(supabase, table, local, result)
+        result['rows_live'] = result['fetched_rows']
+        return result
+
+    edges = list(bounds or ()) + [local.keys[0], local.keys[-1]] if local.keys else list(bounds)
+    stack = [(min(edges), max(edges) + 1, True)]
+    while stack:
+        lo, hi, root = stack.pop()
+        width = hi - lo
+        buckets = min(fanout, width)
+        response = with_retry(supabase.rpc('backup_range_digest', {
+            'p_table': table, 'p_key': pk, 'p_lo': lo, 'p_hi': hi, 'p_buckets': buckets,
+        }).execute)
+        result['rpc_calls'] += 1
+        remote = {int(r['bucket']): (int(r['row_count']), int(r['digest'])) for r in (response.data or [])}
+        if root:
+            result['rows_live'] = sum(count for count, _ in remote.values())
+        for bucket in range(buckets):
+            # Sunucudaki (anahtar - lo) * buckets / width tamsayı bölmesiyle aynı sınırlar
+            start = lo + -(-bucket * width // buckets)
+            end = lo + -(-(bucket + 1) * width // buckets)
+            if start >= end:
+                continue
+            remote_count, remote_digest = remote.get(bucket, (0, 0))
+            local_count, local_digest = local.range(start, end)
+            if (remote_count, remote_digest) == (local_count, local_digest):
+                continue
+            if remote_count + local_count <= leaf_rows or end - start <= fanout:
+                _compare_rows(supabase, table, local, result, start, end)
+            else:
+                stack.append((start, end, False))
+    return result
+
+def verify_backup(backup_dir, tables=None):
+    """Yedeği canlı veritabanıyla karşılaştır; eşleşmeyen satırları raporla.
+    Veritabanında add_backup_range_digest.sql ile kurulan RPC gerekir.
+    Dönüş: {tablo: sonuç}; tüm tablolar eşleşiyorsa her sonucun listeleri boştur.
+    """
+    print(f"🔍 {backup_dir} yedeği canlı veritabanıyla karşılaştırılıyor...")
+    available = backup_tables(backup_dir)
+    if available is None:
+        print(f"❌ Yedek dosyası bulunamadı: {backup_dir}")
+        return None
+    supabase = get_client()
+    results = {}
+    for table in (tables or available):
+        if table not in available:
+            print(f"⚠️ {table}: yedekte yok")
             continue
-            
+        started = time.monotonic()
         try:
-            print(f"📋 {table} tablosu geri yükleniyor...")
-            
-            # Mevcut verileri temizle (dikkatli ol!)
-            # supabase.table(table).delete().neq('id', 0).execute()
-            
-            # Yeni verileri ekle
-            for record in data:
-                supabase.table(table).insert(record).execute()
-            
-            print(f"✅ {table}: {len(data)} kayıt geri yüklendi")
-            
+            result = verify_table(supabase, backup_dir, table)
         except Exception as e:
-            print(f"❌ {table} geri yükleme hatası: {e}")
+            print(f"❌ {table} doğrulama hatası: {e}")
+            if 'backup_range_digest' in str(e):
+                print("   add_backup_range_digest.sql'i Supabase SQL Editor'da çalıştırın.")
+            results[table] = {'error': str(e)}
+            continue
+        results[table] = result
+        cost = f"{result['rpc_calls']} özet isteği, {result['fetched_rows']} satır okundu, " \
+               f"{time.monotonic() - started:.1f} sn"
+        problems = [(label, result[key]) for key, label in
+                    (('missing', 'yedekte eksik'), ('extra', 'veritabanında yok'), ('different', 'farklı'))
+                    if result[key]]
+        if not problems:
+            print(f"✅ {table}: {result['rows_backup']} kayıt eşleşiyor ({cost})")
+            continue
+        print(f"❌ {table}: yedek {result['rows_backup']}, veritabanı {result['rows_live']} kayıt ({cost})")
+        for label, keys in problems:
+            keys = sorted(keys, key=str)
+            shown = ", ".join(str(k) for k in keys[:VERIFY_REPORT_LIMIT])
+            more = f" ... (+{len(keys) - VERIFY_REPORT_LIMIT})" if len(keys) > VERIFY_REPORT_LIMIT else ""
+            print(f"   {label}: {len(keys)} kayıt [{primary_key(table)}: {shown}{more}]")
+    return results
+
+def _backup_sizes(manifest, seen):
+    """(mantıksal bayt, bu yedekle diske eklenen bayt); seen önceki yedeklerin parçalarıyla güncellenir"""
+    logical = physical = 0
+    for entry in manifest['tables'].values():
+        for chunk in entry.get('chunks') or []:
+            logical += chunk['bytes']
+            if chunk['sha256'] not in seen:
+                seen.add(chunk['sha256'])
+                physical += chunk['stored_bytes']
+        for info in (entry.get('files') or {}).values():
+            logical += info['bytes']
+            physical += info['bytes']
+    return logical, physical
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
 
 def list_backups():
-    """Mevcut yedekleri listele"""
-    if not os.path.exists('backups'):
+    """Mevcut yedekleri listele (artımlı yedekler zinciriyle, mantıksal / fiziksel boyutla)"""
+    backups = list_backup_dirs()
+    if not backups:
         print("📁 Henüz yedek bulunmuyor")
         return
-    
-    backups = [d for d in os.listdir('backups') if d.startswith('backup_')]
-    backups.sort(reverse=True)
-    
+
+    # Fiziksel boyut: parçayı ilk kullanan (en eski) yedeğe yazılır
+    seen = set()
+    sizes = {}
+    for backup in backups:
+        manifest = read_manifest(f"{BACKUPS_ROOT}/{backup}")
+        if manifest:
+            sizes[backup] = _backup_sizes(manifest, seen)
+
     print("📋 Mevcut yedekler:")
-    for i, backup in enumerate(backups, 1):
-        backup_path = f"backups/{backup}"
-        if os.path.exists(f"{backup_path}/full_backup.json"):
+    total_logical = 0
+    for i, backup in enumerate(reversed(backups), 1):
+        backup_path = f"{BACKUPS_ROOT}/{backup}"
+        manifest = read_manifest(backup_path)
+        if manifest:
+            logical, physical = sizes[backup]
+            total_logical += logical
+            line = (f"{i}. {backup} ({logical/1024:.1f} KB, diskte +{physical/1024:.1f} KB, "
+                    f"{manifest.get('total_rows', 0)} kayıt")
+            if manifest.get('type') == 'incremental':
+                try:
+                    chain = [os.path.basename(d) for d in backup_chain(backup_path)]
+                    line += ", artımlı)\n     🔗 " + " → ".join(chain)
+                except FileNotFoundError as e:
+                    line += f", artımlı) ⚠️ {e}"
+            else:
+                line += ", tam)"
+            print(line)
+        elif os.path.exists(f"{backup_path}/full_backup.json"):
             size = os.path.getsize(f"{backup_path}/full_backup.json")
+            total_logical += size
             print(f"{i}. {backup} ({size/1024:.1f} KB)")
 
+    physical = _dir_bytes(BACKUPS_ROOT) if os.path.exists(BACKUPS_ROOT) else 0
+    print(f"\n💾 Toplam: mantıksal {total_logical/1024/1024:.2f} MB, diskte {physical/1024/1024:.2f} MB "
+          f"(parça deposu {_dir_bytes(chunk_store_dir())/1024/1024:.2f} MB)")
+
+def gc_chunks(grace_seconds=None, dry_run=False):
+    """Hiçbir manifest'in kullanmadığı parçaları sil. Dönüş: (silinen parça, bayt)"""
+    grace = BACKUP_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    store = chunk_store_dir()
+    if not os.path.exists(store):
+        return 0, 0
+    referenced = set()
+    for backup in list_backup_dirs():
+        manifest = read_manifest(f"{BACKUPS_ROOT}/{backup}") or {}
+        for entry in manifest.get('tables', {}).values():
+            referenced.update(c['sha256'] for c in entry.get('chunks') or [])
+
+    cutoff = time.time() - grace
+    removed = removed_bytes = 0
+    for root, _, files in os.walk(store):
+        for name in files:
+            path = os.path.join(root, name)
+            digest = name.split('.', 1)[0]
+            if digest in referenced and not name.endswith('.tmp'):
+                continue
+            if os.path.getmtime(path) > cutoff:
+                continue
+            removed += 1
+            removed_bytes += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+    action = "silinecek" if dry_run else "silindi"
+    print(f"🧹 Kullanılmayan parça: {removed} adet, {removed_bytes/1024:.1f} KB {action}")
+    return removed, removed_bytes
+
+def prune_backups(keep, dry_run=False):
+    """En yeni `keep` yedeği (ve zincirlerindeki temel yedekleri) tut, gerisini silip parçaları topla"""
+    backups = list_backup_dirs()
+    if keep < 1:
+        raise ValueError("En az bir yedek tutulmalı")
+    kept = set()
+    for backup in backups[-keep:]:
+        try:
+            kept.update(os.path.basename(d) for d in backup_chain(f"{BACKUPS_ROOT}/{backup}"))
+        except FileNotFoundError as e:
+            print(f"⚠️ {backup}: {e}")
+            kept.add(backup)
+    removed = [b for b in backups if b not in kept]
+    for backup in removed:
+        print(f"🗑️ {backup}" + (" (silinecek)" if dry_run else ""))
+        if not dry_run:
+            shutil.rmtree(f"{BACKUPS_ROOT}/{backup}")
+    print(f"📁 {len(kept)} yedek tutuldu, {len(removed)} yedek {'silinecek' if dry_run else 'silindi'}")
+    gc_chunks(dry_run=dry_run)
+    return removed
+
 if __name__ == "__main__":
     import sys
     
@@ -140,17 +998,51 @@ if __name__ == "__main__":
         command = sys.argv[1]
         
         if command == "backup":
-            create_backup()
+            concurrency = None
+            if "--parallel" in sys.argv:
+                idx = sys.argv.index("--parallel")
+                concurrency = int(sys.argv[idx + 1]) if idx + 1 < len(sys.argv) else 4
+            backup_dir = create_backup(use_gzip=True if "--gzip" in sys.argv else None, concurrency=concurrency,
+                                       incremental="--incremental" in sys.argv,
+                                       backup_format="stream" if "--stream" in sys.argv else None)
+            if "--verify" in sys.argv:
+                verify_backup(backup_dir)
         elif command == "list":
             list_backups()
+        elif command == "verify" and len(sys.argv) > 2:
+            results = verify_backup(f"{BACKUPS_ROOT}/{sys.argv[2]}")
+            ok = results is not None and all(
+                not r.get('error') and not (r['missing'] or r['extra'] or r['different'])
+                for r in results.values()
+            )
+            sys.exit(0 if ok else 1)
+        elif command == "prune":
+            keep = 7
+            if "--keep" in sys.argv:
+                idx = sys.argv.index("--keep")
+                keep = int(sys.argv[idx + 1])
+            prune_backups(keep, dry_run="--dry-run" in sys.argv)
+        elif command == "gc":
+            gc_chunks(dry_run="--dry-run" in sys.argv)
         elif command == "restore" and len(sys.argv) > 2:
             backup_name = sys.argv[2]
-            restore_backup(f"backups/{backup_name}")
+            restore_backup(f"backups/{backup_name}", dry_run="--dry-run" in sys.argv,
+                           reset="--reset" in sys.argv)
         else:
             print("Kullanım:")
             print("python backup_database.py backup     # Yedek al")
-            print("python backup_database.py list       # Yedekleri listele")
+            print("python backup_database.py backup --gzip  # Sıkıştırılmış yedek al (--stream ile)")
+            print("python backup_database.py backup --parallel 4  # Paralel yedek al (4 eşzamanlı istek)")
+            print("python backup_database.py backup --incremental  # Son yedekten sonraki değişiklikleri al")
+            print("python backup_database.py backup --stream  # CSV + NDJSON dosyaları olarak yedek al")
+            print("python backup_database.py list       # Yedekleri listele (mantıksal / diskteki boyut)")
+            print("python backup_database.py verify backup_20241225_143022  # Yedeği canlı veritabanıyla karşılaştır")
+            print("python backup_database.py backup --verify  # Yedek al ve hemen doğrula")
+            print("python backup_database.py prune --keep 7  # En yeni 7 yedeği tut, kullanılmayan parçaları sil")
+            print("python backup_database.py gc         # Hiçbir yedeğin kullanmadığı parçaları sil")
             print("python backup_database.py restore backup_20241225_143022  # Yedekten geri yükle")
+            print("python backup_database.py restore backup_20241225_143022 --dry-run  # Sadece doğrula ve say")
+            print("python backup_database.py restore backup_20241225_143022 --reset    # Checkpoint'i yok say, baştan başla")
     else:
         print("🗄️ Database Yedekleme Aracı")
         print("=" * 40)
@@ -0,0 +1,79 @@
+"""generate_pairs karşılaştırması: sütunsal motor vs önceki satır satır uygulama.
+
+Kullanım:
+    python benchmarks/bench_pairs.py [--users 60] [--days 365] [--seed 1]
+
+Sentetik veri gece vardiyaları, yakın tekrarlar (çift okutma) ve eksik çıkışlar
+içerir. İki uygulamanın çıktısı birebir karşılaştırılır, süreler yazdırılır.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.pairing import generate_pairs, reference_generate_pairs  # noqa: E402
+
+
+def synthetic_attendance(users, days, seed=1):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for day in range(days):
+        base = start + timedelta(days=day)
+        for user in range(1, users + 1):
+            if rng.random() < 0.1:
+                continue  # izinli
+            night = user % 7 == 0
+            entry = base + timedelta(hours=22 if night else 8, minutes=rng.randint(-40, 40), seconds=rng.randint(0, 59))
+            exit_ = entry + timedelta(hours=8, minutes=rng.randint(0, 120), seconds=rng.randint(0, 59))
+            punches = [entry]
+            if rng.random() < 0.15:
+                punches.append(entry + timedelta(seconds=rng.randint(1, 200)))  # çift okutma
+            if rng.random() < 0.2:
+                mid = entry + timedelta(hours=4)
+                punches += [mid, mid + timedelta(minutes=rng.randint(20, 60))]  # mola
+            if rng.random() > 0.05:
+                punches.append(exit_)  # bazen çıkış unutulur
+            for ts in punches:
+                rows.append({"kullanici_id": user, "giris_tarihi": ts.isoformat()})
+    rows.sort(key=lambda r: r["giris_tarihi"])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=60)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = synthetic_attendance(args.users, args.days, args.seed)
+    print(f"{len(rows)} ham kayıt ({args.users} kullanıcı, {args.days} gün)")
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = reference_generate_pairs(rows)
+    reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = generate_pairs(rows)
+    engine_seconds = time.perf_counter() - started
+
+    print(f"önceki uygulama : {reference_seconds:.3f} sn (konsol çıktısı bellekte)")
+    print(f"sütunsal motor  : {engine_seconds:.3f} sn")
+    print(f"hızlanma        : {reference_seconds / engine_seconds:.1f}x")
+    if actual != expected:
+        print(f"❌ FARKLI: {len(actual)} / {len(expected)} çift")
+        return 1
+    print(f"✅ Aynı çıktı: {len(actual)} çift")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
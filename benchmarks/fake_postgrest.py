@@ -0,0 +1,399 @@
+"""Benchmark için yerel, bellek içi PostgREST benzeri sunucu.
+
+Yalnızca kodun kullandığı uçlar vardır: /rest/v1/<tablo> üzerinde
+GET (select, eq/gt/gte/lt/lte/in filtreleri, order, limit/offset),
+POST (insert/upsert; on_conflict, Prefer: resolution=ignore|merge-duplicates,
+return=minimal|representation; Postgres gibi aynı anahtarı iki kez içeren
+merge upsert'ü reddeder), PATCH, DELETE ve yedek / temizleme doğrulamasının
+kullandığı POST /rest/v1/rpc/backup_range_digest ve rpc/verify_device_punches. Her isteğe --latency-ms (+ --jitter-ms)
+kadar gecikme eklenebilir. İstek sayıları GET /__stats ile okunur,
+POST /__reset tüm tabloları ve sayaçları sıfırlar.
+
+Tek başına çalıştırma:
+    python benchmarks/fake_postgrest.py --port 54321 --latency-ms 20
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+PRIMARY_KEYS = {
+    'personel': 'kullanici_id',
+    'admin_users': 'user_id',
+}
+
+_TS = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d")
+
+
+def _norm(value):
+    """Postgres timestamp çıktısı gibi: 'YYYY-MM-DD HH:MM:SS' -> 'YYYY-MM-DDTHH:MM:SS'"""
+    if isinstance(value, str) and _TS.match(value):
+        return value[:10] + "T" + value[11:]
+    return value
+
+
+def _coerce(sample, raw):
+    """Sorgu parametresindeki metni saklanan değerin tipine çevir"""
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        return float(raw)
+    return _norm(raw)
+
+
+def _cmp(op, value, raw):
+    if value is None:
+        return False
+    if op == "in":
+        items = [x.strip().strip('"') for x in raw.strip("()").split(",")]
+        return value in [_coerce(value, x) for x in items]
+    target = _coerce(value, raw)
+    try:
+        if op == "eq":
+            return value == target
+        if op == "gt":
+            return value > target
+        if op == "gte":
+            return value >= target
+        if op == "lt":
+            return value < target
+        if op == "lte":
+            return value <= target
+    except TypeError:
+        return str(value) > str(target) if op in ("gt", "gte") else str(value) < str(target)
+    raise ValueError(f"desteklenmeyen filtre: {op}")
+
+
+def _pg_number(value):
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+def _row_digest(row):
+    """add_backup_range_digest.sql'deki satır özetinin aynısı (backup_database.row_digest)"""
+    parts = []
+    for key in sorted(row):
+        value = row[key]
+        if value is None:
+            parts.append(key + "\x02")
+        elif isinstance(value, bool):
+            parts.append(f"{key}={'true' if value else 'false'}")
+        elif isinstance(value, (int, float)):
+            parts.append(f"{key}={_pg_number(value)}")
+        elif isinstance(value, str):
+            parts.append(f"{key}={value}")
+        else:
+            parts.append(f"{key}={json.dumps(value, ensure_ascii=False, separators=(', ', ': '))}")
+    return int(hashlib.md5("\x01".join(parts).encode("utf-8")).hexdigest()[:15], 16)
+
+
+def backup_range_digest(table, key, lo, hi, buckets):
+    out = {}
+    for row in table.rows:
+        value = row.get(key)
+        if value is None or not lo <= value < hi:
+            continue
+        bucket = (value - lo) * buckets // (hi - lo)
+        count, digest = out.get(bucket, (0, 0))
+        out[bucket] = (count + 1, (digest + _row_digest(row)) % (1 << 60))
+    return [{"bucket": b, "row_count": c, "digest": str(d)} for b, (c, d) in sorted(out.items())]
+
+
+def verify_device_punches(table, user_ids, times):
+    """add_verify_device_punches.sql'in aynısı: anahtarlardan kaçı tabloda var"""
+    present = {(str(r.get("kullanici_id")), _norm(r.get("giris_tarihi"))) for r in table.rows}
+    keys = sorted({(str(u), _norm(t)) for u, t in zip(user_ids, times)}, key=lambda k: k[1])
+    missing = [k for k in keys if k not in present]
+    return [{"toplam": len(keys), "bulunan": len(keys) - len(missing),
+             "eksik": [{"kullanici_id": int(u), "giris_tarihi": t} for u, t in missing[:20]]}]
+
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+        self.pk = PRIMARY_KEYS.get(name, "id")
+        self.rows = []        # pk'ye göre sıralı
+        self.keys = []        # self.rows ile aynı sırada pk değerleri
+        self.seq = 0
+        self.indexes = {}     # on_conflict sütunları -> {değerler: satır}
+
+    def _index(self, columns):
+        index = self.indexes.get(columns)
+        if index is None:
+            index = {tuple(r.get(c) for c in columns): r for r in self.rows}
+            self.indexes[columns] = index
+        return index
+
+    def insert(self, row):
+        if self.pk == "id" and row.get("id") is None:
+            self.seq += 1
+            row["id"] = self.seq
+        elif isinstance(row.get(self.pk), int):
+            self.seq = max(self.seq, row[self.pk])
+        key = row[self.pk]
+        pos = bisect.bisect_right(self.keys, key) if not self.keys or key < self.keys[-1] else len(self.keys)
+        self.keys.insert(pos, key)
+        self.rows.insert(pos, row)
+        for columns, index in self.indexes.items():
+            index[tuple(row.get(c) for c in columns)] = row
+
+    def delete(self, filters):
+        doomed = self.select(filters, [], 0, None)
+        ids = {id(r) for r in doomed}
+        kept = [(k, r) for k, r in zip(self.keys, self.rows) if id(r) not in ids]
+        self.keys = [k for k, _ in kept]
+        self.rows = [r for _, r in kept]
+        self.indexes.clear()
+        return doomed
+
+    def select(self, filters, order, offset, limit):
+        rows = self.rows
+        # Birincil anahtara göre artan sıralı keyset sorgularında bisect ile başla
+        if order and order[0] == (self.pk, False):
+            for column, op, raw in filters:
+                if column == self.pk and op in ("gt", "gte") and rows:
+                    target = _coerce(self.keys[0], raw)
+                    start = (bisect.bisect_right if op == "gt" else bisect.bisect_left)(self.keys, target)
+                    rows = self.rows[start:]
+                    break
+        out = []
+        need = None if (limit is None or len(order) > 1 or (order and order[0] != (self.pk, False))) \
+            else offset + limit
+        for row in rows:
+            if all(_cmp(op, row.get(column), raw) for column, op, raw in filters):
+                out.append(row)
+                if need is not None and len(out) >= need:
+                    break
+        if order and order[0] != (self.pk, False) or len(order) > 1:
+            for column, desc in reversed(order):
+                out.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        out = out[offset:]
+        return out[:limit] if limit is not None else out
+
+
+class Store:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.tables = {}
+        self.stats = {"requests": 0, "GET": 0, "POST": 0, "PATCH": 0, "DELETE": 0, "rows_in": 0, "rows_out": 0}
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = Table(name)
+        return self.tables[name]
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+
+def _parse_query(query):
+    filters, order, select = [], [], None
+    offset, limit, on_conflict = 0, None, None
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key == "select":
+            select = None if value == "*" else [c.strip() for c in value.split(",")]
+        elif key == "order":
+            for part in value.split(","):
+                bits = part.split(".")
+                order.append((bits[0], len(bits) > 1 and bits[1] == "desc"))
+        elif key == "limit":
+            limit = int(value)
+        elif key == "offset":
+            offset = int(value)
+        elif key == "on_conflict":
+            on_conflict = tuple(c.strip() for c in value.split(","))
+        elif key == "columns":
+            continue
+        else:
+            op, _, raw = value.partition(".")
+            filters.append((key, op, raw))
+    return filters, order, select, offset, limit, on_conflict
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            data = b"" if body is None else json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null") if length else None
+
+        def _route(self):
+            parts = urlsplit(self.path)
+            if not parts.path.startswith("/rest/v1/"):
+                return None, parts
+            return parts.path[len("/rest/v1/"):], parts
+
+        def do_GET(self):
+            if self.path == "/__stats":
+                with store.lock:
+                    return self._send(200, dict(store.stats))
+            name, parts = self._route()
+            if not name:
+                return self._send(404, {"message": "bulunamadı"})
+            store.delay()
+            filters, order, select, offset, limit, _ = _parse_query(parts.query)
+            with store.lock:
+                rows = store.table(name).select(filters, order, offset, limit)
+                if select:
+                    rows = [{c: r.get(c) for c in select} for r in rows]
+                else:
+                    rows = [dict(r) for r in rows]
+                store.stats["requests"] += 1
+                store.stats["GET"] += 1
+                store.stats["rows_out"] += len(rows)
+            end = offset + len(rows) - 1
+            self._send(200, rows, {"Content-Range": f"{offset}-{end}/*" if rows else "*/*"})
+
+        def do_POST(self):
+            if self.path == "/__reset":
+                with store.lock:
+                    store.reset()
+                return self._send(200, {})
+            name, parts = self._route()
+            if not name:
+                return self._send(404, {"message": "bulunamadı"})
+            store.delay()
+            if name == "rpc/backup_range_digest":
+                args = self._body() or {}
+                with store.lock:
+                    body = backup_range_digest(store.table(args["p_table"]), args["p_key"], args["p_lo"],
+                                               args["p_hi"], args.get("p_buckets", 16))
+                    store.stats["requests"] += 1
+                    store.stats["POST"] += 1
+                return self._send(200, body)
+            if name == "rpc/verify_device_punches":
+                args = self._body() or {}
+                with store.lock:
+                    body = verify_device_punches(store.table("personel_giris_cikis"),
+                                                 args["p_kullanici_ids"], args["p_zamanlar"])
+                    store.stats["requests"] += 1
+                    store.stats["POST"] += 1
+                return self._send(200, body)
+            _, _, _, _, _, on_conflict = _parse_query(parts.query)
+            prefer = self.headers.get("Prefer", "")
+            payload = self._body()
+            payload = payload if isinstance(payload, list) else [payload]
+            out = []
+            if on_conflict and "resolution=ignore-duplicates" not in prefer:
+                keys = [tuple(_norm(row.get(c)) for c in on_conflict) for row in payload]
+                if len(set(keys)) < len(keys):
+                    return self._send(500, {
+                        "code": "21000", "details": None,
+                        "hint": "Ensure that no rows proposed for insertion within the same command "
+                                "have duplicate constrained values.",
+                        "message": "ON CONFLICT DO UPDATE command cannot affect row a second time"})
+            with store.lock:
+                table = store.table(name)
+                index = table._index(on_conflict) if on_conflict else None
+                for row in payload:
+                    row = {k: _norm(v) for k, v in row.items()}
+                    if index is not None:
+                        current = index.get(tuple(row.get(c) for c in on_conflict))
+                        if current is not None:
+                            if "resolution=ignore-duplicates" in prefer:
+                                continue
+                            current.update(row)
+                            out.append(current)
+                            continue
+                    table.insert(row)
+                    out.append(row)
+                store.stats["requests"] += 1
+                store.stats["POST"] += 1
+                store.stats["rows_in"] += len(payload)
+                body = None if "return=minimal" in prefer else [dict(r) for r in out]
+            self._send(201, body)
+
+        def do_PATCH(self):
+            name, parts = self._route()
+            if not name:
+                return self._send(404, {"message": "bulunamadı"})
+            store.delay()
+            filters, _, _, _, _, _ = _parse_query(parts.query)
+            changes = {k: _norm(v) for k, v in (self._body() or {}).items()}
+            with store.lock:
+                table = store.table(name)
+                rows = table.select(filters, [], 0, None)
+                for row in rows:
+                    row.update(changes)
+                table.indexes.clear()
+                store.stats["requests"] += 1
+                store.stats["PATCH"] += 1
+                body = [dict(r) for r in rows]
+            self._send(200, body)
+
+        def do_DELETE(self):
+            name, parts = self._route()
+            if not name:
+                return self._send(404, {"message": "bulunamadı"})
+            store.delay()
+            filters, _, _, _, _, _ = _parse_query(parts.query)
+            prefer = self.headers.get("Prefer", "")
+            # postgrest-py DELETE ile boş gövde ("{}") gönderir; okunmazsa bağlantıdaki sonraki isteği bozar
+            self._body()
+            with store.lock:
+                rows = store.table(name).delete(filters)
+                store.stats["requests"] += 1
+                store.stats["DELETE"] += 1
+                body = None if "return=minimal" in prefer else [dict(r) for r in rows]
+            self._send(200, body)
+
+    return Handler
+
+
+def serve(port=0, latency_ms=0.0, jitter_ms=0.0):
+    """Sunucuyu arka plan thread'inde başlat; (server, store) döndürür"""
+    store = Store(latency_ms, jitter_ms)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-postgrest", daemon=True).start()
+    return server, store
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _ = serve(args.port, args.latency_ms, args.jitter_ms)
+    print(f"Sahte PostgREST: http://127.0.0.1:{server.server_port} (Ctrl+C ile durdurun)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
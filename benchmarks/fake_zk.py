@@ -0,0 +1,170 @@
+"""Gerçek terminal olmadan geliştirme/test için sahte ZK cihazı.
+
+pyzk'daki ZK sınıfının kullandığımız kısmını taklit eder: connect(), read_sizes(),
+get_users(), get_attendance(), disable_device(), enable_device(), clear_attendance(),
+live_capture(), disconnect().
+Üretim kodunda seçilemez; benchmark ve testler zk_factory parametresiyle verir
+(devices.collect, sync.main, live.run). Kullanıcı/kayıt sayısı, gecikme ve hata
+davranışı yapıcı parametrelerinden gelir. Aynı seed her zaman aynı veriyi üretir.
+
+Yük testleri için vardiyalar (shifts: başlangıç saatleri, ör. [8, 16, 0]),
+giriş/çıkış sapması (jitter, dakika), çift okutma (dup_rate), unutulan çıkış
+(miss_rate) ve izinli gün (absent_rate) oranları ayarlanabilir; milyonlarca
+kayıt üretilebilsin diye kayıt nesneleri __slots__ kullanır.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+
+class FakeUser:
+    def __init__(self, user_id, name):
+        self.user_id = str(user_id)
+        self.name = name
+        self.uid = int(user_id)
+
+
+class FakeAttendance:
+    __slots__ = ("uid", "user_id", "timestamp", "status", "punch")
+
+    def __init__(self, uid, user_id, timestamp, status=1, punch=0):
+        self.uid = uid
+        self.user_id = str(user_id)
+        self.timestamp = timestamp
+        self.status = status
+        self.punch = punch
+
+
+class FakeZK:
+    """pyzk.ZK yerine geçen sahte bağlantı"""
+
+    def __init__(self, ip, port=4370, timeout=5, users=10, days=7, start=None,
+                 delay=0.0, fail=False, seed=0, live_rate=0.0, live_fail_after=0,
+                 shifts=(8,), shift_hours=9, jitter=30, dup_rate=0.0, miss_rate=0.0,
+                 absent_rate=0.0, **kwargs):
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.delay = float(delay)
+        self.fail = fail
+        self.rng = random.Random(seed)
+        start = datetime.fromisoformat(start) if isinstance(start, str) else start
+        self.start = start or (datetime.now() - timedelta(days=int(days))).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        self._users = [FakeUser(i, f"Personel {i}") for i in range(1, int(users) + 1)]
+        self.shifts = [int(h) for h in shifts]
+        self.shift_hours = int(shift_hours)
+        self.jitter = int(jitter)
+        self.dup_rate = float(dup_rate)
+        self.miss_rate = float(miss_rate)
+        self.absent_rate = float(absent_rate)
+        self._records = self._generate(int(days))
+        self.disabled = False
+        # Canlı mod: saniyede live_rate olay; live_fail_after olaydan sonra bağlantı bir kez kopar
+        self.live_rate = float(live_rate)
+        self.live_fail_after = int(live_fail_after)
+        self.end_live_capture = False
+        self._live_emitted = 0
+
+    def _generate(self, days):
+        records = []
+        uid = 1
+        now = datetime.now()
+        rng = self.rng
+        j = self.jitter
+        for day in range(days):
+            base = self.start + timedelta(days=day)
+            for user in self._users:
+                if self.absent_rate and rng.random() < self.absent_rate:
+                    continue
+                shift = self.shifts[user.uid % len(self.shifts)]
+                entry = base + timedelta(hours=shift, minutes=rng.randint(-j, j), seconds=rng.randint(0, 59))
+                exit_ = base + timedelta(hours=shift + self.shift_hours, minutes=rng.randint(-j, 2 * j),
+                                         seconds=rng.randint(0, 59))
+                punches = [(entry, 0)]
+                if self.dup_rate and rng.random() < self.dup_rate:
+                    # Çift okutma: yarısı aynı saniye, yarısı birkaç saniye/dakika sonra
+                    again = entry if rng.random() < 0.5 else entry + timedelta(seconds=rng.randint(1, 120))
+                    punches.append((again, 0))
+                if not (self.miss_rate and rng.random() < self.miss_rate):
+                    punches.append((exit_, 1))
+                for ts, punch in punches:
+                    if ts > now:
+                        continue
+                    records.append(FakeAttendance(uid, user.user_id, ts, status=1, punch=punch))
+                    uid += 1
+        records.sort(key=lambda a: a.timestamp)
+        return records
+
+    def _io(self):
+        if self.delay:
+            time.sleep(min(self.delay, self.timeout))
+            if self.delay > self.timeout:
+                raise TimeoutError(f"{self.ip}:{self.port} zaman aşımı")
+        if self.fail:
+            raise ConnectionError(f"{self.ip}:{self.port} bağlantı kurulamadı")
+
+    def connect(self):
+        self._io()
+        return self
+
+    def disconnect(self):
+        return True
+
+    def read_sizes(self):
+        """pyzk gibi: sayaçları users / records / fingers / faces / cards özniteliklerine yazar"""
+        self._io()
+        self.users = len(self._users)
+        self.records = len(self._records)
+        self.fingers = self.faces = self.cards = 0
+        return True
+
+    def get_users(self):
+        self._io()
+        return list(self._users)
+
+    def get_attendance(self):
+        self._io()
+        return list(self._records)
+
+    def disable_device(self):
+        self._io()
+        self.disabled = True
+        return True
+
+    def enable_device(self):
+        self._io()
+        self.disabled = False
+        return True
+
+    def clear_attendance(self):
+        self._io()
+        self._records = []
+        return True
+
+    def live_capture(self, new_timeout=10):
+        """pyzk live_capture gibi: olay geldikçe Attendance, zaman aşımında None üretir.
+        Olaylar cihazın kayıt listesine de eklenir (get_attendance ile uzlaştırma için).
+        pyzk'daki gibi olaydaki uid, kaydın seri numarası değil kullanıcının uid'sidir.
+        """
+        self._io()
+        self.end_live_capture = False
+        interval = 1.0 / self.live_rate if self.live_rate > 0 else None
+        next_at = time.monotonic() + (interval or 0)
+        while not self.end_live_capture:
+            wait = next_at - time.monotonic() if interval else new_timeout
+            if wait >= new_timeout:
+                time.sleep(new_timeout)
+                yield None
+                continue
+            time.sleep(max(0.0, wait))
+            next_at += interval
+            if self.live_fail_after and self._live_emitted >= self.live_fail_after:
+                self.live_fail_after = 0
+                raise ConnectionResetError(f"{self.ip}:{self.port} canlı bağlantı koptu")
+            user = self.rng.choice(self._users)
+            ts = datetime.now().replace(microsecond=0)
+            punch = self.rng.randint(0, 1)
+            self._records.append(FakeAttendance(len(self._records) + 1, user.user_id, ts, status=1, punch=punch))
+            self._live_emitted += 1
+            yield FakeAttendance(user.uid, user.user_id, ts, status=1, punch=punch)
@@ -0,0 +1,261 @@
+"""Sync, eşleştirme, yedekleme ve geri yükleme için yük testi.
+
+Gerçek terminal ve Supabase yerine sahte ZK cihazı (benchmarks/fake_zk.py) ve yerel
+PostgREST benzeri sunucu (benchmarks/fake_postgrest.py, ayrı süreçte) kullanılır.
+Her senaryo için süre, kayıt/sn, HTTP istek sayısı ve tepe bellek (tracemalloc)
+ölçülür; sonuçlar commit bilgisiyle benchmarks/results/ altına JSON yazılır.
+
+Kullanım:
+    python benchmarks/run_benchmarks.py [--users 200] [--days 60] [--latency-ms 5]
+        [--scenarios save_to_supabase,generate_pairs,save_pairs,create_backup,restore_backup]
+        [--backup-parallel 4] [--no-memory] [--compare benchmarks/results/<önceki>.json]
+
+Milyonlarca kayıt için ör. --users 3000 --days 365 (~2M okutma).
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ["save_to_supabase", "generate_pairs", "save_pairs", "create_backup", "restore_backup"]
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+# Sahte sunucuya istek atan istemci için JWT biçiminde sahte anahtar
+DUMMY_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """fake_postgrest.py'yi ayrı süreçte çalıştırır (bellek ölçümüne karışmasın)"""
+
+    def __init__(self, latency_ms, jitter_ms):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_postgrest.py'),
+             "--port", str(self.port), "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms)],
+            stdout=subprocess.DEVNULL,
+        )
+        for _ in range(100):
+            try:
+                self.stats()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("Sahte PostgREST başlatılamadı")
+
+    def stats(self):
+        with urllib.request.urlopen(f"{self.url}/__stats", timeout=5) as r:
+            return json.loads(r.read())
+
+    def reset(self):
+        urllib.request.urlopen(urllib.request.Request(f"{self.url}/__reset", data=b"", method="POST"), timeout=5)
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+def git_info():
+    def run(*cmd):
+        try:
+            return subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except Exception:
+            return ""
+    return {
+        "commit": run("git", "rev-parse", "HEAD") or None,
+        "subject": run("git", "log", "-1", "--format=%s") or None,
+        "dirty": bool(run("git", "status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def measure(name, fn, server, metrics, memory=True):
+    """fn() -> işlenen kayıt sayısı; süre, istek ve bellek ölçümleriyle sonuç sözlüğü döndür"""
+    before = server.stats()
+    http_before = metrics.total("http_requests")
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        rows = fn()
+    seconds = time.perf_counter() - started
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    after = server.stats()
+    result = {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+        "http_requests": metrics.total("http_requests") - http_before,
+        "server_requests": {k: after[k] - before.get(k, 0) for k in ("requests", "GET", "POST", "PATCH")},
+        "peak_memory_mb": round(peak / 1024 / 1024, 2) if peak is not None else None,
+    }
+    line = (f"{name:<17} {rows:>9} kayıt  {seconds:8.3f} sn  {result['rows_per_sec'] or 0:>10.0f} kayıt/sn  "
+            f"{result['http_requests']:>6} istek")
+    if peak is not None:
+        line += f"  {result['peak_memory_mb']:.1f} MB"
+    print(line)
+    return result
+
+
+def compare(current, previous_path):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nKarşılaştırma: {os.path.basename(previous_path)} ({(previous.get('git') or {}).get('commit', '')[:10]})")
+    for name, cur in current["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        ratio = old["seconds"] / cur["seconds"] if cur["seconds"] else 0
+        print(f"{name:<17} {old['seconds']:8.3f} -> {cur['seconds']:8.3f} sn ({ratio:.2f}x)  "
+              f"istek {old['http_requests']} -> {cur['http_requests']}  "
+              f"bellek {old.get('peak_memory_mb')} -> {cur.get('peak_memory_mb')} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--backup-parallel", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"bilinmeyen senaryo: {', '.join(sorted(unknown))}")
+
+    server = Server(args.latency_ms, args.jitter_ms)
+    os.environ.update({
+        "SUPABASE_URL": server.url,
+        "SUPABASE_SERVICE_KEY": DUMMY_KEY,
+        "SUPABASE_HTTP2": "false",
+    })
+    # İstemci ortam değişkenleri ayarlandıktan sonra, ilk kullanımda oluşur
+    import backup_database
+    from src import db, metrics, pairing, sync
+    from benchmarks.fake_zk import FakeZK
+
+    backup_root = tempfile.mkdtemp(prefix="pdks_bench_")
+    backup_database.BACKUPS_ROOT = backup_root
+    memory = not args.no_memory
+    try:
+        started = time.perf_counter()
+        device = FakeZK("bench", users=args.users, days=args.days, start="2024-01-01", seed=args.seed,
+                        shifts=[8, 16, 0], shift_hours=8, jitter=40, dup_rate=0.05, miss_rate=0.03,
+                        absent_rate=0.08)
+        users = {u.user_id: u.name for u in device.get_users()}
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            records = sync.build_attendance_records(device.get_attendance(), users, "bench:4370", "Benchmark")
+        print(f"{len(records)} sentetik okutma ({args.users} kullanıcı, {args.days} gün), "
+              f"{time.perf_counter() - started:.1f} sn; gecikme {args.latency_ms} ms")
+        raw_rows = sorted(
+            {(int(r["user_id"]), r["timestamp"].strftime("%Y-%m-%dT%H:%M:%S")) for r in records},
+            key=lambda k: (k[1], k[0]),
+        )
+        raw_rows = [{"kullanici_id": uid, "giris_tarihi": ts} for uid, ts in raw_rows]
+        del device
+        state = {}
+        # İstemci kurulumu ve import maliyeti ilk senaryoya yazılmasın
+        db.get_client().table("personel").select("kullanici_id").limit(1).execute()
+
+        def run_save_to_supabase():
+            stats = sync.save_to_supabase(records)
+            return stats["inserted"] + stats["skipped"]
+
+        def run_generate_pairs():
+            state["pairs"] = pairing.generate_pairs(raw_rows)
+            return len(raw_rows)
+
+        def run_save_pairs():
+            pairs = state.get("pairs") or pairing.generate_pairs(raw_rows)
+            summary = sync.save_pairs(pairs)
+            return summary["inserted"] + summary["updated"] + summary["unchanged"]
+
+        def run_create_backup():
+            state["backup_dir"] = backup_database.create_backup(use_gzip=False, concurrency=args.backup_parallel)
+            manifest = backup_database.read_manifest(state["backup_dir"])
+            return manifest["total_rows"]
+
+        def run_restore_backup():
+            server.reset()
+            backup_database.restore_backup(state["backup_dir"], reset=True)
+            return server.stats()["rows_in"]
+
+        runners = {
+            "save_to_supabase": run_save_to_supabase,
+            "generate_pairs": run_generate_pairs,
+            "save_pairs": run_save_pairs,
+            "create_backup": run_create_backup,
+            "restore_backup": run_restore_backup,
+        }
+        # Yedekleme/geri yükleme dolu bir veritabanı ister
+        if "create_backup" in selected or "restore_backup" in selected:
+            for needed in ("save_to_supabase", "save_pairs"):
+                if needed not in selected:
+                    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                        runners[needed]()
+        if "restore_backup" in selected and "create_backup" not in selected:
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                run_create_backup()
+
+        results = {}
+        for name in SCENARIOS:
+            if name in selected:
+                results[name] = measure(name, runners[name], server, metrics, memory)
+    finally:
+        db.close_client()
+        server.close()
+        shutil.rmtree(backup_root, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_info(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "users": args.users, "days": args.days, "seed": args.seed, "punches": len(records),
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+            "backup_parallel": args.backup_parallel, "memory": memory,
+        },
+        "scenarios": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        sha = (report["git"]["commit"] or "nogit")[:10]
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{sha}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Sonuçlar: {output}")
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,10 @@ import win32event
 import servicemanager
 import sys
 import os
-import time
 import logging
+from src import logsetup, metrics
+from src.db import close_client
+from src.scheduler import AdaptiveScheduler
 from src.sync import main
 
 class PDKSSyncService(win32serviceutil.ServiceFramework):
@@ -21,18 +23,8 @@ class PDKSSyncService(win32serviceutil.ServiceFramework):
         script_dir = os.path.dirname(os.path.abspath(__file__))
         os.chdir(script_dir)
         
-        # Log ayarları
-        log_dir = os.path.join(script_dir, 'logs')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(os.path.join(log_dir, 'service.log')),
-                logging.StreamHandler()
-            ]
-        )
+        # Log ayarları: logs/service.log (kuyruklu, döndürülen, gzip'li; src/logsetup.py)
+        logsetup.configure('service.log')
 
     def SvcStop(self):
         self.ReportServiceStatus(win32service.SERVICE_STOP_PENDING)
@@ -45,24 +37,21 @@ class PDKSSyncService(win32serviceutil.ServiceFramework):
         self.main()
 
     def main(self):
-        logging.info("PDKS Sync Service başlatıldı - 5 dakikada bir çalışacak")
-        
-        while True:
-            # Servis durdurma sinyalini kontrol et
-            rc = win32event.WaitForSingleObject(self.hWaitStop, 300000)  # 5 dakika = 300000 ms
-            
-            if rc == win32event.WAIT_OBJECT_0:
-                # Servis durduruldu
-                logging.info("PDKS Sync Service durduruldu")
-                break
-            
-            # 5 dakika geçti, sync çalıştır
-            try:
-                logging.info("Sync başlatılıyor...")
-                main()
-                logging.info("Sync tamamlandı")
-            except Exception as e:
-                logging.error(f"Sync error: {e}")
+        scheduler = AdaptiveScheduler.from_env()
+        logging.info(f"PDKS Sync Service başlatıldı - uyarlamalı zamanlayıcı "
+                     f"(normal {scheduler.base_interval:.0f} sn, yoğun {scheduler.fast_interval:.0f} sn, "
+                     f"en fazla {scheduler.max_interval:.0f} sn)")
+
+        def stop_requested(seconds):
+            # Servis durdurma sinyali gelene kadar veya süre dolana kadar bekle
+            rc = win32event.WaitForSingleObject(self.hWaitStop, int(seconds * 1000))
+            return rc == win32event.WAIT_OBJECT_0
+
+        scheduler.run_forever(main, wait=stop_requested,
+                              on_run=lambda s: metrics.publish_scheduler(s.status()))
+        logging.info("PDKS Sync Service durduruldu")
+        close_client()
+        logsetup.shutdown()
 
 if __name__ == '__main__':
     if len(sys.argv) == 1:
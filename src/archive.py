@@ -0,0 +1,426 @@
+"""Ham okutmalar ve giriş-çıkış çiftleri için aylık bölümlü sütunsal arşiv.
+
+Her tablo ay bazında (giris_tarihi'nin ayı) ayrı bir klasöre yazılır; her sütun
+tek bir düz ikili dosyadır (array modülü, sabit genişlikli tamsayılar). Satırlar
+(kullanıcı, zaman, id) sırasındadır ve bölüm başına kullanıcı dizini (users /
+offsets) tutulur. meta.json satır sayısını ve min/max istatistiklerini taşır:
+
+    ARCHIVE_DIR/<tablo>/<YYYY-MM>/meta.json, id.q, user.i, ts.q, [cikis.q, workday.i], users.i, offsets.q
+
+Sorgu aracı meta.json ile ilgisiz bölümleri atlar, kalan bölümlerin sütunlarını
+mmap ile açar ve kullanıcı/tarih aralığını ikili aramayla bulur; veritabanına
+bağlanmaz. Zamanlar saat dilimi olmadan epoch saniyesi olarak saklanır.
+
+Çalıştırma:
+    python -m src.archive export [--table raw|pairs|all] [--full]
+    python -m src.archive query --user 36 --from 2025-07-01 --to 2025-09-30 [--table pairs] [--json|--count]
+    python -m src.archive info [--table raw]
+
+Ham okutmalar yalnızca eklendiği için id watermark'ından sonraki satırlar
+alınır ve dokunulan aylar birleştirilerek yeniden yazılır. Çiftler yerinde
+güncellendiğinden yeni id'lerin ayları ile içinde bulunulan (ve ay başında
+önceki) ay her seferinde yeniden çekilir; eski aylardaki düzeltmeler için --full.
+"""
+import argparse
+import bisect
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+try:
+    from src import db, payroll
+except ImportError:  # python src/archive.py
+    import db
+    import payroll
+
+DEFAULT_ARCHIVE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'archive'))
+META_NAME = "meta.json"
+STATE_NAME = "state.json"
+NULL_TS = -(2 ** 63)
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+# Tablo tanımları: kaynak, okunan sütunlar ve arşiv sütunları (ad, array tip kodu)
+TABLES = {
+    "raw": {
+        "source": "personel_giris_cikis",
+        "select": "id,kullanici_id,giris_tarihi",
+        "columns": (("id", "q"), ("user", "i"), ("ts", "q")),
+        "append_only": True,
+    },
+    "pairs": {
+        "source": "personel_giris_cikis_duzenli",
+        "select": "id,kullanici_id,giris_tarihi,cikis_tarihi,workday_date",
+        "columns": (("id", "q"), ("user", "i"), ("ts", "q"), ("cikis", "q"), ("workday", "i")),
+        "append_only": False,
+    },
+}
+
+
+def _epoch(value):
+    """Zaman damgası metni -> epoch saniyesi (saat dilimli değerler UTC'ye indirgenir)"""
+    if not value:
+        return NULL_TS
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    offset = dt.utcoffset()
+    if offset is not None:
+        dt = dt.replace(tzinfo=None) - offset
+    delta = dt - _EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+def _ts_text(seconds):
+    if seconds == NULL_TS:
+        return None
+    return (_EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _encode(kind, row):
+    """Kaynak satırı arşiv sütun değerlerine çevir"""
+    values = (int(row["id"]), int(row["kullanici_id"]), _epoch(row["giris_tarihi"]))
+    if kind == "pairs":
+        workday = row.get("workday_date")
+        values += (_epoch(row.get("cikis_tarihi")),
+                   date.fromisoformat(str(workday)[:10]).toordinal() - _EPOCH_ORDINAL if workday else -1)
+    return values
+
+
+def decode(kind, values):
+    """Arşiv sütun değerlerini okunabilir satıra çevir"""
+    row = {"id": values[0], "kullanici_id": values[1], "giris_tarihi": _ts_text(values[2])}
+    if kind == "pairs":
+        row["cikis_tarihi"] = _ts_text(values[3])
+        row["workday_date"] = date.fromordinal(values[4] + _EPOCH_ORDINAL).isoformat() if values[4] >= 0 else None
+    return row
+
+
+def archive_dir():
+    # .env komut satırında modül import edildikten sonra yüklenir; yol kullanım anında okunur
+    return os.getenv("ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+
+def _table_dir(kind, root=None):
+    return os.path.join(root or archive_dir(), kind)
+
+
+def _read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class Partition:
+    """Tek ayın sütun dosyaları; sütunlar ilk erişimde mmap ile açılır"""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_json(os.path.join(path, META_NAME))
+        self._maps = []
+        self._columns = {}
+
+    def column(self, name, typecode=None):
+        view = self._columns.get(name)
+        if view is None:
+            typecode = typecode or dict(self.meta["columns"])[name]
+            with open(os.path.join(self.path, f"{name}.{typecode}"), 'rb') as f:
+                if self.meta["byteorder"] != sys.byteorder:
+                    data = array(typecode)
+                    data.frombytes(f.read())
+                    data.byteswap()
+                    view = data
+                else:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps.append(mapped)
+                    view = memoryview(mapped).cast(typecode)
+            self._columns[name] = view
+        return view
+
+    def rows(self, start=0, stop=None):
+        """[start, stop) aralığındaki satırların sütun değerleri"""
+        stop = self.meta["rows"] if stop is None else stop
+        columns = [self.column(name) for name, _ in self.meta["columns"]]
+        for i in range(start, stop):
+            yield tuple(col[i] for col in columns)
+
+    def user_range(self, user):
+        """Kullanıcının satırlarının [başlangıç, bitiş) aralığı (yoksa boş)"""
+        users = self.column("users", "i")
+        pos = bisect.bisect_left(users, user)
+        if pos >= len(users) or users[pos] != user:
+            return 0, 0
+        offsets = self.column("offsets", "q")
+        return offsets[pos], offsets[pos + 1]
+
+    def close(self):
+        for view in self._columns.values():
+            if isinstance(view, memoryview):
+                view.release()
+        self._columns.clear()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+
+
+def write_partition(kind, month, rows, root=None):
+    """Satırları (sütun değerleri) sıralayıp ayın bölümünü atomik olarak yeniden yaz"""
+    table_dir = _table_dir(kind, root)
+    final = os.path.join(table_dir, month)
+    if not rows:
+        if os.path.isdir(final):
+            shutil.rmtree(final)
+        return None
+    rows.sort(key=lambda r: (r[1], r[2], r[0]))
+    columns = TABLES[kind]["columns"]
+    tmp_dir = f"{final}.tmp"
+    if os.path.isdir(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for idx, (name, typecode) in enumerate(columns):
+        with open(os.path.join(tmp_dir, f"{name}.{typecode}"), 'wb') as f:
+            array(typecode, (r[idx] for r in rows)).tofile(f)
+
+    users, offsets = array('i'), array('q')
+    for i, r in enumerate(rows):
+        if not users or users[-1] != r[1]:
+            users.append(r[1])
+            offsets.append(i)
+    offsets.append(len(rows))
+    with open(os.path.join(tmp_dir, "users.i"), 'wb') as f:
+        users.tofile(f)
+    with open(os.path.join(tmp_dir, "offsets.q"), 'wb') as f:
+        offsets.tofile(f)
+
+    meta = {
+        "table": kind,
+        "month": month,
+        "rows": len(rows),
+        "columns": [list(c) for c in columns],
+        "byteorder": sys.byteorder,
+        "min_user": users[0],
+        "max_user": users[-1],
+        "min_ts": min(r[2] for r in rows),
+        "max_ts": max(r[2] for r in rows),
+        "max_id": max(r[0] for r in rows),
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    _write_json(os.path.join(tmp_dir, META_NAME), meta)
+    old = f"{final}.old"
+    if os.path.isdir(final):
+        if os.path.isdir(old):
+            shutil.rmtree(old)
+        os.rename(final, old)
+    os.rename(tmp_dir, final)
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+    return meta
+
+
+def partitions(kind, root=None):
+    """Tablonun bölüm klasörleri, aya göre sıralı"""
+    table_dir = _table_dir(kind, root)
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(os.path.join(table_dir, d) for d in os.listdir(table_dir)
+                  if len(d) == 7 and os.path.exists(os.path.join(table_dir, d, META_NAME)))
+
+
+def _fetch_by_months(client, spec, months, page_size):
+    """Ayların satırlarını sayfalı oku: {ay: [sütun değerleri]}"""
+    out = {m: [] for m in months}
+    for start, end in payroll.month_ranges(months):
+        for page in db.keyset_pages(lambda: client.table(spec["source"]).select(spec["select"])
+                                    .gte("giris_tarihi", start)
+                                    .lt("giris_tarihi", end), page_size):
+            for row in page:
+                bucket = out.get(payroll.month_of(row["giris_tarihi"]))
+                if bucket is not None:
+                    bucket.append(row)
+    return out
+
+
+def export(kind, full=False, client=None, root=None, page_size=None):
+    """Tabloyu arşive aktar (artımlı). Dönüş: {"months", "rows", "fetched"} özeti"""
+    spec = TABLES[kind]
+    client = client or db.get_client()
+    page_size = page_size or int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    table_dir = _table_dir(kind, root)
+    os.makedirs(table_dir, exist_ok=True)
+    state_path = os.path.join(table_dir, STATE_NAME)
+    last_id = 0 if full else int((_read_json(state_path, {}) or {}).get("last_id", 0))
+    # İlk aktarım zaten tüm satırları okur
+    full = full or not last_id
+    started = time.monotonic()
+
+    # Son aktarımdan sonra eklenen satırlar, aylara göre
+    new_rows = {}
+    max_id = last_id
+    fetched = 0
+    for page in db.keyset_pages(lambda: client.table(spec["source"]).select(spec["select"]),
+                                page_size, last_id):
+        fetched += len(page)
+        for row in page:
+            month = payroll.month_of(row.get("giris_tarihi"))
+            if month:
+                new_rows.setdefault(month, []).append(_encode(kind, row))
+        max_id = max(max_id, page[-1]["id"])
+
+    if full:
+        touched = {month: rows for month, rows in new_rows.items()}
+        # Kaynakta artık satırı olmayan eski bölümler
+        for path in partitions(kind, root):
+            touched.setdefault(os.path.basename(path), [])
+    elif spec["append_only"]:
+        touched = {}
+        for month, rows in new_rows.items():
+            merged = {}
+            existing = os.path.join(table_dir, month)
+            if os.path.isdir(existing):
+                part = Partition(existing)
+                try:
+                    merged = {r[0]: r for r in part.rows()}
+                finally:
+                    part.close()
+            merged.update((r[0], r) for r in rows)
+            touched[month] = list(merged.values())
+    else:
+        # Yerinde güncellenen tablo: dokunulan aylar kaynaktan yeniden okunur
+        months = set(new_rows) | payroll.default_months()
+        fetched_rows = _fetch_by_months(client, spec, months, page_size)
+        fetched += sum(len(rows) for rows in fetched_rows.values())
+        touched = {month: [_encode(kind, r) for r in rows] for month, rows in fetched_rows.items()}
+
+    written = 0
+    months = []
+    for month in sorted(touched):
+        meta = write_partition(kind, month, touched[month], root)
+        if meta:
+            written += meta["rows"]
+            months.append(month)
+    _write_json(state_path, {"last_id": max_id, "exported_at": datetime.now().isoformat(timespec="seconds")})
+
+    summary = {"months": months, "rows": written, "fetched": fetched}
+    print(f"🗃️ Arşiv ({kind}): {fetched} satır okundu, {len(months)} ay yazıldı ({written} satır), "
+          f"{time.monotonic() - started:.1f} sn")
+    return summary
+
+
+def query(kind, user=None, start=None, end=None, root=None, stats=None):
+    """Arşivden kullanıcı / tarih aralığı (start dahil, end dahil gün) sorgusu; satırları üretir"""
+    lo = _epoch(f"{start} 00:00:00") if start else None
+    hi = _epoch(f"{end} 00:00:00") + 86400 if end else None
+    first_month = start[:7] if start else None
+    last_month = end[:7] if end else None
+    stats = stats if stats is not None else {}
+    stats.update(partitions=0, scanned=0, skipped=0)
+    for path in partitions(kind, root):
+        month = os.path.basename(path)
+        if (first_month and month < first_month) or (last_month and month > last_month):
+            continue
+        part = Partition(path)
+        meta = part.meta
+        # min/max istatistikleriyle bölümü açmadan ele
+        if (user is not None and not meta["min_user"] <= user <= meta["max_user"]) or \
+                (lo is not None and meta["max_ts"] < lo) or (hi is not None and meta["min_ts"] >= hi):
+            stats["skipped"] += 1
+            continue
+        stats["partitions"] += 1
+        try:
+            if user is not None:
+                begin, stop = part.user_range(user)
+                ts = part.column("ts")
+                # Kullanıcının satırları zamana göre sıralı
+                if lo is not None:
+                    begin = bisect.bisect_left(ts, lo, begin, stop)
+                if hi is not None:
+                    stop = bisect.bisect_left(ts, hi, begin, stop)
+                stats["scanned"] += max(0, stop - begin)
+                for values in part.rows(begin, stop):
+                    yield decode(kind, values)
+            else:
+                stats["scanned"] += meta["rows"]
+                for values in part.rows():
+                    if (lo is None or values[2] >= lo) and (hi is None or values[2] < hi):
+                        yield decode(kind, values)
+        finally:
+            part.close()
+
+
+def info(kind, root=None):
+    total_rows = total_bytes = 0
+    for path in partitions(kind, root):
+        meta = _read_json(os.path.join(path, META_NAME))
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        total_rows += meta["rows"]
+        total_bytes += size
+        print(f"{meta['month']}  {meta['rows']:>9} satır  {size / 1024:>9.1f} KB  "
+              f"kullanıcı {meta['min_user']}-{meta['max_user']}  "
+              f"{_ts_text(meta['min_ts'])} → {_ts_text(meta['max_ts'])}")
+    print(f"Toplam ({kind}): {total_rows} satır, {total_bytes / 1024 / 1024:.2f} MB")
+
+
+def main(argv=None):
+    db.load_env()
+    parser = argparse.ArgumentParser(description="Okutma / çift arşivi")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="Supabase'den arşive aktar")
+    p_export.add_argument("--table", choices=["raw", "pairs", "all"], default="all")
+    p_export.add_argument("--full", action="store_true", help="tüm geçmişi yeniden aktar")
+    p_query = sub.add_parser("query", help="arşivde ara (veritabanına bağlanmaz)")
+    p_query.add_argument("--table", choices=["raw", "pairs"], default="raw")
+    p_query.add_argument("--user", type=int)
+    p_query.add_argument("--from", dest="start", help="YYYY-MM-DD (dahil)")
+    p_query.add_argument("--to", dest="end", help="YYYY-MM-DD (dahil)")
+    output = p_query.add_mutually_exclusive_group()
+    output.add_argument("--json", action="store_true", help="satır başına bir JSON")
+    output.add_argument("--count", action="store_true", help="yalnızca sayı")
+    p_info = sub.add_parser("info", help="bölümleri listele")
+    p_info.add_argument("--table", choices=["raw", "pairs"], default="raw")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        kinds = ["raw", "pairs"] if args.table == "all" else [args.table]
+        for kind in kinds:
+            export(kind, full=args.full)
+        db.close_client()
+    elif args.command == "query":
+        for value in (args.start, args.end):
+            if value:
+                try:
+                    date.fromisoformat(value)
+                except ValueError:
+                    parser.error(f"tarih YYYY-MM-DD biçiminde olmalı: {value}")
+        started = time.perf_counter()
+        stats = {}
+        count = 0
+        for row in query(args.table, args.user, args.start, args.end, stats=stats):
+            count += 1
+            if args.json:
+                print(json.dumps(row, ensure_ascii=False))
+            elif not args.count:
+                line = f"{row['kullanici_id']:>6}  {row['giris_tarihi']}"
+                if args.table == "pairs":
+                    line += f"  →  {row['cikis_tarihi'] or '-':<19}  ({row['workday_date']})"
+                print(line)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{count} kayıt, {stats['partitions']} bölüm okundu ({stats['skipped']} atlandı), "
+              f"{elapsed:.1f} ms", file=sys.stderr if args.json else sys.stdout)
+    else:
+        info(args.table)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
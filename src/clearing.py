@@ -0,0 +1,259 @@
+"""Doğrulanmış, önce arşivleyen haftalık cihaz temizleme.
+
+SYNC_CLEAR_DEVICE_DATA=true iken cihaz kayıtları SYNC_CLEAR_DAY gününde
+(0=Pazartesi ... 6=Pazar, varsayılan 0) haftada bir temizlenir. O gün sync
+çalışmadıysa temizleme sonraki ilk döngüde yapılır. Her cihaz için sırayla:
+
+    1. cihaz kilitlenir (disable_device), temizleme bitene kadar okutma alınmaz,
+    2. kayıtların tamamı okunur; en yeni kaydın zamanı kesim noktasıdır,
+    3. tüm anahtarların personel_giris_cikis'te olduğu tek sorguyla doğrulanır
+       (verify_device_punches RPC'si: add_verify_device_punches.sql),
+    4. döküm device_archive/<cihaz>/<zaman>.ndjson.gz olarak diske yazılır,
+    5. cihaz temizlenir ve kilidi açılır (enable_device).
+
+Doğrulanamayan, arşivlenemeyen ya da kuyruğunda gönderilmemiş kayıt olan cihaz
+temizlenmez, sonraki döngüde tekrar denenir. Sonuçlar last_clear_date.json'a
+yazılır (cihaz başına son temizleme zamanı, kayıt sayısı, kesim, arşiv yolu ya
+da hata). Dosya silinirse sonraki döngüde temizleme yapılır.
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+try:
+    from src import db, metrics
+except ImportError:  # python src/sync.py
+    import db
+    import metrics
+
+log = logging.getLogger("pdks.clearing")
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DEFAULT_SCHEDULE_FILE = os.path.join(ROOT_DIR, "last_clear_date.json")
+DEFAULT_ARCHIVE_DIR = os.path.join(ROOT_DIR, "device_archive")
+RAW_TABLE = "personel_giris_cikis"
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+MISSING_REPORT_LIMIT = 20
+
+
+def enabled():
+    return os.getenv("SYNC_CLEAR_DEVICE_DATA", "false").lower() == "true"
+
+
+def clear_day():
+    day = int(os.getenv("SYNC_CLEAR_DAY", "0"))
+    if not 0 <= day <= 6:
+        raise ValueError(f"SYNC_CLEAR_DAY 0-6 arasında olmalı: {day}")
+    return day
+
+
+def schedule_file():
+    # .env modül import edildikten sonra yüklenir; yol kullanım anında okunur
+    return os.getenv("SYNC_CLEAR_STATE_FILE", DEFAULT_SCHEDULE_FILE)
+
+
+def archive_dir():
+    return os.getenv("SYNC_CLEAR_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+
+def load_schedule(path=None):
+    path = path or schedule_file()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {"devices": {}}
+    except (OSError, ValueError) as e:
+        log.warning(f"⚠️ Son temizleme tarihi okunamadı: {e}")
+        return {"devices": {}}
+    data.setdefault("devices", {})
+    return data
+
+
+def save_schedule(schedule, path=None):
+    path = path or schedule_file()
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(schedule, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.warning(f"⚠️ Son temizleme tarihi güncellenemedi: {e}")
+
+
+def is_due(schedule, device, now=None, day=None):
+    """Bu haftanın temizleme günü geldiyse ve o günden beri cihaz temizlenmediyse True"""
+    now = now or datetime.now()
+    day = clear_day() if day is None else day
+    slot = (now - timedelta(days=(now.weekday() - day) % 7)).date()
+    if schedule["devices"]:
+        last = (schedule["devices"].get(device) or {}).get("last_clear_date")
+    else:
+        # Eski biçimdeki dosya: tek bir last_clear_date tüm cihazlar için
+        last = schedule.get("last_clear_date")
+    if not last:
+        return True
+    return datetime.strptime(last[:19], _TS_FORMAT).date() < slot
+
+
+def _key(user_id, timestamp):
+    ts = timestamp.strftime(_TS_FORMAT) if isinstance(timestamp, datetime) else str(timestamp)
+    return str(user_id).strip(), ts.replace("T", " ")[:19]
+
+
+def _missing_by_select(client, keys, page_size):
+    """RPC yoksa: döküm aralığındaki anahtarları sayfalı okuyup karşılaştır"""
+    times = [t for _, t in keys]
+    found = set()
+    for page in db.keyset_pages(lambda: client.table(RAW_TABLE)
+                                .select("id,kullanici_id,giris_tarihi")
+                                .gte("giris_tarihi", min(times))
+                                .lte("giris_tarihi", max(times)), page_size):
+        found.update(_key(r["kullanici_id"], r["giris_tarihi"]) for r in page)
+    return sorted(k for k in keys if k not in found)
+
+
+def find_missing(dump, client=None, page_size=None):
+    """Dökümdeki anahtarlardan Supabase'de olmayanları bul.
+    Dönüş: (eksik sayısı, ilk eksik anahtarlar).
+    """
+    client = client or db.get_client()
+    keys = sorted({_key(a.user_id, a.timestamp) for a in dump})
+    if not keys:
+        return 0, []
+    if all(user.isdigit() for user, _ in keys):
+        try:
+            response = client.rpc("verify_device_punches", {
+                "p_kullanici_ids": [int(user) for user, _ in keys],
+                "p_zamanlar": [ts for _, ts in keys],
+            }).execute()
+            rows = response.data or []
+            row = rows[0] if isinstance(rows, list) else rows
+            missing = [_key(m["kullanici_id"], m["giris_tarihi"]) for m in row.get("eksik") or []]
+            return int(row["toplam"]) - int(row["bulunan"]), missing
+        except Exception as e:
+            log.warning(f"⚠️ verify_device_punches çağrılamadı, kayıtlar sayfalı karşılaştırılıyor: {e}")
+            if "verify_device_punches" in str(e):
+                log.warning("   add_verify_device_punches.sql'i Supabase SQL Editor'da çalıştırın.")
+    page_size = page_size or int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    missing = _missing_by_select(client, keys, page_size)
+    return len(missing), missing[:MISSING_REPORT_LIMIT]
+
+
+def write_archive(device, dump, now=None, root=None):
+    """Cihaz dökümünü gzip'li NDJSON olarak yaz (geçici dosya + fsync + rename); yolu döndür"""
+    now = now or datetime.now()
+    folder = os.path.join(root or archive_dir(), device.replace(":", "_"))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{now:%Y%m%d_%H%M%S}.ndjson.gz")
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            for a in dump:
+                f.write(json.dumps({
+                    "user_id": str(a.user_id),
+                    "timestamp": _key(a.user_id, a.timestamp)[1],
+                    "uid": getattr(a, "uid", None),
+                    "status": getattr(a, "status", None),
+                    "punch": getattr(a, "punch", None),
+                }, ensure_ascii=False).encode('utf-8') + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def clear_device(result, client=None, now=None):
+    """Tek cihazı doğrulayıp arşivledikten sonra temizle.
+    Dönüş: {"status": "ok" | "empty" | "error", "records", "cutoff", "archive", "error"}.
+    """
+    conn = result["conn"]
+    device = result["device"]
+    outcome = {"status": "error", "records": 0, "cutoff": None, "archive": None, "error": None}
+    locked = False
+    try:
+        # Döküm ile temizleme arasında gelen okutma silinmesin
+        conn.disable_device()
+        locked = True
+        with metrics.span("clear_dump", device):
+            dump = conn.get_attendance()
+        outcome["records"] = len(dump)
+        if not dump:
+            outcome["status"] = "empty"
+            return outcome
+        outcome["cutoff"] = max(_key(a.user_id, a.timestamp)[1] for a in dump)
+        with metrics.span("clear_verify", device):
+            missing_count, missing = find_missing(dump, client)
+        if missing_count:
+            shown = ", ".join(f"{user} {ts}" for user, ts in missing[:5])
+            outcome["error"] = f"{missing_count} kayıt Supabase'de yok ({shown}{' ...' if missing_count > 5 else ''})"
+            return outcome
+        with metrics.span("clear_archive", device):
+            outcome["archive"] = write_archive(device, dump, now)
+        with metrics.span("clear", device):
+            conn.clear_attendance()
+        outcome["status"] = "ok"
+        return outcome
+    except Exception as e:
+        outcome["error"] = str(e) or e.__class__.__name__
+        return outcome
+    finally:
+        if locked:
+            try:
+                conn.enable_device()
+            except Exception as e:
+                log.error(f"⚠️ Cihaz kilidi açılamadı ({result['site']}): {e}")
+
+
+def run(results, state, queue_depth, client=None, now=None):
+    """Temizleme zamanı gelen cihazları temizle, sonuçları last_clear_date.json'a yaz.
+    Dönüş: temizlenen cihaz sayısı.
+    """
+    if not enabled():
+        log.info("ℹ️ Cihaz temizleme kapalı (SYNC_CLEAR_DEVICE_DATA=false)")
+        return 0
+    if queue_depth:
+        log.info(f"ℹ️ Kuyrukta {queue_depth} kayıt Supabase'e gönderilmeyi bekliyor, cihaz temizlenmedi")
+        return 0
+    now = now or datetime.now()
+    schedule = load_schedule()
+    due = [r for r in results if r["conn"] is not None and is_due(schedule, r["device"], now)]
+    if not due:
+        log.info("ℹ️ Haftalık temizleme zamanı henüz gelmedi")
+        return 0
+
+    cleared = 0
+    for result in due:
+        device = result["device"]
+        log.info(f"🧹 Haftalık cihaz temizleme başlatılıyor ({result['site']})...")
+        outcome = clear_device(result, client, now)
+        entry = schedule["devices"].setdefault(device, {})
+        entry["last_attempt"] = now.strftime(_TS_FORMAT)
+        entry["last_status"] = outcome["status"]
+        entry["last_error"] = outcome["error"]
+        if outcome["status"] == "error":
+            log.error(f"⚠️ Cihaz temizlenmedi ({result['site']}): {outcome['error']}")
+            log.info("Veriler cihazda duruyor, sonraki döngüde tekrar denenecek")
+            metrics.inc("clear_failures")
+            continue
+        entry["last_clear_date"] = now.strftime(_TS_FORMAT)
+        entry["records"] = outcome["records"]
+        entry["cutoff"] = outcome["cutoff"]
+        entry["archive"] = outcome["archive"]
+        # Temizlenen cihazın sayaçları sıfırlandı; sonraki döngü sayaçtan bağımsız okur
+        state.forget_device_records(device)
+        cleared += 1
+        if outcome["status"] == "empty":
+            log.info(f"✅ Cihazda kayıt yok, temizlemeye gerek kalmadı ({result['site']})")
+        else:
+            metrics.inc("cleared_records", outcome["records"])
+            log.info(f"✅ Cihazdaki veriler başarıyla temizlendi ({result['site']}): {outcome['records']} kayıt, "
+                     f"son kayıt {outcome['cutoff']}, arşiv {outcome['archive']}")
+    schedule["last_clear_date"] = max(
+        (e["last_clear_date"] for e in schedule["devices"].values() if e.get("last_clear_date")), default=None)
+    save_schedule(schedule)
+    if cleared:
+        log.info(f"Son temizleme tarihi güncellendi: {now:%Y-%m-%d %H:%M:%S}")
+    return cleared
@@ -166,36 +166,68 @@ const MaasHesabi = () => {
       }
       const monthEnd = `${endYear}-${endMonth.toString().padStart(2, '0')}-01`;
 
-      const { data: tumKayitlar, error: calismaError } = await supabase
-        .from('personel_giris_cikis_duzenli')
-        .select('kullanici_id, giris_tarihi, cikis_tarihi, workday_date')
-        .gte('giris_tarihi', monthStart)
-        .lt('giris_tarihi', monthEnd);
-
-      if (calismaError) throw calismaError;
-
-      const kayitlarByUser = {};
-      (tumKayitlar || []).forEach((record) => {
-        if (!kayitlarByUser[record.kullanici_id]) {
-          kayitlarByUser[record.kullanici_id] = [];
-        }
-        kayitlarByUser[record.kullanici_id].push(record);
-      });
+      // Önce sync tarafında hesaplanan aylık özet okunur (src/payroll.py);
+      // özet yoksa ya da ayda henüz özete yansımamış bir değişiklik varsa
+      // (personel_aylik_ozet_kirli) ay içindeki tüm düzenli kayıtlar indirilip burada toplanır.
+      const ozetByUser = {};
+      const [
+        { data: ozetler, error: ozetError },
+        { data: kirliAylar, error: kirliError },
+      ] = await Promise.all([
+        supabase
+          .from('personel_aylik_ozet')
+          .select('kullanici_id, toplam_saat, calisilan_gun')
+          .eq('ay', monthStart),
+        supabase
+          .from('personel_aylik_ozet_kirli')
+          .select('ay')
+          .eq('ay', monthStart),
+      ]);
+      const ozetGuncel = !kirliError && !(kirliAylar && kirliAylar.length);
+
+      if (ozetGuncel && !ozetError && ozetler && ozetler.length) {
+        ozetler.forEach((ozet) => {
+          ozetByUser[ozet.kullanici_id] = {
+            toplamSaat: Number(ozet.toplam_saat) || 0,
+            calisilanGun: ozet.calisilan_gun || 0,
+          };
+        });
+      } else {
+        const { data: tumKayitlar, error: calismaError } = await supabase
+          .from('personel_giris_cikis_duzenli')
+          .select('kullanici_id, giris_tarihi, cikis_tarihi, workday_date')
+          .gte('giris_tarihi', monthStart)
+          .lt('giris_tarihi', monthEnd);
+
+        if (calismaError) throw calismaError;
+
+        const gunlerByUser = {};
+        (tumKayitlar || []).forEach((record) => {
+          if (!ozetByUser[record.kullanici_id]) {
+            ozetByUser[record.kullanici_id] = { toplamSaat: 0, calisilanGun: 0 };
+            gunlerByUser[record.kullanici_id] = new Set();
+          }
+          const day = record.workday_date || record.giris_tarihi?.split('T')[0];
+          if (day) gunlerByUser[record.kullanici_id].add(day);
+          if (record.cikis_tarihi) {
+            const giris = new Date(record.giris_tarihi);
+            const cikis = new Date(record.cikis_tarihi);
+            ozetByUser[record.kullanici_id].toplamSaat += (cikis - giris) / (1000 * 60 * 60);
+          }
+        });
+        Object.keys(gunlerByUser).forEach((userId) => {
+          ozetByUser[userId].calisilanGun = gunlerByUser[userId].size;
+        });
+      }
 
       const raporData = [];
 
       for (const maas of maasData) {
         const maasTipi = getPersonelMaasTipi(maas.personel);
-        const calismaData = kayitlarByUser[maas.kullanici_id] || [];
+        const ozet = ozetByUser[maas.kullanici_id] || { toplamSaat: 0, calisilanGun: 0 };
 
         if (maasTipi === 'gunluk') {
-          const gunler = new Set();
-          calismaData.forEach((record) => {
-            const day = record.workday_date || record.giris_tarihi?.split('T')[0];
-            if (day) gunler.add(day);
-          });
-
-          const calisilanGun = gunler.size;
+          const calisilanGun = ozet.calisilanGun;
           const hedef = getHedefDeger('gunluk', hedefAyarlari);
           const gunlukUcret = calcBirimUcret(maas.aylik_maas, 'gunluk', hedefAyarlari);
           const hesaplananMaas = calisilanGun * gunlukUcret;
@@ -214,16 +246,7 @@ const MaasHesabi = () => {
             fark,
           });
         } else {
-          let toplamSaat = 0;
-          calismaData.forEach((record) => {
-            if (record.cikis_tarihi) {
-              const giris = new Date(record.giris_tarihi);
-              const cikis = new Date(record.cikis_tarihi);
-              const saatFarki = (cikis - giris) / (1000 * 60 * 60);
-              toplamSaat += saatFarki;
-            }
-          });
-
+          const toplamSaat = ozet.toplamSaat;
           const hedef = getHedefDeger('saatli', hedefAyarlari);
           const saatlikUcret = calcBirimUcret(maas.aylik_maas, 'saatli', hedefAyarlari);
           const hesaplananMaas = toplamSaat * saatlikUcret;
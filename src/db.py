@@ -0,0 +1,140 @@
+"""Paylaşılan Supabase istemcisi.
+
+İstemci ilk kullanımda oluşturulur (import sırasında ağ/anahtar kontrolü yapılmaz)
+ve tüm giriş noktaları (sync, sync_loop, servis, yedekleme, backfill) aynı
+istemciyi kullanır. Altta keep-alive havuzlu tek bir httpx.Client vardır; h2
+paketi yüklüyse HTTP/2 açılır. Böylece 5 dakikalık döngüler sıcak bağlantıları
+yeniden kullanır. Ayarlar:
+
+    SUPABASE_HTTP2             true/false (varsayılan: h2 yüklüyse true)
+    SUPABASE_TIMEOUT           istek zaman aşımı, sn (varsayılan 30)
+    SUPABASE_CONNECT_TIMEOUT   bağlantı zaman aşımı, sn (varsayılan 10)
+    SUPABASE_POOL_SIZE         en fazla eşzamanlı bağlantı (varsayılan 20)
+    SUPABASE_KEEPALIVE         havuzda açık tutulan bağlantı (varsayılan 10)
+    SUPABASE_KEEPALIVE_EXPIRY  boştaki bağlantının ömrü, sn (varsayılan 360)
+"""
+import atexit
+import os
+import threading
+
+DEFAULT_SUPABASE_URL = "https://adpopdmavlseifoxpobo.supabase.co"
+ENV_FILE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+
+_client = None
+_http = None
+_lock = threading.Lock()
+
+
+def _http2_enabled():
+    value = os.getenv("SUPABASE_HTTP2")
+    if value is not None:
+        return value.lower() == "true"
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _make_http_client():
+    import httpx
+
+    try:
+        from src import metrics
+    except ImportError:  # python src/sync.py
+        import metrics
+
+    timeout = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+    return httpx.Client(
+        http2=_http2_enabled(),
+        follow_redirects=True,
+        # İstek sayıları döngü ölçümlerine yazılır (src/metrics.py)
+        event_hooks={"request": [metrics.on_http_request], "response": [metrics.on_http_response]},
+        timeout=httpx.Timeout(timeout, connect=float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "10"))),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("SUPABASE_POOL_SIZE", "20")),
+            max_keepalive_connections=int(os.getenv("SUPABASE_KEEPALIVE", "10")),
+            # 5 dakikalık döngü aralığından uzun tutulur ki bağlantı bir sonraki döngüde hazır olsun
+            keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "360")),
+        ),
+    )
+
+
+def load_env():
+    """Ana dizindeki .env dosyasını yükle; tanımlı ortam değişkenleri ezilmez.
+    python -m ile çalışan komut satırı araçları ayarları okumadan önce çağırır.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return False
+    return load_dotenv(ENV_FILE)
+
+
+def get_client():
+    """Paylaşılan Supabase istemcisini döndür, yoksa oluştur"""
+    global _client, _http
+    if _client is not None:
+        return _client
+    with _lock:
+        if _client is not None:
+            return _client
+        from supabase import create_client
+
+        url = os.getenv("SUPABASE_URL") or os.getenv("REACT_APP_SUPABASE_URL") or DEFAULT_SUPABASE_URL
+        key = os.getenv("SUPABASE_SERVICE_KEY")
+        if not key:
+            raise RuntimeError(
+                "SUPABASE_SERVICE_KEY ortam değişkeni tanımlı değil. Lütfen Service Role key ile ayarlayın."
+            )
+
+        http = _make_http_client()
+        try:
+            from supabase import ClientOptions
+            client = create_client(url, key, options=ClientOptions(httpx_client=http))
+        except TypeError:
+            # Eski supabase sürümleri dışarıdan httpx istemcisi kabul etmez
+            http.close()
+            http = None
+            client = create_client(url, key)
+        _http, _client = http, client
+        return _client
+
+
+def close_client():
+    """Bağlantı havuzunu kapat; sonraki get_client() yeni istemci oluşturur"""
+    global _client, _http
+    with _lock:
+        http, _http, _client = _http, None, None
+    if http is not None:
+        try:
+            http.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_client)
+
+
+def keyset_pages(make_query, page_size, after_id=0, key="id"):
+    """make_query() ile kurulan sorguyu `key`'e göre artan keyset sayfalarıyla oku.
+    Offset'li sayfalamadan farklı olarak derin sayfalarda da indeks kullanılır.
+    """
+    while True:
+        result = make_query().gt(key, after_id).order(key, desc=False).limit(page_size).execute()
+        page = getattr(result, 'data', None) or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1][key]
+
+
+class _LazyClient:
+    """Modül düzeyinde `supabase` adı için: ilk öznitelik erişiminde istemciyi oluşturur"""
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+client = _LazyClient()
@@ -0,0 +1,270 @@
+"""Birden fazla ZK terminalinden eşzamanlı veri toplama.
+
+Cihaz listesi SYNC_DEVICES (JSON) ortam değişkeninden ya da proje kökündeki
+devices.json dosyasından okunur, örnek:
+
+    [{"ip": "192.168.0.139", "port": 4370, "site": "Merkez", "timeout": 10},
+     {"ip": "192.168.1.20", "site": "Depo", "timeout": 5}]
+
+Tanımlı değilse eski tek cihaz (192.168.0.139:4370) kullanılır. Her cihazın kendi
+zaman aşımı ve devre kesicisi vardır; üst üste hata veren cihaz bir süre atlanır,
+böylece yavaş ya da kapalı bir terminal bütün döngüyü bekletmez.
+
+Değişiklik tespiti: bağlandıktan sonra önce cihazın kayıt ve kullanıcı sayaçları
+okunur (pyzk read_sizes). Sayaçlar yerel durumdakiyle (sync_state) aynıysa kayıt
+ve/veya kullanıcı listesi indirilmez, kullanıcılar önbellekten gelir. Sayaçların
+yakalayamadığı değişiklikler (isim düzeltmesi, temizleyip aynı sayıda okutma) için
+SYNC_DEVICE_FULL_READ_SECONDS'da (varsayılan 3600) bir tam okuma yapılır.
+SYNC_DEVICE_CHANGE_DETECTION=false ile kapatılır.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    from src import metrics
+except ImportError:  # python src/sync.py
+    import metrics
+
+log = logging.getLogger("pdks.devices")
+
+DEFAULT_DEVICES = [{"ip": "192.168.0.139", "port": 4370, "site": "Merkez", "timeout": 10}]
+DEFAULT_DEVICES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'devices.json')
+
+
+def device_key(cfg):
+    return f"{cfg['ip']}:{cfg.get('port', 4370)}"
+
+
+def load_devices():
+    """Cihaz listesini ortam değişkeni, devices.json veya varsayılandan oku"""
+    raw = os.getenv("SYNC_DEVICES")
+    if not raw:
+        path = os.getenv("SYNC_DEVICES_FILE", DEFAULT_DEVICES_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+    devices = json.loads(raw) if raw else DEFAULT_DEVICES
+    out = []
+    for cfg in devices:
+        cfg = dict(cfg)
+        cfg.setdefault("port", 4370)
+        cfg.setdefault("timeout", 10)
+        cfg.setdefault("site", device_key(cfg))
+        out.append(cfg)
+    return out
+
+
+class CircuitBreaker:
+    """Üst üste `threshold` hatadan sonra cihazı `cooldown` saniye devre dışı bırakır.
+    Süre dolunca tek bir deneme yapılır (yarı açık); başarılı olursa devre kapanır.
+    """
+
+    def __init__(self, threshold=None, cooldown=None):
+        # Ayarlar kullanım anında okunur (.env, modül import edildikten sonra yüklenir)
+        self.threshold = threshold if threshold is not None else int(
+            os.getenv("SYNC_DEVICE_FAILURE_THRESHOLD", "3"))
+        self.cooldown = cooldown if cooldown is not None else float(
+            os.getenv("SYNC_DEVICE_COOLDOWN_SECONDS", "600"))
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.allow() else "open"
+
+
+# Devre kesiciler süreç boyunca (sync_loop döngüleri arasında) korunur
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(key):
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker()
+        return _breakers[key]
+
+
+def make_zk(cfg):
+    """Cihaz ayarından pyzk bağlantı nesnesi üret"""
+    from zk import ZK
+    return ZK(cfg["ip"], port=cfg["port"], timeout=cfg["timeout"])
+
+
+def read_counters(conn):
+    """Cihazın kayıt sayısı ve kullanıcı parmak izi (read_sizes); okunamazsa None"""
+    try:
+        conn.read_sizes()
+        fingerprint = ":".join(str(int(getattr(conn, name, 0) or 0))
+                               for name in ("users", "fingers", "faces", "cards"))
+        return {"records": int(conn.records), "users_fp": fingerprint}
+    except Exception as e:
+        log.debug("Cihaz sayaçları okunamadı: %s", e)
+        return None
+
+
+def _read_device(cfg, zk_factory, snapshot=None, detect=False):
+    """Cihazdan kullanıcı ve kayıtları oku.
+    detect=True iken önce sayaçlar okunur; snapshot'takiyle aynıysa indirme atlanır
+    (kullanıcılar snapshot'tan gelir). Dönüşteki "unchanged" neyin atlandığını gösterir.
+    """
+    key = device_key(cfg)
+    started = time.monotonic()
+    with metrics.span("connect", key):
+        conn = zk_factory(cfg).connect()
+    try:
+        counters = None
+        if detect:
+            with metrics.span("read_sizes", key):
+                counters = read_counters(conn)
+        full_read_seconds = float(os.getenv("SYNC_DEVICE_FULL_READ_SECONDS", "3600"))
+        known = counters is not None and snapshot is not None \
+            and time.time() - snapshot["full_at"] < full_read_seconds
+        users_same = known and snapshot["users"] is not None and counters["users_fp"] == snapshot["users_fp"]
+        records_same = known and counters["records"] == snapshot["records"]
+
+        if users_same:
+            users = dict(snapshot["users"])
+        else:
+            with metrics.span("get_users", key):
+                users = {user.user_id: user.name for user in conn.get_users()}
+        if records_same:
+            attendance = []
+        else:
+            with metrics.span("get_attendance", key):
+                attendance = conn.get_attendance()
+    except Exception:
+        try:
+            conn.disconnect()
+        except Exception:
+            pass
+        raise
+    return {
+        "conn": conn,
+        "users": users,
+        "attendance": attendance,
+        "counters": counters,
+        "unchanged": {"users": users_same, "attendance": records_same},
+        "seconds": time.monotonic() - started,
+    }
+
+
+def _disconnect_late(future):
+    """Süresi geçtikten sonra tamamlanan okumanın bağlantısını kapat"""
+    try:
+        future.result()["conn"].disconnect()
+    except Exception:
+        pass
+
+
+def collect(devices=None, zk_factory=make_zk, state=None):
+    """Tüm cihazlardan kullanıcı ve kayıtları eşzamanlı oku.
+    Her cihaz için {"device", "site", "conn", "users", "attendance", "counters", "unchanged",
+    "seconds", "error"} döner. state (SyncState) verilirse değişiklik tespiti yapılır:
+    sayaçları değişmeyen cihazın kayıtları indirilmez ("attendance" boş döner).
+    Bağlantılar açık bırakılır; çağıran işini bitirince disconnect_all() çağırmalıdır.
+    """
+    devices = devices if devices is not None else load_devices()
+    detect = state is not None and os.getenv("SYNC_DEVICE_CHANGE_DETECTION", "true").lower() == "true"
+    results = []
+    futures = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, len(devices)))
+    try:
+        for cfg in devices:
+            key = device_key(cfg)
+            result = {"device": key, "site": cfg["site"], "conn": None, "users": {},
+                      "attendance": [], "counters": None, "unchanged": {"users": False, "attendance": False},
+                      "seconds": 0.0, "error": None}
+            results.append(result)
+            breaker = breaker_for(key)
+            if not breaker.allow():
+                result["error"] = f"devre açık ({breaker.failures} ardışık hata), atlandı"
+                continue
+            # SQLite bağlantısı thread'ler arasında paylaşılmaz: snapshot burada okunur
+            snapshot = state.device_snapshot(key) if detect else None
+            futures[pool.submit(_read_device, cfg, zk_factory, snapshot, detect)] = (cfg, result, breaker)
+
+        # Bir cihaz socket zaman aşımını aşsa bile döngü en fazla 3 x timeout bekler
+        deadline = max([3 * float(cfg["timeout"]) for cfg, _, _ in futures.values()] or [0])
+        done, not_done = wait(futures, timeout=deadline)
+        for future in done:
+            cfg, result, breaker = futures[future]
+            try:
+                result.update(future.result())
+                breaker.record_success()
+            except Exception as e:
+                result["error"] = str(e) or e.__class__.__name__
+                breaker.record_failure()
+        for future in not_done:
+            cfg, result, breaker = futures[future]
+            result["error"] = f"{deadline:.0f} sn içinde yanıt vermedi"
+            breaker.record_failure()
+            future.add_done_callback(_disconnect_late)
+    finally:
+        # Takılan cihaz okuması döngüyü bekletmesin
+        pool.shutdown(wait=False)
+
+    for result in results:
+        metrics.gauge("device_up", 0 if result["error"] else 1, result["device"])
+        if result["error"]:
+            log.warning(f"⚠️ Cihaz {result['site']} ({result['device']}): {result['error']}")
+            continue
+        counters = result["counters"]
+        unchanged = result["unchanged"]
+        records = counters["records"] if unchanged["attendance"] else len(result["attendance"])
+        metrics.gauge("device_users", len(result["users"]), result["device"])
+        metrics.gauge("device_records", records, result["device"])
+        metrics.inc("device_downloads_skipped", sum(1 for v in unchanged.values() if v))
+        log.info(f"📟 Cihaz {result['site']} ({result['device']}): {len(result['users'])} kullanıcı"
+                 f"{' (değişmedi)' if unchanged['users'] else ''}, {records} kayıt"
+                 f"{' (değişmedi, indirilmedi)' if unchanged['attendance'] else ''}, {result['seconds']:.1f} sn")
+    return results
+
+
+def remember(results, state):
+    """Okunan cihazların sayaçlarını kaydet; sonraki döngü değişmeyen cihazı indirmez.
+    Kayıtlar yerel kuyruğa yazıldıktan sonra çağrılmalıdır, yoksa kuyruğa girmeden kaybolan
+    kayıtlar bir sonraki tam okumaya kadar atlanır.
+    """
+    for result in results:
+        counters = result.get("counters")
+        if result["error"] or counters is None:
+            continue
+        unchanged = result["unchanged"]
+        # Sayaçlar indirmeden önce okundu; arada gelen okutma sonraki döngüde yakalanır
+        full = not unchanged["users"] and not unchanged["attendance"]
+        state.save_device_snapshot(result["device"], counters["records"], counters["users_fp"],
+                                   None if unchanged["users"] else result["users"],
+                                   time.time() if full else None)
+
+
+def disconnect_all(results):
+    for result in results:
+        conn = result.get("conn")
+        if conn is None:
+            continue
+        try:
+            conn.disconnect()
+        except Exception as e:
+            log.warning(f"⚠️ Cihaz bağlantısı kapatılamadı ({result['device']}): {e}")
+        result["conn"] = None
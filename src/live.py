@@ -0,0 +1,180 @@
+"""Canlı mod: terminalin olay akışından (live capture) anlık veri aktarımı.
+
+Her cihaz için tek bir bağlantı açık tutulur ve pyzk live_capture() olayları
+okunur. Kayıtlar küçük partiler halinde (LIVE_BATCH_SIZE kayıt dolunca veya en
+eski kayıt LIVE_FLUSH_SECONDS saniyeyi geçince) normal yazma yoluna
+(sync.ingest_records: yerel durum, pending günlüğü, toplu upsert) verilir.
+Kaçırılan olaylar için bağlantı kurulunca ve her LIVE_RECONCILE_SECONDS saniyede
+bir tam okuma (get_attendance) ile uzlaştırma yapılır; yerel durum zaten
+gönderilmiş kayıtları eler. Bağlantı koparsa LIVE_RECONNECT_MAX saniyeye kadar
+artan beklemeyle yeniden bağlanılır.
+
+Çalıştırma (sync_loop.py yerine):
+    python -m src.live
+Loglar sync_loop.py'deki gibi logs/sync.log'a yazılır.
+Cihaz temizleme (SYNC_CLEAR_DEVICE_DATA) bu modda yapılmaz.
+"""
+import logging
+import os
+import threading
+import time
+
+try:
+    from src import devices, logsetup, sync
+except ImportError:  # python src/live.py
+    import devices
+    import logsetup
+    import sync
+
+log = logging.getLogger("pdks.live")
+
+BATCH_SIZE = int(os.getenv("LIVE_BATCH_SIZE", "50"))
+FLUSH_SECONDS = float(os.getenv("LIVE_FLUSH_SECONDS", "2"))
+RECONCILE_SECONDS = float(os.getenv("LIVE_RECONCILE_SECONDS", "900"))
+CAPTURE_TIMEOUT = float(os.getenv("LIVE_CAPTURE_TIMEOUT", "1"))
+RECONNECT_MAX = float(os.getenv("LIVE_RECONNECT_MAX", "60"))
+
+
+class MicroBatcher:
+    """Kayıtları biriktirir; boyut veya yaş sınırı aşılınca boşaltılmaya hazırdır"""
+
+    def __init__(self, size=BATCH_SIZE, max_age=FLUSH_SECONDS):
+        self.size = size
+        self.max_age = max_age
+        self.items = []
+        self.first_at = None
+
+    def add(self, item):
+        if not self.items:
+            self.first_at = time.monotonic()
+        self.items.append(item)
+
+    def due(self):
+        if not self.items:
+            return False
+        return len(self.items) >= self.size or time.monotonic() - self.first_at >= self.max_age
+
+    def drain(self):
+        items, self.items, self.first_at = self.items, [], None
+        return items
+
+
+class LiveSession:
+    """Tek cihaz için canlı olay okuma, parti gönderimi, uzlaştırma ve yeniden bağlanma"""
+
+    def __init__(self, cfg, ingest=None, zk_factory=devices.make_zk, stop=None,
+                 batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS,
+                 reconcile_seconds=RECONCILE_SECONDS, capture_timeout=CAPTURE_TIMEOUT,
+                 reconnect_max=RECONNECT_MAX):
+        self.cfg = cfg
+        self.device = devices.device_key(cfg)
+        self.site = cfg.get("site", self.device)
+        self.ingest = ingest or sync.ingest_records
+        self.zk_factory = zk_factory
+        self.stop = stop or threading.Event()
+        self.batcher = MicroBatcher(batch_size, flush_seconds)
+        self.reconcile_seconds = reconcile_seconds
+        self.capture_timeout = capture_timeout
+        self.reconnect_max = reconnect_max
+        self.users = {}
+        self.stats = {"events": 0, "batches": 0, "inserted": 0, "reconciles": 0, "reconnects": 0, "errors": 0}
+
+    def _records(self, attendance, live=False):
+        records = sync.build_attendance_records(attendance, self.users, self.device, self.site)
+        if live:
+            # Canlı olaydaki uid kullanıcıya aittir, cihazdaki kayıt seri numarası değil
+            for rec in records:
+                rec["device_uid"] = None
+        return records
+
+    def _send(self, records):
+        if not records:
+            return
+        stats = self.ingest({self.device: records})
+        self.stats["batches"] += 1
+        self.stats["inserted"] += stats["inserted"]
+
+    def reconcile(self, conn):
+        """Tam okuma ile canlı akışta kaçırılan kayıtları yakala"""
+        self.users = {user.user_id: user.name for user in conn.get_users()}
+        attendance = conn.get_attendance()
+        log.info(f"🔄 Uzlaştırma ({self.site}): cihazda {len(attendance)} kayıt")
+        self._send(self._records(attendance))
+        self.stats["reconciles"] += 1
+
+    def _capture(self, conn, until):
+        """Uzlaştırma zamanına ya da durdurma sinyaline kadar olayları oku"""
+        for event in conn.live_capture(new_timeout=self.capture_timeout):
+            if event is not None:
+                self.stats["events"] += 1
+                self.batcher.add(event)
+            if self.batcher.due():
+                self.flush_events()
+            if self.stop.is_set() or time.monotonic() >= until:
+                # Generator bir sonraki olay/zaman aşımında kapanır, cihaz olay kaydı kaldırılır
+                conn.end_live_capture = True
+        self.flush_events()
+
+    def flush_events(self):
+        self._send(self._records(self.batcher.drain(), live=True))
+
+    def run(self):
+        backoff = 1.0
+        breaker = devices.breaker_for(self.device)
+        while not self.stop.is_set():
+            conn = None
+            try:
+                conn = self.zk_factory(self.cfg).connect()
+                log.info(f"📡 Canlı mod bağlandı: {self.site} ({self.device})")
+                breaker.record_success()
+                backoff = 1.0
+                while not self.stop.is_set():
+                    self.reconcile(conn)
+                    self._capture(conn, time.monotonic() + self.reconcile_seconds)
+            except Exception as e:
+                self.stats["errors"] += 1
+                breaker.record_failure()
+                log.warning(f"⚠️ Canlı mod hatası ({self.site}): {e}")
+                # Bağlantı koptuysa bellekteki olaylar yine de gönderilsin
+                try:
+                    self.flush_events()
+                except Exception as flush_error:
+                    log.error(f"⚠️ Parti gönderilemedi ({self.site}): {flush_error}")
+            finally:
+                if conn is not None:
+                    try:
+                        conn.disconnect()
+                    except Exception:
+                        pass
+            if self.stop.is_set():
+                break
+            self.stats["reconnects"] += 1
+            log.info(f"🔌 {self.site}: {backoff:.0f} sn sonra yeniden bağlanılacak")
+            self.stop.wait(backoff)
+            backoff = min(self.reconnect_max, backoff * 2)
+        log.info(f"⏹️ Canlı mod durdu ({self.site}): {self.stats}")
+
+
+def run(device_list=None, stop=None, zk_factory=devices.make_zk):
+    """Tüm cihazlar için canlı oturumları başlat; stop set edilene kadar (veya Ctrl+C) çalışır"""
+    stop = stop or threading.Event()
+    sessions = [LiveSession(cfg, zk_factory=zk_factory, stop=stop)
+                for cfg in (device_list if device_list is not None else devices.load_devices())]
+    threads = [threading.Thread(target=s.run, name=f"live-{s.device}", daemon=True) for s in sessions]
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            if stop.wait(1):
+                break
+    except KeyboardInterrupt:
+        log.info("Canlı mod durduruluyor...")
+        stop.set()
+    for t in threads:
+        t.join()
+    return sessions
+
+
+if __name__ == "__main__":
+    logsetup.configure("sync.log")
+    run()
@@ -0,0 +1,122 @@
+"""Log altyapısı: bloklamayan kuyruklu handler, boyut ve gün bazlı döndürme, gzip.
+
+Uygulama thread'leri log kaydını yalnızca bellekteki kuyruğa bırakır (QueueHandler);
+dosya ve konsol yazımı ayrı bir dinleyici thread'inde yapılır (QueueListener). Sync
+döngüsü yavaş diskte ya da Windows konsolunda beklemez.
+
+logs/<ad>.log dosyası LOG_MAX_BYTES'ı aşınca ya da gün değişince döndürülür; eski
+dosyalar <ad>.log.1.gz, <ad>.log.2.gz ... olarak sıkıştırılır ve en fazla
+LOG_BACKUP_COUNT tanesi tutulur, log klasörü sınırlı kalır. Dosyalar UTF-8 yazılır.
+
+Ayarlar (.env):
+    LOG_LEVEL=INFO          # DEBUG: okutma bazında ayrıntılı izler (ham veri, giriş/çıkış tahmini)
+    LOG_MAX_BYTES=5242880   # 5 MB
+    LOG_BACKUP_COUNT=14
+    LOG_COMPRESS=true
+    LOG_HTTP=false          # true: httpx istek satırları (her istek bir INFO satırı) da yazılır
+"""
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+from datetime import date
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Her HTTP isteğini INFO seviyesinde loglayan kütüphaneler
+HTTP_LOGGERS = ("httpx", "httpcore", "hpack", "h2")
+
+_listener = None
+
+
+def _gzip_rotate(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Boyut aşılınca ya da gün değişince döndüren, eski dosyaları gzip'leyen handler"""
+
+    def __init__(self, filename, max_bytes, backup_count, compress=True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        try:
+            self.day = date.fromtimestamp(os.path.getmtime(self.baseFilename))
+        except OSError:
+            self.day = date.today()
+        if compress:
+            self.namer = lambda name: name + '.gz'
+            self.rotator = _gzip_rotate
+
+    def shouldRollover(self, record):
+        if date.fromtimestamp(record.created) != self.day:
+            try:
+                if os.path.getsize(self.baseFilename) > 0:
+                    return True
+            except OSError:
+                pass
+            self.day = date.fromtimestamp(record.created)
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.day = date.today()
+
+
+def configure(filename=None, level=None, log_dir=None, console=True):
+    """Kök logger'ı kuyruklu handler'a bağla; logs/<filename> ve konsol arka planda yazılır.
+    filename verilmezse yalnızca konsola yazılır. Tekrar çağrılırsa önceki dinleyici
+    durdurulur. Çıkışta kuyruk boşaltılır (atexit).
+    """
+    global _listener
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if filename:
+        log_dir = log_dir or DEFAULT_LOG_DIR
+        os.makedirs(log_dir, exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            os.path.join(log_dir, filename),
+            max_bytes=int(os.getenv('LOG_MAX_BYTES', str(5 * 1024 * 1024))),
+            backup_count=int(os.getenv('LOG_BACKUP_COUNT', '14')),
+            compress=os.getenv('LOG_COMPRESS', 'true').lower() == 'true',
+        ))
+    # Windows servisinde konsol yoktur
+    if console and sys.stderr is not None:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    shutdown()
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level)
+    http_level = logging.INFO if os.getenv('LOG_HTTP', 'false').lower() == 'true' else logging.WARNING
+    for name in HTTP_LOGGERS:
+        logging.getLogger(name).setLevel(http_level)
+    return _listener
+
+
+def shutdown():
+    """Kuyruktaki kayıtları yazıp dinleyiciyi durdur"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown)
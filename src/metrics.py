@@ -0,0 +1,242 @@
+"""Sync döngüsü ölçümleri: aşama süreleri, sayaçlar ve göstergeler.
+
+Her döngü (sync.main) bir ölçüm kümesi açar; aşamalar span() ile zamanlanır,
+sayaçlar inc(), göstergeler gauge() ile yazılır. Döngü bitince iki dosya üretilir:
+
+    SYNC_STATUS_FILE  (varsayılan logs/sync_status.json)  son döngünün özeti
+    SYNC_PROM_FILE    (varsayılan logs/pdks_sync.prom)    Prometheus textfile
+                      (node_exporter --collector.textfile.directory ile okunur)
+
+Tek bir döngünün cProfile dökümü için logs/ altına `profile_next` adında boş bir
+dosya bırakın (veya SYNC_PROFILE=true); döküm logs/profile_*.prof olarak yazılır:
+    python -m pstats logs/profile_20250101_120000.prof
+"""
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+log = logging.getLogger("pdks.metrics")
+
+LOG_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs'))
+DEFAULT_STATUS_FILE = os.path.join(LOG_DIR, "sync_status.json")
+DEFAULT_PROM_FILE = os.path.join(LOG_DIR, "pdks_sync.prom")
+PROFILE_TRIGGER = os.path.join(LOG_DIR, "profile_next")
+
+PREFIX = "pdks_sync_"
+# Değeri 0 olsa da her zaman yazılan sayaçlar
+COUNTERS = ("punches_read", "punches_new", "inserted", "skipped", "failed",
+            "http_requests", "http_errors", "retries")
+
+_lock = threading.Lock()
+_current = None
+# Süreç boyunca biriken sayaçlar (Prometheus counter anlamı)
+_totals = {name: 0 for name in COUNTERS}
+_scheduler = {}
+_last_status = {}
+
+
+class CycleMetrics:
+    """Tek bir döngünün span, sayaç ve gösterge kayıtları"""
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.started_mono = time.monotonic()
+        self.spans = {}     # (aşama, cihaz) -> saniye
+        self.counters = {name: 0 for name in COUNTERS}
+        self.gauges = {}    # (ad, cihaz) -> değer
+        self.duration = None
+        self.error = None
+
+
+def _key(name, device):
+    return (name, device or "")
+
+
+def inc(name, value=1):
+    """Sayaç artır (döngü dışında çağrılırsa yalnızca toplam artar)"""
+    if not value:
+        return
+    with _lock:
+        if _current is not None:
+            _current.counters[name] = _current.counters.get(name, 0) + value
+        _totals[name] = _totals.get(name, 0) + value
+
+
+def total(name):
+    """Süreç başından beri biriken sayaç değeri"""
+    with _lock:
+        return _totals.get(name, 0)
+
+
+def gauge(name, value, device=None):
+    with _lock:
+        if _current is not None:
+            _current.gauges[_key(name, device)] = value
+
+
+@contextmanager
+def span(name, device=None):
+    """Bir aşamanın süresini ölç; aynı aşama tekrar ederse süreler toplanır"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            if _current is not None:
+                key = _key(name, device)
+                _current.spans[key] = _current.spans.get(key, 0.0) + elapsed
+
+
+def on_http_request(request):
+    """httpx event hook: paylaşılan Supabase istemcisindeki her istek"""
+    inc("http_requests")
+
+
+def on_http_response(response):
+    if response.status_code >= 400:
+        inc("http_errors")
+
+
+def _profile_requested():
+    if os.getenv("SYNC_PROFILE", "false").lower() == "true":
+        return True
+    if os.path.exists(PROFILE_TRIGGER):
+        try:
+            os.remove(PROFILE_TRIGGER)
+        except OSError:
+            pass
+        return True
+    return False
+
+
+@contextmanager
+def cycle():
+    """Bir sync döngüsünü ölç, bitince durum dosyalarını yaz"""
+    global _current
+    metrics = CycleMetrics()
+    with _lock:
+        _current = metrics
+    profiler = cProfile.Profile() if _profile_requested() else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.error = str(e) or e.__class__.__name__
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            _dump_profile(profiler)
+        metrics.duration = time.monotonic() - metrics.started_mono
+        with _lock:
+            _current = None
+        try:
+            write(metrics)
+        except Exception as e:
+            log.warning(f"⚠️ Ölçüm dosyaları yazılamadı: {e}")
+
+
+def publish_scheduler(status):
+    """Zamanlayıcı durumunu (sonraki çalışma, son süre) durum dosyalarına ekle"""
+    with _lock:
+        _scheduler.clear()
+        _scheduler.update(status)
+    if _last_status:
+        try:
+            _write_files()
+        except Exception as e:
+            log.warning(f"⚠️ Ölçüm dosyaları yazılamadı: {e}")
+
+
+def _dump_profile(profiler):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    path = os.path.join(LOG_DIR, f"profile_{datetime.now():%Y%m%d_%H%M%S}.prof")
+    profiler.dump_stats(path)
+    log.info(f"📊 cProfile dökümü: {path}")
+
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write(metrics):
+    """Döngü ölçümlerini JSON durum dosyasına ve Prometheus textfile'a yaz"""
+    spans = [{"phase": name, "device": device or None, "seconds": round(sec, 4)}
+             for (name, device), sec in sorted(metrics.spans.items())]
+    gauges = [{"name": name, "device": device or None, "value": value}
+              for (name, device), value in sorted(metrics.gauges.items())]
+    with _lock:
+        _last_status.clear()
+        _last_status.update({
+            "started_at": metrics.started.isoformat(timespec="seconds"),
+            "duration_seconds": round(metrics.duration or 0.0, 4),
+            "error": metrics.error,
+            "spans": spans,
+            "counters": dict(sorted(metrics.counters.items())),
+            "gauges": gauges,
+            "totals": dict(sorted(_totals.items())),
+        })
+    _write_files()
+
+
+def _label(device, **extra):
+    labels = dict(extra)
+    if device:
+        labels["device"] = device
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _write_files():
+    with _lock:
+        status = dict(_last_status)
+        status["scheduler"] = dict(_scheduler) or None
+        totals = dict(_totals)
+    # Yollar yazım anında okunur (.env, bu modül import edildikten sonra yüklenir)
+    _atomic_write(os.getenv("SYNC_STATUS_FILE", DEFAULT_STATUS_FILE),
+                  json.dumps(status, ensure_ascii=False, indent=2, default=str))
+
+    lines = [
+        f"# HELP {PREFIX}cycle_duration_seconds Son sync döngüsünün süresi",
+        f"# TYPE {PREFIX}cycle_duration_seconds gauge",
+        f"{PREFIX}cycle_duration_seconds {status['duration_seconds']}",
+        f"# TYPE {PREFIX}last_cycle_timestamp_seconds gauge",
+        f"{PREFIX}last_cycle_timestamp_seconds "
+        f"{datetime.fromisoformat(status['started_at']).timestamp():.0f}",
+        f"# TYPE {PREFIX}last_cycle_error gauge",
+        f"{PREFIX}last_cycle_error {1 if status['error'] else 0}",
+        f"# HELP {PREFIX}phase_seconds Son döngüde aşama süreleri",
+        f"# TYPE {PREFIX}phase_seconds gauge",
+    ]
+    for s in status["spans"]:
+        lines.append(f"{PREFIX}phase_seconds{_label(s['device'], phase=s['phase'])} {s['seconds']}")
+    for name, value in sorted(totals.items()):
+        lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        lines.append(f"{PREFIX}{name}_total {value}")
+    seen = set()
+    for g in status["gauges"]:
+        if g["name"] not in seen:
+            lines.append(f"# TYPE {PREFIX}{g['name']} gauge")
+            seen.add(g["name"])
+        lines.append(f"{PREFIX}{g['name']}{_label(g['device'])} {g['value']}")
+    sched = status["scheduler"] or {}
+    if sched.get("next_run"):
+        lines.append(f"# TYPE {PREFIX}next_run_timestamp_seconds gauge")
+        lines.append(f"{PREFIX}next_run_timestamp_seconds "
+                     f"{datetime.fromisoformat(sched['next_run']).timestamp():.0f}")
+    if sched.get("last_interval") is not None:
+        lines.append(f"# TYPE {PREFIX}interval_seconds gauge")
+        lines.append(f"{PREFIX}interval_seconds {sched['last_interval']}")
+    _atomic_write(os.getenv("SYNC_PROM_FILE", DEFAULT_PROM_FILE), "\n".join(lines) + "\n")
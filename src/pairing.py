@@ -0,0 +1,227 @@
+"""Ham kayıtlardan giriş-çıkış çiftleri üreten sütunsal eşleştirme motoru.
+
+Kayıtlar kullanıcı/iş günü grubu ve zaman damgası (mikrosaniye) sütunlarına
+ayrılır, tek bir tamsayı anahtarla toplu sıralanır ve tek geçişte minimum aralık
+filtresi ile giriş-çıkış eşleştirmesi yapılır. Ortam ayarları çağrı başına bir
+kez okunur, ayrıntılı izler yalnızca DEBUG seviyesinde loglanır.
+
+Çıktı önceki satır satır uygulamayla (reference_generate_pairs) birebir aynıdır:
+kullanıcılar ilk görülme sırasıyla, iş günleri kullanıcı içinde ilk görülme
+sırasıyla, kayıtlar zaman sırasıyla.
+"""
+import logging
+import os
+from array import array
+from datetime import date, datetime, timedelta
+
+log = logging.getLogger("pdks.pairing")
+
+_EPOCH = datetime(1970, 1, 1)
+_US = 1_000_000
+_INSTANT_BITS = 53
+
+
+def _parse(value):
+    try:
+        return datetime.fromisoformat(value)
+    except Exception:
+        return value if isinstance(value, datetime) else None
+
+
+def workday_of(value, day_start_hour=None):
+    """Kaydın ait olduğu iş günü (ISO tarih); day_start_hour öncesi önceki güne sayılır"""
+    if day_start_hour is None:
+        day_start_hour = int(os.getenv("SYNC_DAY_START_HOUR", "5"))
+    dt = _parse(value)
+    if dt is None:
+        return None
+    if dt.hour < day_start_hour:
+        dt = dt - timedelta(days=1)
+    return dt.date().isoformat()
+
+
+def _instant_us(dt):
+    """Sıralama/fark için mikrosaniye cinsinden an (saat dilimli değerler UTC'ye indirgenir)"""
+    offset = dt.utcoffset()
+    if offset is not None:
+        dt = dt.replace(tzinfo=None) - offset
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * _US + delta.microseconds
+
+
+def generate_pairs(attendance, day_start_hour=None, min_interval_seconds=None):
+    """Ham kayıtları ({kullanici_id, giris_tarihi}) giriş-çıkış çiftlerine dönüştür"""
+    if day_start_hour is None:
+        day_start_hour = int(os.getenv("SYNC_DAY_START_HOUR", "5"))
+    if min_interval_seconds is None:
+        min_interval_seconds = int(os.getenv("SYNC_MIN_INTERVAL_SECONDS", "300"))
+    min_interval_us = int(min_interval_seconds) * _US
+    debug = log.isEnabledFor(logging.DEBUG)
+
+    # 1) Sütunlara ayır: orijinal datetime, an, grup (kullanıcı, iş günü)
+    times = []
+    instants = array('q')
+    groups = array('q')
+    user_rank = {}
+    group_index = {}
+    group_keys = []
+    for row in attendance:
+        time_dt = _parse(row['giris_tarihi'])
+        if time_dt is None:
+            continue
+        user = row['kullanici_id']
+        urank = user_rank.setdefault(user, len(user_rank))
+        # İş günü kaydırması: day_start_hour öncesi kayıtlar önceki günün devamı
+        workday = time_dt.toordinal() - (1 if time_dt.hour < day_start_hour else 0)
+        gkey = (urank, workday)
+        gidx = group_index.get(gkey)
+        if gidx is None:
+            gidx = group_index[gkey] = len(group_keys)
+            group_keys.append((user, workday))
+        times.append(time_dt)
+        instants.append(_instant_us(time_dt))
+        groups.append(gidx)
+
+    if not times:
+        return []
+
+    # 2) Grup sırası: kullanıcı ilk görülme sırası, sonra kullanıcı içindeki ilk görülme sırası
+    group_order = sorted(range(len(group_keys)), key=lambda g: (user_rank[group_keys[g][0]], g))
+    group_pos = array('q', bytes(8 * len(group_keys)))
+    for pos, g in enumerate(group_order):
+        group_pos[g] = pos
+
+    # 3) Tek tamsayı anahtarla toplu sıralama (eşit anlarda girdi sırası korunur)
+    base = min(instants)
+    keys = [(group_pos[g] << _INSTANT_BITS) | (t - base) for g, t in zip(groups, instants)]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+
+    # 4) Tek geçişte minimum aralık filtresi ve giriş-çıkış eşleştirmesi
+    pairs = []
+    workday_iso = {}
+    current = -1
+    last_kept = 0
+    pending = -1
+
+    def emit(gidx, giris, cikis):
+        user, workday = group_keys[gidx]
+        iso = workday_iso.get(workday)
+        if iso is None:
+            iso = workday_iso[workday] = date.fromordinal(workday).isoformat()
+        pairs.append({
+            "kullanici_id": user,
+            "giris_tarihi": times[giris].isoformat(sep=' '),
+            "cikis_tarihi": times[cikis].isoformat(sep=' ') if cikis >= 0 else None,
+            "workday_date": iso,
+            "admin_locked": False
+        })
+
+    for i in order:
+        g = groups[i]
+        if g != current:
+            if pending >= 0:
+                emit(current, pending, -1)
+            current = g
+            pending = i
+            last_kept = instants[i]
+            continue
+        diff = instants[i] - last_kept
+        if diff < min_interval_us:
+            if debug:
+                log.debug("Çok yakın kayıt filtrelendi: %s - %s (fark: %.0fs)",
+                          group_keys[g][0], times[i], diff / _US)
+            continue
+        last_kept = instants[i]
+        if pending >= 0:
+            emit(g, pending, i)
+            pending = -1
+        else:
+            pending = i
+    if pending >= 0:
+        emit(current, pending, -1)
+
+    if debug:
+        log.debug("%d kayıttan %d çift üretildi (%d kullanıcı, %d iş günü)",
+                  len(times), len(pairs), len(user_rank), len(group_keys))
+    return pairs
+
+
+def reference_generate_pairs(attendance):
+    """Önceki satır satır uygulama; yalnızca eşdeğerlik karşılaştırması (benchmarks) için tutulur"""
+    pairs = []
+    attendance_by_user_and_day = {}
+
+    for row in attendance:
+        user = row['kullanici_id']
+        time_str = row['giris_tarihi']
+        # string -> datetime
+        try:
+            time_dt = datetime.fromisoformat(time_str)
+        except Exception:
+            time_dt = time_str if isinstance(time_str, datetime) else None
+        if time_dt is None:
+            continue
+        
+        # İş günü kaydırması - gece yarısından sonraki kayıtlar için özel mantık
+        day_start_hour = int(os.getenv("SYNC_DAY_START_HOUR", "5"))
+        
+        # Eğer saat 00:00-05:00 arasındaysa, bu kayıt önceki günün devamı
+        # Eğer saat 05:00-23:59 arasındaysa, bu kayıt bugünün başlangıcı
+        hour = time_dt.hour
+        
+        if hour < day_start_hour:
+            # Gece yarısından sonra, önceki günün devamı
+            workday_dt = time_dt - timedelta(days=1)
+        else:
+            # Gündüz, bugünün başlangıcı
+            workday_dt = time_dt
+            
+        workday_date = workday_dt.date().isoformat()
+        
+        attendance_by_user_and_day.setdefault(user, {}).setdefault(workday_date, []).append(time_dt)
+
+    for user, days_data in attendance_by_user_and_day.items():
+        for workday_date, times in days_data.items():
+            times.sort()  # Tarihe göre sırala
+            
+            # YENİ: Minimum süre kontrolü - çok yakın kayıtları filtrele
+            min_interval_seconds = int(os.getenv("SYNC_MIN_INTERVAL_SECONDS", "300"))  # Varsayılan 5 dakika (300 saniye)
+            min_interval = timedelta(seconds=min_interval_seconds)
+            
+            filtered_times = []
+            for i, time in enumerate(times):
+                if i == 0:
+                    # İlk kayıt her zaman alınır
+                    filtered_times.append(time)
+                    print(f"İlk kayıt alındı: {user} - {time}")
+                else:
+                    # Son kayıttan minimum süre geçmişse al
+                    time_diff = time - filtered_times[-1]
+                    if time_diff >= min_interval:
+                        filtered_times.append(time)
+                        print(f"Yeni kayıt alındı: {user} - {time} (önceki: {filtered_times[-1]}, fark: {time_diff.total_seconds():.0f}s)")
+                    else:
+                        print(f"Çok yakın kayıt filtrelendi: {user} - {time} (önceki: {filtered_times[-1]}, fark: {time_diff.total_seconds():.0f}s)")
+            
+            # Ardışık giriş-çıkış çiftleri oluştur
+            for i in range(0, len(filtered_times), 2):
+                giris = filtered_times[i]
+                
+                # Eğer bir sonraki kayıt varsa, o çıkış olur
+                if i + 1 < len(filtered_times):
+                    cikis = filtered_times[i + 1]
+                    print(f"Çift oluşturuldu: {user} - Giriş: {giris}, Çıkış: {cikis}")
+                else:
+                    # Son kayıt tek başına kalırsa, sadece giriş olur
+                    cikis = None
+                    print(f"Tek giriş: {user} - Giriş: {giris} (çıkış yok)")
+
+                pairs.append({
+                    "kullanici_id": user,
+                    "giris_tarihi": giris.isoformat(sep=' '),
+                    "cikis_tarihi": cikis.isoformat(sep=' ') if cikis else None,
+                    "workday_date": workday_date,
+                    "admin_locked": False
+                })
+
+    return pairs
@@ -0,0 +1,302 @@
+"""Aylık puantaj özeti: personel başına günlük ve aylık çalışma toplamları.
+
+Maaş Hesabı ekranı ay içindeki tüm düzenli kayıtları tarayıcıya indirmek yerine
+personel_aylik_ozet tablosundaki hazır satırları okur (tablolar:
+add_personel_aylik_ozet.sql). Özetler personel_giris_cikis_duzenli'den, id'ye
+göre sayfalı tek geçişte hesaplanır ve yalnızca değişen aylar yeniden yazılır:
+
+    - düzenli tabloda eklenen, güncellenen ya da silinen (admin düzeltmeleri dahil)
+      kayıtların ayları: trigger bunları personel_aylik_ozet_kirli'de işaretler,
+    - son çalışmadan beri eklenen düzenli kayıtların ayları (id watermark'ı),
+    - sync döngüsünde eklenen ham kayıtların ayları (mark_payroll_months),
+    - komut satırından çalıştırıldığında ayrıca içinde bulunulan ay ve ayın ilk
+      PAYROLL_PREVIOUS_MONTH_DAYS gününde (varsayılan 5) önceki ay.
+
+Sync döngüsü yalnızca değişen ayları yazar; değişiklik yoksa özet tablolarına
+dokunmaz. Yazılan ayın işareti kaldırılır; Maaş Hesabı ekranı işaretli ayda özet
+yerine düzenli kayıtları toplar, böylece henüz yansımamış düzeltme gözden kaçmaz.
+
+Ay, ekrandaki gibi giris_tarihi'ne, gün workday_date'e göre belirlenir. Saat,
+çıkışı olan çiftlerin (cikis - giris) toplamıdır; çıkışı olmayan çiftler açık
+vardiya sayılır.
+
+Çalıştırma:
+    python -m src.payroll                      # değişen aylar
+    python -m src.payroll --month 2025-03      # belirli ay(lar), virgülle ayrılmış
+    python -m src.payroll --full               # tüm geçmiş
+Sync döngüsünde her çalışmada güncellemek için: SYNC_PAYROLL_SUMMARY=true
+"""
+import argparse
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    from src import db, logsetup, pairing, sync_state
+except ImportError:  # python src/payroll.py
+    import db
+    import logsetup
+    import pairing
+    import sync_state
+
+log = logging.getLogger("pdks.payroll")
+
+SOURCE_TABLE = "personel_giris_cikis_duzenli"
+DAILY_TABLE = "personel_gunluk_ozet"
+MONTHLY_TABLE = "personel_aylik_ozet"
+DIRTY_TABLE = "personel_aylik_ozet_kirli"
+
+
+def month_of(value):
+    """Zaman damgası / tarih metninden ay anahtarı (YYYY-MM)"""
+    text = str(value or "")
+    return text[:7] if len(text) >= 7 else None
+
+
+def months_of_rows(raw_rows, day_start_hour=None):
+    """Ham kayıtların ({kullanici_id, giris_tarihi}) etkileyebileceği aylar.
+    Gece vardiyası çifti önceki iş gününe (dolayısıyla önceki aya) yazılabilir.
+    """
+    months = set()
+    for row in raw_rows:
+        months.add(month_of(row["giris_tarihi"]))
+        months.add(month_of(pairing.workday_of(row["giris_tarihi"], day_start_hour)))
+    months.discard(None)
+    return months
+
+
+def default_months(today=None, previous_days=None):
+    """Komut satırında her çalışmada yeniden hesaplanan aylar: içinde bulunulan ay (+ ay başında önceki ay)"""
+    today = today or date.today()
+    if previous_days is None:
+        previous_days = int(os.getenv("PAYROLL_PREVIOUS_MONTH_DAYS", "5"))
+    months = {today.strftime("%Y-%m")}
+    if today.day <= previous_days:
+        months.add((today.replace(day=1) - timedelta(days=1)).strftime("%Y-%m"))
+    return months
+
+
+def _next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def month_ranges(months):
+    """Ardışık ayları [başlangıç, bitiş) giris_tarihi aralıklarında birleştir"""
+    ranges = []
+    for month in sorted(months):
+        if ranges and ranges[-1][1] == month:
+            ranges[-1][1] = _next_month(month)
+        else:
+            ranges.append([month, _next_month(month)])
+    return [(f"{start}-01", f"{end}-01") for start, end in ranges]
+
+
+def changed_months(client, after_id, page_size):
+    """after_id'den sonra eklenen düzenli kayıtların ayları ve en büyük id"""
+    months = set()
+    last_id = after_id
+    for page in db.keyset_pages(lambda: client.table(SOURCE_TABLE).select("id,giris_tarihi"),
+                                page_size, after_id):
+        months.update(month_of(r["giris_tarihi"]) for r in page)
+        last_id = max(last_id, page[-1]["id"])
+    months.discard(None)
+    return months, last_id
+
+
+def dirty_months(client):
+    """Trigger'ın işaretlediği, özeti güncel olmayan aylar: {YYYY-MM: sürüm}"""
+    try:
+        rows = client.table(DIRTY_TABLE).select("ay,surum").execute().data or []
+    except Exception as e:
+        log.warning(f"⚠️ Değişen aylar okunamadı ({DIRTY_TABLE}): {e}")
+        log.warning("   add_personel_aylik_ozet.sql'i Supabase SQL Editor'da çalıştırın.")
+        return {}
+    return {month_of(r["ay"]): r["surum"] for r in rows}
+
+
+def clear_dirty(client, dirty, months):
+    """Yazılan ayların işaretini okunan sürümle kaldır; hesaplama sırasında yeniden
+    değişen ayın sürümü artmıştır, işaretli kalır"""
+    for month in sorted(set(dirty) & set(months)):
+        try:
+            client.table(DIRTY_TABLE).delete().eq("ay", f"{month}-01").eq("surum", dirty[month]).execute()
+        except Exception as e:
+            log.warning(f"⚠️ Ay işareti kaldırılamadı ({month}): {e}")
+
+
+def _parse(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def aggregate(rows, daily=None, monthly=None):
+    """Düzenli kayıtlardan günlük {(kullanici_id, ay, gün)} ve aylık {(kullanici_id, ay)} toplamlar"""
+    daily = {} if daily is None else daily
+    monthly = {} if monthly is None else monthly
+    for row in rows:
+        month = month_of(row.get("giris_tarihi"))
+        if month is None:
+            continue
+        user = int(row["kullanici_id"])
+        day = str(row.get("workday_date") or row["giris_tarihi"])[:10]
+        hours = 0.0
+        is_open = 0
+        if row.get("cikis_tarihi"):
+            giris, cikis = _parse(row["giris_tarihi"]), _parse(row["cikis_tarihi"])
+            try:
+                hours = (cikis - giris).total_seconds() / 3600
+            except TypeError:
+                hours = 0.0
+        else:
+            is_open = 1
+
+        d = daily.get((user, month, day))
+        if d is None:
+            d = daily[(user, month, day)] = {"toplam_saat": 0.0, "kayit_sayisi": 0, "acik_vardiya": 0}
+        d["toplam_saat"] += hours
+        d["kayit_sayisi"] += 1
+        d["acik_vardiya"] += is_open
+
+        m = monthly.get((user, month))
+        if m is None:
+            m = monthly[(user, month)] = {"toplam_saat": 0.0, "days": set(), "kayit_sayisi": 0, "acik_vardiya": 0}
+        m["toplam_saat"] += hours
+        m["days"].add(day)
+        m["kayit_sayisi"] += 1
+        m["acik_vardiya"] += is_open
+    return daily, monthly
+
+
+def compute(client, months, page_size):
+    """Verilen ayların düzenli kayıtlarını sayfalı tek geçişte topla"""
+    daily, monthly = {}, {}
+    for start, end in month_ranges(months):
+        for page in db.keyset_pages(lambda: client.table(SOURCE_TABLE)
+                                    .select("id,kullanici_id,giris_tarihi,cikis_tarihi,workday_date")
+                                    .gte("giris_tarihi", start)
+                                    .lt("giris_tarihi", end), page_size):
+            aggregate(page, daily, monthly)
+    return daily, monthly
+
+
+def _write_rows(client, table, rows, on_conflict, chunk_size):
+    failed = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        try:
+            res = client.table(table).upsert(chunk, on_conflict=on_conflict, returning="minimal").execute()
+            err = getattr(res, 'error', None)
+        except Exception as e:
+            err = e
+        if err:
+            log.error(f"Hata özet tablosu yazma ({table}, {len(chunk)} satır): {err}")
+            failed += len(chunk)
+    return failed
+
+
+def write(client, months, daily, monthly, chunk_size):
+    """Ayların özetlerini upsert et, bu çalışmada üretilmeyen eski satırları sil.
+    Dönüş: yazılamayan satır sayısı (0 ise aylar tamamlandı sayılır).
+    """
+    stamp = datetime.now(timezone.utc).isoformat()
+    daily_rows = [
+        {"kullanici_id": user, "ay": f"{month}-01", "gun": day,
+         "toplam_saat": round(v["toplam_saat"], 4), "kayit_sayisi": v["kayit_sayisi"],
+         "acik_vardiya": v["acik_vardiya"], "hesaplama_zamani": stamp}
+        for (user, month, day), v in sorted(daily.items())
+    ]
+    monthly_rows = [
+        {"kullanici_id": user, "ay": f"{month}-01",
+         "toplam_saat": round(v["toplam_saat"], 4), "calisilan_gun": len(v["days"]),
+         "acik_vardiya": v["acik_vardiya"], "kayit_sayisi": v["kayit_sayisi"], "hesaplama_zamani": stamp}
+        for (user, month), v in sorted(monthly.items())
+    ]
+    failed = _write_rows(client, DAILY_TABLE, daily_rows, "kullanici_id,ay,gun", chunk_size)
+    failed += _write_rows(client, MONTHLY_TABLE, monthly_rows, "kullanici_id,ay", chunk_size)
+    if failed:
+        return failed
+    # Kaydı silinen / başka güne taşınan satırların eski özetleri
+    for month in sorted(months):
+        for table in (DAILY_TABLE, MONTHLY_TABLE):
+            try:
+                client.table(table).delete().eq("ay", f"{month}-01").lt("hesaplama_zamani", stamp).execute()
+            except Exception as e:
+                log.warning(f"⚠️ Eski özet satırları silinemedi ({table}, {month}): {e}")
+    return 0
+
+
+def refresh(state=None, months=None, full=False, client=None, page_size=None, chunk_size=None,
+            recent=True):
+    """Değişen ayların özetlerini yeniden hesapla ve yaz.
+    months verilirse yalnızca o aylar, full=True ise tüm geçmiş hesaplanır.
+    recent=False iken (sync döngüsü) içinde bulunulan ay eklenmez; değişen ay yoksa
+    hiçbir şey yazılmaz.
+    Dönüş: {"months", "users", "daily_rows", "monthly_rows", "failed"} özeti.
+    """
+    client = client or db.get_client()
+    page_size = page_size or int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    chunk_size = chunk_size or int(os.getenv("SYNC_INSERT_CHUNK_SIZE", "500"))
+    own_state = state is None
+    state = state or sync_state.SyncState()
+    try:
+        last_id, pending = state.payroll_cursor()
+        new_months, new_last_id = changed_months(client, 0 if full else last_id, page_size)
+        dirty = dirty_months(client)
+        if months is None:
+            months = new_months | pending | set(dirty) | (default_months() if recent else set())
+        months = {m for m in months if m}
+        if not months:
+            return {"months": [], "users": 0, "daily_rows": 0, "monthly_rows": 0, "failed": 0}
+
+        daily, monthly = compute(client, months, page_size)
+        failed = write(client, months, daily, monthly, chunk_size)
+        if failed:
+            # Aylar işaretli kalır, sonraki çalışmada tekrar denenir
+            state.mark_payroll_months(months | new_months)
+            state.save_payroll_cursor(max(last_id, new_last_id), ())
+        else:
+            state.save_payroll_cursor(max(last_id, new_last_id), months)
+            clear_dirty(client, dirty, months)
+
+        summary = {
+            "months": sorted(months),
+            "users": len({user for user, _ in monthly}),
+            "daily_rows": len(daily),
+            "monthly_rows": len(monthly),
+            "failed": failed,
+        }
+        log.info(f"📅 Aylık özet: {', '.join(summary['months']) or '-'} için {summary['users']} personel, "
+                 f"{summary['monthly_rows']} aylık / {summary['daily_rows']} günlük satır"
+                 + (f", {failed} hatalı" if failed else ""))
+        return summary
+    finally:
+        if own_state:
+            state.close()
+
+
+def main(argv=None):
+    db.load_env()
+    parser = argparse.ArgumentParser(description="Personel günlük/aylık çalışma özetini güncelle")
+    parser.add_argument("--month", help="yeniden hesaplanacak ay(lar), ör. 2025-03,2025-04")
+    parser.add_argument("--full", action="store_true", help="tüm geçmişi yeniden hesapla")
+    args = parser.parse_args(argv)
+    months = None
+    if args.month:
+        months = {m.strip() for m in args.month.split(",") if m.strip()}
+        bad = [m for m in months if len(m) != 7 or m[4] != "-" or not (m[:4] + m[5:]).isdigit()]
+        if bad:
+            parser.error(f"ay YYYY-MM biçiminde olmalı: {', '.join(sorted(bad))}")
+    if args.full:
+        months = None
+    logsetup.configure()
+    summary = refresh(months=months, full=args.full)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,212 @@
+"""Personel ve maaş ayarı kayıtlarının toplu oluşturulması.
+
+`personel` ve `maas_ayarlari` anahtar kümeleri sayfalı olarak bir kez okunur ve
+süreç içinde PROVISION_CACHE_TTL saniye (varsayılan 1 saat) saklanır. Eksik
+kayıtlar bellekte hesaplanır ve toplu insert ile eklenir; böylece 200 kullanıcılı
+bir terminalin her döngüsü kullanıcı sayısından bağımsız, sabit sayıda istek yapar.
+sync.py (SYNC_AUTO_CREATE_PERSONEL) ve backfill_maas_ayarlari.py bu modülü kullanır.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger("pdks.provisioning")
+
+DEFAULT_HEDEF_SAAT = 240
+
+# tablo -> (yüklenme zamanı, {kullanici_id: aktif})
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _split_name(full_name: str):
+    if not full_name:
+        return "", ""
+    parts = str(full_name).strip().split(" ", 1)
+    if len(parts) == 1:
+        return parts[0], ""
+    return parts[0], parts[1]
+
+
+def _load_keys(client, table):
+    """Tablodaki {kullanici_id: aktif} eşlemesini sayfalı oku"""
+    page_size = int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    keys = {}
+    offset = 0
+    while True:
+        res = client.table(table).select("kullanici_id, aktif") \
+            .order("kullanici_id") \
+            .range(offset, offset + page_size - 1) \
+            .execute()
+        rows = getattr(res, 'data', None) or []
+        for row in rows:
+            keys[int(row["kullanici_id"])] = row.get("aktif", True)
+        if len(rows) < page_size:
+            return keys
+        offset += page_size
+
+
+def cached_keys(client, table, refresh=False):
+    """Önbellekteki anahtar kümesi; TTL dolmuşsa veya refresh=True ise yeniden yüklenir"""
+    ttl = float(os.getenv("PROVISION_CACHE_TTL", "3600"))
+    with _cache_lock:
+        entry = _cache.get(table)
+        if refresh or entry is None or time.monotonic() - entry[0] > ttl:
+            entry = (time.monotonic(), _load_keys(client, table))
+            _cache[table] = entry
+        return entry[1]
+
+
+def invalidate_cache(table=None):
+    with _cache_lock:
+        if table is None:
+            _cache.clear()
+        else:
+            _cache.pop(table, None)
+
+
+def _insert(client, table, rows):
+    try:
+        res = client.table(table).insert(rows, returning="minimal").execute()
+        return getattr(res, 'error', None)
+    except Exception as e:
+        return e
+
+
+def _bulk_insert(client, table, payloads):
+    """Kayıtları parçalar halinde ekle. Dönüş: (eklenen, eklenemeyen) kullanici_id listeleri.
+    Bir parça başarısız olursa (ör. başka bir süreç aynı kaydı eklemiş ya da tek bir
+    satır hatalı) tablonun anahtarları yeniden okunur ve parça satır satır denenir;
+    o arada eklenmiş kayıtlar atlanır.
+    """
+    chunk_size = int(os.getenv("SYNC_INSERT_CHUNK_SIZE", "500"))
+    inserted = []
+    failed = []
+    for i in range(0, len(payloads), chunk_size):
+        chunk = payloads[i:i + chunk_size]
+        err = _insert(client, table, chunk)
+        if not err:
+            inserted.extend(p["kullanici_id"] for p in chunk)
+            continue
+        log.warning(f"⚠️ {table} toplu insert başarısız ({len(chunk)} kayıt), kayıtlar tek tek deneniyor: {err}")
+        try:
+            existing = cached_keys(client, table, refresh=True)
+        except Exception as e:
+            log.error(f"Hata {table} anahtarları okunamadı: {e}")
+            invalidate_cache(table)
+            failed.extend(p["kullanici_id"] for p in chunk)
+            continue
+        for p in chunk:
+            if p["kullanici_id"] in existing:
+                continue
+            err = _insert(client, table, p)
+            if err:
+                log.error(f"Hata {table} insert (kullanici_id {p['kullanici_id']}): {err}")
+                failed.append(p["kullanici_id"])
+            else:
+                inserted.append(p["kullanici_id"])
+    return inserted, failed
+
+
+def _insert_maas_ayarlari(client, aktif_by_id):
+    """Eksik maaş ayarlarını ekle. Dönüş: (eklenen, eklenemeyen) kullanici_id listeleri"""
+    existing = cached_keys(client, "maas_ayarlari")
+    payloads = [
+        {
+            "kullanici_id": kullanici_id,
+            "aylik_maas": 0,
+            "hedef_saat": DEFAULT_HEDEF_SAAT,
+            "aktif": aktif,
+        }
+        for kullanici_id, aktif in sorted(aktif_by_id.items())
+        if kullanici_id not in existing
+    ]
+    if not payloads:
+        return [], []
+    inserted, failed = _bulk_insert(client, "maas_ayarlari", payloads)
+    existing = cached_keys(client, "maas_ayarlari")
+    with _cache_lock:
+        for p in payloads:
+            if p["kullanici_id"] in inserted:
+                existing[p["kullanici_id"]] = p["aktif"]
+    log.info(f"Maaş ayarı eklendi: {len(inserted)} personel"
+             + (f", {len(failed)} hatalı" if failed else ""))
+    return inserted, failed
+
+
+def ensure_maas_ayarlari(client, aktif_by_id):
+    """Verilen personel için maaş ayarı yoksa varsayılan kayıtları toplu oluştur"""
+    return _insert_maas_ayarlari(client, aktif_by_id)[0]
+
+
+def ensure_personel(client, users_map, attendance_list):
+    """Cihazdaki kullanıcılardan personel tablosunda olmayanları toplu ekle.
+    ise_giris_tarihi olarak kullanıcının ilk attendance gününü veya bugünü kullanır.
+    Yeni eklenen personel için varsayılan maaş ayarı da oluşturulur.
+    """
+    existing = cached_keys(client, "personel")
+
+    missing = {}
+    for user_id, name in users_map.items():
+        try:
+            user_id_int = int(user_id)
+        except Exception:
+            continue
+        # Pasif personel de dahil, tabloda olan herkes atlanır
+        if user_id_int not in existing:
+            missing[user_id_int] = name
+    if not missing:
+        return []
+
+    # En erken zaman (gün) tespiti, yalnızca eksik kullanıcılar için
+    earliest_by_user = {}
+    for a in attendance_list:
+        ts = getattr(a, "timestamp", None)
+        if not isinstance(ts, datetime):
+            continue
+        try:
+            uid_int = int(getattr(a, "user_id", None))
+        except Exception:
+            continue
+        if uid_int not in missing:
+            continue
+        day = ts.date().isoformat()
+        cur = earliest_by_user.get(uid_int)
+        if cur is None or day < cur:
+            earliest_by_user[uid_int] = day
+
+    today = datetime.now().date().isoformat()
+    payloads = []
+    for user_id_int, name in sorted(missing.items()):
+        name_parts = _split_name(name)
+        payloads.append({
+            "kullanici_id": user_id_int,
+            "isim": name_parts[0],
+            "soyisim": name_parts[1],
+            "ise_giris_tarihi": earliest_by_user.get(user_id_int, today),
+            "aktif": True,
+            "maas_tipi": "saatli",
+            "calisma_tipi": "full_time",
+        })
+
+    inserted, _ = _bulk_insert(client, "personel", payloads)
+    existing = cached_keys(client, "personel")
+    with _cache_lock:
+        for kullanici_id in inserted:
+            existing[kullanici_id] = True
+    if inserted:
+        shown = ", ".join(map(str, inserted[:20])) + (" ..." if len(inserted) > 20 else "")
+        log.info(f"Personel eklendi: {len(inserted)} kişi ({shown})")
+        ensure_maas_ayarlari(client, {kullanici_id: True for kullanici_id in inserted})
+    return inserted
+
+
+def backfill_maas_ayarlari(client):
+    """Maaş ayarı olmayan tüm personel için varsayılan kayıt oluştur.
+    Dönüş: (eklenen, eklenemeyen) kullanici_id listeleri.
+    """
+    personel = cached_keys(client, "personel", refresh=True)
+    cached_keys(client, "maas_ayarlari", refresh=True)
+    return _insert_maas_ayarlari(client, personel)
@@ -0,0 +1,223 @@
+"""Yıllık çalışma günü özeti: personel başına yıl bazında çalışılan gün sayısı.
+
+get_personel_leave_summary RPC'si her çağrıda personelin tüm düzenli kayıtlarını
+taramak yerine personel_yillik_calisma tablosunu toplar (tablo:
+add_personel_yillik_calisma.sql). Gün, RPC'deki gibi workday_date, yoksa
+giris_tarihi'nin günüdür; yıl bu günün yılıdır.
+
+Sync döngüsünde yeniden sayılan (kullanici_id, yıl) satırları:
+
+    - eklenen ham kayıtların dokunduğu (kullanici_id, workday_date) bölümlerinden
+      etkilenenler; yazılamayanlar yerel durumda (sync_state) işaretli kalır,
+    - düzenli tabloda eklenen, güncellenen ya da silinen (admin düzeltmeleri dahil)
+      kayıtlarınkiler: trigger bunları personel_yillik_calisma_kirli'de işaretler,
+      işaret satır yazılınca okunduğu sürümle kaldırılır.
+
+Çalıştırma:
+    python -m src.rollup                         # işaretli satırlar
+    python -m src.rollup --rebuild               # tüm geçmiş (ilk kurulum)
+    python -m src.rollup --rebuild --year 2024   # tek yıl
+Sync döngüsünde her çalışmada güncellemek için: SYNC_WORKDAY_ROLLUP=true
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timezone
+
+try:
+    from src import db, logsetup, sync_state
+except ImportError:  # python src/rollup.py
+    import db
+    import logsetup
+    import sync_state
+
+log = logging.getLogger("pdks.rollup")
+
+SOURCE_TABLE = "personel_giris_cikis_duzenli"
+ROLLUP_TABLE = "personel_yillik_calisma"
+DIRTY_TABLE = "personel_yillik_calisma_kirli"
+# Bir sorgudaki kullanıcı listesi (in.(...)) URL'yi şişirmesin
+USER_CHUNK = 200
+
+
+def _day_of(row):
+    value = row.get("workday_date") or row.get("giris_tarihi")
+    return str(value)[:10] if value else None
+
+
+def years_of_partitions(partitions):
+    """(kullanici_id, workday_date) bölümlerinden (kullanici_id, yıl) anahtarları"""
+    return {(str(user), int(str(workday)[:4])) for user, workday in partitions if workday}
+
+
+def dirty_years(client, page_size):
+    """Trigger'ın işaretlediği, sayısı güncel olmayan satırlar: {(kullanici_id, yıl): sürüm}"""
+    dirty = {}
+    offset = 0
+    try:
+        while True:
+            rows = client.table(DIRTY_TABLE).select("kullanici_id,yil,surum") \
+                .order("kullanici_id").order("yil") \
+                .range(offset, offset + page_size - 1) \
+                .execute().data or []
+            for row in rows:
+                dirty[(str(row["kullanici_id"]), int(row["yil"]))] = row["surum"]
+            if len(rows) < page_size:
+                return dirty
+            offset += page_size
+    except Exception as e:
+        log.warning(f"⚠️ Değişen personel/yıl satırları okunamadı ({DIRTY_TABLE}): {e}")
+        log.warning("   add_personel_yillik_calisma.sql'i Supabase SQL Editor'da çalıştırın.")
+        return {}
+
+
+def clear_dirty(client, dirty, keys):
+    """Yazılan satırların işaretini okunan sürümle kaldır; sayım sırasında yeniden
+    değişen satırın sürümü artmıştır, işaretli kalır"""
+    groups = {}
+    for key in set(dirty) & set(keys):
+        user, year = key
+        groups.setdefault((year, dirty[key]), []).append(int(user))
+    for (year, version), users in sorted(groups.items()):
+        users.sort()
+        for i in range(0, len(users), USER_CHUNK):
+            try:
+                client.table(DIRTY_TABLE).delete().eq("yil", year).eq("surum", version) \
+                    .in_("kullanici_id", users[i:i + USER_CHUNK]).execute()
+            except Exception as e:
+                log.warning(f"⚠️ Personel/yıl işaretleri kaldırılamadı ({year}): {e}")
+
+
+def count_days(client, keys, page_size):
+    """Verilen (kullanici_id, yıl) anahtarlarının farklı iş günü sayıları"""
+    days = {key: set() for key in keys}
+    if not days:
+        return {}
+    users = sorted({user for user, _ in days})
+    years = sorted({year for _, year in days})
+    # İş günü, giriş saatinden en fazla bir gün öncedir; aralık yılın son iş gününü de kapsar
+    start, end = f"{years[0]}-01-01", f"{years[-1] + 1}-01-02"
+    for i in range(0, len(users), USER_CHUNK):
+        part = users[i:i + USER_CHUNK]
+        for page in db.keyset_pages(lambda: client.table(SOURCE_TABLE)
+                                    .select("id,kullanici_id,giris_tarihi,workday_date")
+                                    .in_("kullanici_id", part)
+                                    .gte("giris_tarihi", start)
+                                    .lt("giris_tarihi", end), page_size):
+            for row in page:
+                day = _day_of(row)
+                bucket = days.get((str(row["kullanici_id"]), int(day[:4]))) if day else None
+                if bucket is not None:
+                    bucket.add(day)
+    return {key: len(value) for key, value in days.items()}
+
+
+def _write(client, counts, stamp, chunk_size):
+    """Sayıları upsert et; yazılamayan anahtarları döndür"""
+    rows = [{"kullanici_id": int(user), "yil": year, "calisilan_gun": count, "hesaplama_zamani": stamp}
+            for (user, year), count in sorted(counts.items(), key=lambda kv: (int(kv[0][0]), kv[0][1]))]
+    failed = set()
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        try:
+            res = client.table(ROLLUP_TABLE).upsert(chunk, on_conflict="kullanici_id,yil",
+                                                    returning="minimal").execute()
+            err = getattr(res, 'error', None)
+        except Exception as e:
+            err = e
+        if err:
+            log.error(f"Hata yıllık çalışma özeti yazma ({len(chunk)} satır): {err}")
+            failed.update((str(r["kullanici_id"]), r["yil"]) for r in chunk)
+    return failed
+
+
+def update(keys, state=None, client=None, page_size=None, chunk_size=None):
+    """Değişen (kullanici_id, yıl) satırlarını (önceki döngülerden kalanlar ve trigger'ın
+    işaretledikleri dahil) yeniden say.
+    Dönüş: {"keys", "written", "failed"} özeti.
+    """
+    client = client or db.get_client()
+    page_size = page_size or int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    chunk_size = chunk_size or int(os.getenv("SYNC_INSERT_CHUNK_SIZE", "500"))
+    own_state = state is None
+    state = state or sync_state.SyncState()
+    try:
+        # Önce işaretlenir: sayım ya da yazma yarıda kalırsa sonraki döngüde tekrar denenir
+        state.mark_rollup_years(keys)
+        dirty = dirty_years(client, page_size)
+        keys = state.pending_rollup_years() | set(dirty)
+        summary = {"keys": len(keys), "written": 0, "failed": 0}
+        if not keys:
+            return summary
+        counts = count_days(client, keys, page_size)
+        failed = _write(client, counts, datetime.now(timezone.utc).isoformat(), chunk_size)
+        state.clear_rollup_years(set(counts) - failed)
+        clear_dirty(client, dirty, set(counts) - failed)
+        summary["written"] = len(counts) - len(failed)
+        summary["failed"] = len(failed)
+        log.info(f"📆 Yıllık çalışma günü özeti: {summary['written']} personel/yıl güncellendi"
+                 + (f", {summary['failed']} hatalı" if failed else ""))
+        return summary
+    finally:
+        if own_state:
+            state.close()
+
+
+def rebuild(year=None, client=None, page_size=None, chunk_size=None):
+    """Özeti düzenli tablonun tamamından (ya da tek yıldan) yeniden oluştur.
+    Bu çalışmada üretilmeyen eski satırlar silinir. Dönüş: {"rows", "users", "failed"}.
+    """
+    client = client or db.get_client()
+    page_size = page_size or int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    chunk_size = chunk_size or int(os.getenv("SYNC_INSERT_CHUNK_SIZE", "500"))
+    stamp = datetime.now(timezone.utc).isoformat()
+
+    def query():
+        q = client.table(SOURCE_TABLE).select("id,kullanici_id,giris_tarihi,workday_date")
+        if year is not None:
+            q = q.gte("giris_tarihi", f"{year}-01-01").lt("giris_tarihi", f"{year + 1}-01-02")
+        return q
+
+    days = {}
+    scanned = 0
+    for page in db.keyset_pages(query, page_size):
+        scanned += len(page)
+        for row in page:
+            day = _day_of(row)
+            if not day or (year is not None and int(day[:4]) != year):
+                continue
+            days.setdefault((str(row["kullanici_id"]), int(day[:4])), set()).add(day)
+    counts = {key: len(value) for key, value in days.items()}
+    failed = _write(client, counts, stamp, chunk_size)
+    if not failed:
+        try:
+            stale = client.table(ROLLUP_TABLE).delete().lt("hesaplama_zamani", stamp)
+            if year is not None:
+                stale = stale.eq("yil", year)
+            stale.execute()
+        except Exception as e:
+            log.warning(f"⚠️ Eski özet satırları silinemedi: {e}")
+    summary = {"rows": len(counts), "users": len({user for user, _ in counts}), "failed": len(failed)}
+    log.info(f"📆 Yıllık çalışma günü özeti yeniden oluşturuldu: {scanned} kayıt tarandı, "
+             f"{summary['users']} personel, {summary['rows']} personel/yıl"
+             + (f", {summary['failed']} hatalı" if failed else ""))
+    return summary
+
+
+def main(argv=None):
+    db.load_env()
+    parser = argparse.ArgumentParser(description="Personel yıllık çalışma günü özetini yeniden oluştur")
+    parser.add_argument("--rebuild", action="store_true", help="özeti düzenli kayıtlardan baştan hesapla")
+    parser.add_argument("--year", type=int, help="yalnızca bu yılı yeniden hesapla")
+    args = parser.parse_args(argv)
+    logsetup.configure()
+    if not args.rebuild:
+        # Değişiklik bekleyen (işaretli ya da önceki döngülerde yazılamamış) satırları tamamla
+        summary = update(set())
+    else:
+        summary = rebuild(year=args.year)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
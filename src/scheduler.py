@@ -0,0 +1,221 @@
+"""Uyarlamalı senkronizasyon zamanlayıcısı.
+
+Sabit 300 sn uyku yerine sabit hızlı (fixed-rate) tik kullanır: bir sonraki çalışma
+önceki çalışmanın *başlangıcına* göre planlanır, uzun süren bir sync sonraki
+döngüleri kaydırmaz ve çalışmalar asla üst üste binmez. Aralık duruma göre değişir:
+
+- Vardiya değişim pencerelerinde (SYNC_SHIFT_WINDOWS) ve son bir saatte dakikada
+  SYNC_BUSY_PUNCHES_PER_MIN'den fazla kayıt geldiyse SYNC_FAST_INTERVAL
+- Üst üste SYNC_IDLE_AFTER döngü yeni kayıt gelmezse aralık katlanarak
+  SYNC_MAX_INTERVAL'a kadar uzar; bir sonraki vardiya penceresi kaçırılmaz
+- Hata tekrarlarsa aralık katlanarak SYNC_MAX_INTERVAL'a kadar uzar
+- Her aralığa ±SYNC_JITTER oranında rastgelelik eklenir
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+log = logging.getLogger("pdks.scheduler")
+
+DEFAULT_SHIFT_WINDOWS = "07:30-09:00,16:30-18:30"
+RATE_WINDOW_SECONDS = 3600
+
+
+def parse_windows(spec):
+    """"07:30-09:00,23:30-00:30" -> [(450, 540), (1410, 30)] (gün içi dakika)"""
+    windows = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, end = part.split("-")
+        sh, sm = start.strip().split(":")
+        eh, em = end.strip().split(":")
+        windows.append((int(sh) * 60 + int(sm), int(eh) * 60 + int(em)))
+    return windows
+
+
+def _in_window(minute, window):
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end  # gece yarısını geçen pencere
+
+
+class AdaptiveScheduler:
+    """Bir işi uyarlamalı aralıklarla, üst üste binmeden çalıştırır"""
+
+    def __init__(self, base_interval=300, fast_interval=60, max_interval=1800,
+                 shift_windows=DEFAULT_SHIFT_WINDOWS, busy_rate=2.0, idle_after=3,
+                 jitter=0.1, rng=None):
+        self.base_interval = float(base_interval)
+        self.fast_interval = float(fast_interval)
+        self.max_interval = float(max_interval)
+        self.windows = parse_windows(shift_windows) if isinstance(shift_windows, str) else list(shift_windows)
+        self.busy_rate = float(busy_rate)
+        self.idle_after = int(idle_after)
+        self.jitter = float(jitter)
+        self.rng = rng or random.Random()
+
+        self._lock = threading.Lock()
+        self._recent = deque()  # (monotonic, yeni kayıt sayısı)
+        self._next_mono = time.monotonic()
+        self.errors = 0
+        self.idle_cycles = 0
+        self.runs = 0
+        self.overruns = 0
+        self.last_started = None
+        self.last_duration = None
+        self.last_interval = None
+        self.last_reason = None
+        self.last_error = None
+        self.next_run = datetime.now()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_interval=float(os.getenv("SYNC_INTERVAL", "300")),
+            fast_interval=float(os.getenv("SYNC_FAST_INTERVAL", "60")),
+            max_interval=float(os.getenv("SYNC_MAX_INTERVAL", "1800")),
+            shift_windows=os.getenv("SYNC_SHIFT_WINDOWS", DEFAULT_SHIFT_WINDOWS),
+            busy_rate=float(os.getenv("SYNC_BUSY_PUNCHES_PER_MIN", "2")),
+            idle_after=int(os.getenv("SYNC_IDLE_AFTER", "3")),
+            jitter=float(os.getenv("SYNC_JITTER", "0.1")),
+        )
+
+    # --- durum -----------------------------------------------------------
+
+    def in_shift_window(self, now=None):
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        return any(_in_window(minute, w) for w in self.windows)
+
+    def seconds_until_window(self, now=None):
+        """Bir sonraki vardiya penceresinin başlangıcına kalan saniye (pencere yoksa None)"""
+        if not self.windows:
+            return None
+        now = now or datetime.now()
+        best = None
+        for start, _ in self.windows:
+            at = now.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+            if at <= now:
+                at += timedelta(days=1)
+            seconds = (at - now).total_seconds()
+            best = seconds if best is None else min(best, seconds)
+        return best
+
+    def punch_rate(self):
+        """Son bir saatteki yeni kayıt sayısı / dakika.
+        Pencerenin tamamına bölünür; tek seferlik bir birikim (ör. kuyruk boşaltma)
+        yoğun trafik gibi görünmez.
+        """
+        horizon = time.monotonic() - RATE_WINDOW_SECONDS
+        while self._recent and self._recent[0][0] < horizon:
+            self._recent.popleft()
+        return sum(n for _, n in self._recent) * 60.0 / RATE_WINDOW_SECONDS
+
+    def status(self):
+        return {
+            "next_run": self.next_run.isoformat(timespec="seconds"),
+            "last_started": self.last_started.isoformat(timespec="seconds") if self.last_started else None,
+            "last_duration": self.last_duration,
+            "last_interval": self.last_interval,
+            "reason": self.last_reason,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "errors": self.errors,
+            "idle_cycles": self.idle_cycles,
+            "punch_rate": round(self.punch_rate(), 2),
+            "last_error": self.last_error,
+        }
+
+    # --- planlama ----------------------------------------------------------
+
+    def next_interval(self, now=None):
+        """(aralık sn, sebep) — jitter eklenmeden önce"""
+        now = now or datetime.now()
+        if self.errors:
+            return min(self.max_interval, self.base_interval * 2 ** (self.errors - 1)), f"{self.errors} ardışık hata"
+        if self.in_shift_window(now):
+            return self.fast_interval, "vardiya penceresi"
+        if self.busy_rate and self.punch_rate() >= self.busy_rate:
+            return self.fast_interval, "yoğun kayıt"
+        if self.idle_cycles >= self.idle_after:
+            interval = min(self.max_interval, self.base_interval * 2 ** (self.idle_cycles - self.idle_after + 1))
+            until = self.seconds_until_window(now)
+            if until is not None and until < interval:
+                return max(self.fast_interval, until), "vardiya penceresi yaklaşıyor"
+            return interval, f"{self.idle_cycles} döngüdür kayıt yok"
+        return self.base_interval, "normal"
+
+    def _plan(self, started_mono, finished_mono):
+        interval, reason = self.next_interval()
+        if self.jitter:
+            interval *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+        self.last_interval = round(interval, 1)
+        self.last_reason = reason
+        # Sabit hız: başlangıçtan itibaren say; süre aşıldıysa kaçırılan tikleri atla
+        target = started_mono + interval
+        if target < finished_mono:
+            self.overruns += 1
+            target = finished_mono
+        self._next_mono = target
+        self.next_run = datetime.now() + timedelta(seconds=target - finished_mono)
+
+    def run_once(self, job):
+        """İşi bir kez çalıştır. Önceki çalışma sürüyorsa atlar ve None döner."""
+        if not self._lock.acquire(blocking=False):
+            log.warning("Önceki sync hâlâ çalışıyor, bu tik atlandı")
+            return None
+        try:
+            started = time.monotonic()
+            self.last_started = datetime.now()
+            result = None
+            error = None
+            try:
+                result = job()
+                if isinstance(result, dict) and result.get("error"):
+                    error = result["error"]
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            finished = time.monotonic()
+
+            self.runs += 1
+            self.last_duration = round(finished - started, 2)
+            self.last_error = error
+            if error:
+                self.errors += 1
+            else:
+                self.errors = 0
+                new = int((result or {}).get("inserted", 0)) if isinstance(result, dict) else 0
+                self._recent.append((finished, new))
+                self.idle_cycles = 0 if new else self.idle_cycles + 1
+            self._plan(started, finished)
+            return result
+        finally:
+            self._lock.release()
+
+    def seconds_until_next(self):
+        return max(0.0, self._next_mono - time.monotonic())
+
+    def run_forever(self, job, wait=None, on_run=None):
+        """İşi planlanan zamanlarda çalıştır.
+        wait(saniye) True dönerse döngü biter (servis durdurma sinyali); varsayılan time.sleep.
+        on_run(scheduler) her çalışmadan sonra çağrılır (ör. durum dosyasını güncellemek için).
+        """
+        wait = wait or (lambda seconds: time.sleep(seconds) or False)
+        while True:
+            if wait(self.seconds_until_next()):
+                return
+            log.info("Sync başlatılıyor...")
+            self.run_once(job)
+            if self.last_error:
+                log.error(f"Sync hatası: {self.last_error}")
+            log.info(f"Sync tamamlandı ({self.last_duration} sn). Sonraki çalışma "
+                     f"{self.next_run:%H:%M:%S} ({self.last_interval:.0f} sn, {self.last_reason})")
+            if on_run:
+                on_run(self)
@@ -1,8 +1,21 @@
-from zk import ZK
-from supabase import create_client, Client
 from datetime import datetime, timedelta
+import logging
 import os
 
+try:
+    from src import clearing, db, devices, logsetup, metrics, pairing, payroll, provisioning, rollup, sync_state
+except ImportError:  # python src/sync.py
+    import clearing
+    import db
+    import devices
+    import logsetup
+    import metrics
+    import pairing
+    import payroll
+    import provisioning
+    import rollup
+    import sync_state
+
 try:
     from dotenv import load_dotenv  # type: ignore
     import os
@@ -12,63 +25,124 @@ try:
 except Exception:
     pass
 
-# Supabase bilgileri (Service Role anahtarı ile RLS baypas edilir)
-SUPABASE_URL = os.getenv("SUPABASE_URL", "https://adpopdmavlseifoxpobo.supabase.co")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+log = logging.getLogger("pdks.sync")
 
-if not SUPABASE_SERVICE_KEY:
-    raise RuntimeError(
-        "SUPABASE_SERVICE_KEY ortam değişkeni tanımlı değil. Lütfen Service Role key ile ayarlayın."
-    )
+# Supabase istemcisi ilk kullanımda oluşturulur (src/db.py);
+# Service Role anahtarı ile RLS baypas edilir
+supabase = db.client
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
+def _chunks(items, size):
+    """Listeyi en fazla `size` elemanlı parçalara böl"""
+    size = max(1, int(size))
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
-def record_exists(table, user_id, timestamp):
-    """Belirli kayıt var mı kontrol et"""
-    result = supabase.table(table).select("*").eq("kullanici_id", user_id).eq("giris_tarihi", timestamp).execute()
-    return bool(result.data)
+def _format_timestamp(ts_val):
+    if isinstance(ts_val, datetime):
+        return ts_val.strftime("%Y-%m-%d %H:%M:%S")
+    # Beklenmedik tipte ise stringe çevirmeyi dene
+    return str(ts_val)
 
-def save_to_supabase(records):
-    """Ham veriyi supabase'e kaydet"""
-    for rec in records:
-        user_id = rec["user_id"]
-        name = rec["name"]
-        ts_val = rec["timestamp"]
-        if isinstance(ts_val, datetime):
-            timestamp = ts_val.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            # Beklenmedik tipte ise stringe çevirmeyi dene
-            timestamp = str(ts_val)
+def _punch_key(user_id, timestamp):
+    """(kullanici_id, giris_tarihi) anahtarını karşılaştırılabilir hale getir.
+    Supabase '2025-08-12T17:53:52' döndürür, cihaz '2025-08-12 17:53:52' verir.
+    """
+    return str(user_id).strip(), str(timestamp).replace("T", " ")[:19]
+
+def select_all(make_query, page_size=None):
+    """make_query() ile kurulan (sıralı) sorguyu sayfa sayfa çalıştırıp tüm satırları döndür"""
+    page_size = page_size or int(os.getenv("SYNC_SELECT_PAGE_SIZE", "1000"))
+    rows = []
+    offset = 0
+    while True:
+        result = make_query().range(offset, offset + page_size - 1).execute()
+        page = getattr(result, 'data', None) or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+def fetch_existing_keys(table, start_ts, end_ts, page_size=None):
+    """Zaman aralığındaki mevcut (kullanici_id, giris_tarihi) anahtarlarını sayfalı al"""
+    rows = select_all(lambda: supabase.table(table)
+                      .select("kullanici_id,giris_tarihi")
+                      .gte("giris_tarihi", start_ts)
+                      .lte("giris_tarihi", end_ts)
+                      .order("id", desc=False), page_size)
+    return {_punch_key(row["kullanici_id"], row["giris_tarihi"]) for row in rows}
+
+def save_to_supabase(records, chunk_size=None):
+    """Ham veriyi supabase'e toplu kaydet.
+    Mevcut anahtarlar cihaz zaman aralığı için tek seferde çekilir, yeni kayıtlar
+    parçalar halinde upsert (on conflict do nothing) ile gönderilir.
+    Dönüş: {"inserted", "skipped", "failed"} sayaçları, hatalı anahtarlar ("failed_keys")
+    ve eklenen satırlar ("inserted_rows").
+    """
+    chunk_size = chunk_size or int(os.getenv("SYNC_INSERT_CHUNK_SIZE", "500"))
+    stats = {"inserted": 0, "skipped": 0, "failed": 0, "failed_keys": [], "inserted_rows": []}
 
-        if record_exists("personel_giris_cikis", user_id, timestamp):
-            print(f"Zaten var, eklenmedi: {user_id} - {timestamp}")
+    payloads = {}
+    for rec in records:
+        timestamp = _format_timestamp(rec["timestamp"])
+        key = _punch_key(rec["user_id"], timestamp)
+        if key in payloads:
+            # Aynı döküm içinde tekrar eden kayıt
+            stats["skipped"] += 1
             continue
-
-        record = {
-            "kullanici_id": user_id,
-            "isim": name,
+        payloads[key] = {
+            "kullanici_id": rec["user_id"],
+            "isim": rec["name"],
             "giris_tarihi": timestamp,
             "device_uid": rec.get("device_uid"),
             "status_code": rec.get("status_code"),
             "verify_method": rec.get("verify_method"),
         }
 
+    if not payloads:
+        return stats
+
+    timestamps = [key[1] for key in payloads]
+    try:
+        existing = fetch_existing_keys("personel_giris_cikis", min(timestamps), max(timestamps))
+    except Exception as e:
+        # Anahtarlar alınamazsa upsert yine de çakışmaları yok sayar
+        log.warning(f"Mevcut kayıtlar alınamadı, tümü gönderilecek: {e}")
+        existing = set()
+
+    new_rows = []
+    for key, payload in payloads.items():
+        if key in existing:
+            stats["skipped"] += 1
+        else:
+            new_rows.append(payload)
+
+    for chunk in _chunks(new_rows, chunk_size):
         try:
-            response = supabase.table("personel_giris_cikis").insert(record).execute()
+            response = supabase.table("personel_giris_cikis") \
+                .upsert(chunk, on_conflict="kullanici_id,giris_tarihi", ignore_duplicates=True) \
+                .execute()
             err = getattr(response, 'error', None)
             if err:
-                if "duplicate key" in str(err).lower():
-                    print(f"Duplicate key hatası, kayıt zaten var: {user_id} - {timestamp}")
-                else:
-                    print("Hata supabase insert:", err)
+                log.error(f"Hata supabase toplu insert: {err}")
+                stats["failed"] += len(chunk)
+                stats["failed_keys"].extend(_punch_key(r["kullanici_id"], r["giris_tarihi"]) for r in chunk)
             else:
-                print(f"Ham kayıt eklendi: {record}")
+                # ignore_duplicates ile yalnızca gerçekten eklenen satırlar döner
+                inserted_rows = getattr(response, 'data', None) or []
+                added = len(inserted_rows)
+                stats["inserted_rows"].extend(
+                    {"kullanici_id": r["kullanici_id"], "giris_tarihi": r["giris_tarihi"]} for r in inserted_rows
+                )
+                stats["inserted"] += added
+                stats["skipped"] += len(chunk) - added
         except Exception as e:
-            if "duplicate key" in str(e).lower():
-                print(f"Duplicate key hatası, kayıt zaten var: {user_id} - {timestamp}")
-            else:
-                print(f"Beklenmeyen hata: {e}")
+            log.error(f"Beklenmeyen hata (toplu insert, {len(chunk)} kayıt): {e}")
+            stats["failed"] += len(chunk)
+            stats["failed_keys"].extend(_punch_key(r["kullanici_id"], r["giris_tarihi"]) for r in chunk)
+
+    log.info(f"Ham kayıtlar: {stats['inserted']} eklendi, {stats['skipped']} zaten vardı, {stats['failed']} hatalı")
+    return stats
 
 def get_raw_attendance():
     """Ham tabloyu al"""
@@ -78,18 +152,18 @@ def get_raw_attendance():
         .execute()
     err = getattr(result, 'error', None)
     if err:
-        print("Hata supabase select:", err)
+        log.error(f"Hata supabase select: {err}")
         return []
     return result.data
 
 def get_all_raw_attendance():
     """Tüm ham kayıtları al"""
-    print("Tüm ham kayıtlar alınıyor...")
+    log.info("Tüm ham kayıtlar alınıyor...")
     return get_raw_attendance()
 
 def get_new_raw_attendance():
     """Sadece henüz işlenmemiş ham kayıtları al"""
-    print("Yeni ham kayıtlar kontrol ediliyor...")
+    log.info("Yeni ham kayıtlar kontrol ediliyor...")
     
     # En son işlenen kaydın tarihini bul
     last_processed = supabase.table("personel_giris_cikis_duzenli") \
@@ -101,7 +175,7 @@ def get_new_raw_attendance():
     last_date = None
     if not getattr(last_processed, 'error', None) and getattr(last_processed, 'data', []):
         last_date = getattr(last_processed, 'data', [])[0]['giris_tarihi']
-        print(f"Son işlenen kayıt tarihi: {last_date}")
+        log.info(f"Son işlenen kayıt tarihi: {last_date}")
     
     # Yeni kayıtları al
     query = supabase.table("personel_giris_cikis") \
@@ -114,295 +188,481 @@ def get_new_raw_attendance():
     result = query.execute()
     err = getattr(result, 'error', None)
     if err:
-        print("Hata supabase select:", err)
+        log.error(f"Hata supabase select: {err}")
         return []
     
     data = getattr(result, 'data', [])
-    print(f"Yeni kayıt sayısı: {len(data)}")
+    log.info(f"Yeni kayıt sayısı: {len(data)}")
     return data
 
 def generate_pairs(attendance):
-    """Ham kayıtları giriş-çıkış çiftlerine dönüştür"""
-    pairs = []
-    attendance_by_user_and_day = {}
-
-    for row in attendance:
-        user = row['kullanici_id']
-        time_str = row['giris_tarihi']
-        # string -> datetime
-        try:
-            time_dt = datetime.fromisoformat(time_str)
-        except Exception:
-            time_dt = time_str if isinstance(time_str, datetime) else None
-        if time_dt is None:
-            continue
-        
-        # İş günü kaydırması - gece yarısından sonraki kayıtlar için özel mantık
-        day_start_hour = int(os.getenv("SYNC_DAY_START_HOUR", "5"))
-        
-        # Eğer saat 00:00-05:00 arasındaysa, bu kayıt önceki günün devamı
-        # Eğer saat 05:00-23:59 arasındaysa, bu kayıt bugünün başlangıcı
-        hour = time_dt.hour
-        
-        if hour < day_start_hour:
-            # Gece yarısından sonra, önceki günün devamı
-            workday_dt = time_dt - timedelta(days=1)
-        else:
-            # Gündüz, bugünün başlangıcı
-            workday_dt = time_dt
-            
-        workday_date = workday_dt.date().isoformat()
-        
-        attendance_by_user_and_day.setdefault(user, {}).setdefault(workday_date, []).append(time_dt)
-
-    for user, days_data in attendance_by_user_and_day.items():
-        for workday_date, times in days_data.items():
-            times.sort()  # Tarihe göre sırala
-            
-            # YENİ: Minimum süre kontrolü - çok yakın kayıtları filtrele
-            min_interval_seconds = int(os.getenv("SYNC_MIN_INTERVAL_SECONDS", "300"))  # Varsayılan 5 dakika (300 saniye)
-            min_interval = timedelta(seconds=min_interval_seconds)
-            
-            filtered_times = []
-            for i, time in enumerate(times):
-                if i == 0:
-                    # İlk kayıt her zaman alınır
-                    filtered_times.append(time)
-                    print(f"İlk kayıt alındı: {user} - {time}")
-                else:
-                    # Son kayıttan minimum süre geçmişse al
-                    time_diff = time - filtered_times[-1]
-                    if time_diff >= min_interval:
-                        filtered_times.append(time)
-                        print(f"Yeni kayıt alındı: {user} - {time} (önceki: {filtered_times[-1]}, fark: {time_diff.total_seconds():.0f}s)")
-                    else:
-                        print(f"Çok yakın kayıt filtrelendi: {user} - {time} (önceki: {filtered_times[-1]}, fark: {time_diff.total_seconds():.0f}s)")
-            
-            # Ardışık giriş-çıkış çiftleri oluştur
-            for i in range(0, len(filtered_times), 2):
-                giris = filtered_times[i]
-                
-                # Eğer bir sonraki kayıt varsa, o çıkış olur
-                if i + 1 < len(filtered_times):
-                    cikis = filtered_times[i + 1]
-                    print(f"Çift oluşturuldu: {user} - Giriş: {giris}, Çıkış: {cikis}")
-                else:
-                    # Son kayıt tek başına kalırsa, sadece giriş olur
-                    cikis = None
-                    print(f"Tek giriş: {user} - Giriş: {giris} (çıkış yok)")
-
-                pairs.append({
-                    "kullanici_id": user,
-                    "giris_tarihi": giris.isoformat(sep=' '),
-                    "cikis_tarihi": cikis.isoformat(sep=' ') if cikis else None,
-                    "workday_date": workday_date,
-                    "admin_locked": False
-                })
-
-    return pairs
-
-def _split_name(full_name: str):
-    if not full_name:
-        return "", ""
-    parts = str(full_name).strip().split(" ", 1)
-    if len(parts) == 1:
-        return parts[0], ""
-    return parts[0], parts[1]
-
-def ensure_maas_ayari(kullanici_id, aktif=True):
-    """Personel için maaş ayarı yoksa varsayılan kayıt oluşturur."""
-    existing = supabase.table("maas_ayarlari").select("kullanici_id").eq("kullanici_id", kullanici_id).execute()
-    if getattr(existing, 'data', []):
-        return
-
-    payload = {
-        "kullanici_id": kullanici_id,
-        "aylik_maas": 0,
-        "hedef_saat": 240,
-        "aktif": aktif,
-    }
-    res = supabase.table("maas_ayarlari").insert(payload).execute()
-    if getattr(res, 'error', None):
-        print("Hata maas_ayarlari insert:", getattr(res, 'error', None))
-    else:
-        print(f"Maaş ayarı eklendi: kullanici_id={kullanici_id}")
+    """Ham kayıtları giriş-çıkış çiftlerine dönüştür (bkz. pairing.generate_pairs)"""
+    return pairing.generate_pairs(attendance)
 
 def ensure_personel(users_map, attendance_list):
-    """Cihazdaki kullanıcıları personel tablosuna (eksikleri) ekle.
-    ise_giris_tarihi olarak kullanıcının ilk attendance gününü veya bugünü kullanır.
+    """Cihazdaki kullanıcıları personel tablosuna (eksikleri) toplu ekle (bkz. provisioning)"""
+    return provisioning.ensure_personel(supabase, users_map, attendance_list)
+
+def save_pairs(pairs, existing=None, chunk_size=None):
+    """Giriş-çıkış çiftlerini düzenli tabloya toplu kaydet.
+    Mevcut satırlar (kullanici_id, workday_date) için tek sayfalı sorguyla önceden alınır
+    (ya da `existing` ile verilir); çiftler bellekte eklenecek / güncellenecek /
+    admin kilitli olarak ayrılır ve parçalar halinde gönderilir. Toplu ekleme başarısız
+    olan parça satır satır yeniden denenir (_retry_inserts).
+    Dönüş: {"inserted", "updated", "unchanged", "locked", "skipped", "failed"} özeti.
     """
-    # En erken zaman (gün) tespiti
-    earliest_by_user = {}
-    for a in attendance_list:
-        uid_str = getattr(a, "user_id", None)
-        ts = getattr(a, "timestamp", None)
-        if not uid_str or not isinstance(ts, datetime):
-            continue
-        try:
-            uid_int = int(uid_str)
-        except Exception:
-            continue
-        day = ts.date().isoformat()
-        cur = earliest_by_user.get(uid_int)
-        if cur is None or day < cur:
-            earliest_by_user[uid_int] = day
+    chunk_size = chunk_size or int(os.getenv("SYNC_INSERT_CHUNK_SIZE", "500"))
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0, "locked": 0, "skipped": 0, "failed": 0}
 
-    # Payload oluştur
-    for user_id, name in users_map.items():
-        try:
-            user_id_int = int(user_id)
-        except Exception:
-            continue
-        
-        # Mevcut var mı kontrol et
-        existing = supabase.table("personel").select("kullanici_id, aktif").eq("kullanici_id", user_id_int).execute()
-        if getattr(existing, 'data', []):
-            existing_data = existing.data[0]
-            if not existing_data.get('aktif', True):
-                continue  # Pasif personel, atla
-            continue  # Zaten var ve aktif
-        
-        # Ekle
-        first_day = earliest_by_user.get(user_id_int, datetime.now().date().isoformat())
-        name_parts = _split_name(name)
-        
-        payload = {
-            "kullanici_id": user_id_int,
-            "isim": name_parts[0],
-            "soyisim": name_parts[1],
-            "ise_giris_tarihi": first_day,
-            "aktif": True,
-            "maas_tipi": "saatli",
-            "calisma_tipi": "full_time",
-        }
-        
-        res = supabase.table("personel").insert(payload).execute()
-        if getattr(res, 'error', None):
-            print("Hata personel insert:", getattr(res, 'error', None))
-        else:
-            print(f"Personel eklendi: {payload}")
-            ensure_maas_ayari(user_id_int, aktif=True)
-
-def save_pairs(pairs):
-    """Giriş-çıkış çiftlerini düzenli tabloya kaydet.
-    Yoksa güncelle; mevcut yoksa ekle.
-    """
+    # Aynı iş günü için birden çok çift varsa sonuncusu geçerli
+    latest = {}
     for p in pairs:
         workday = p.get("workday_date")
         if not workday:
-            print(f"Workday date eksik, atlandı: {p}")
+            log.warning(f"Workday date eksik, atlandı: {p}")
+            summary["skipped"] += 1
             continue
-            
-        # 1) Mevcut bir kayıt var mı? (workday_date üzerinden)
-        existing = supabase.table("personel_giris_cikis_duzenli") \
-            .select("id, admin_locked") \
-            .eq("kullanici_id", p["kullanici_id"]) \
-            .eq("workday_date", workday) \
-            .execute()
-        err = getattr(existing, 'error', None)
-        rows = getattr(existing, 'data', []) if not err else []
-
-        if rows:
-            row = rows[0]
-            if row.get("admin_locked"):
-                print(f"Düzenli kayıt admin kilitli, atlandı: {p}")
-                continue
-            # Güncelle
-            upd = supabase.table("personel_giris_cikis_duzenli").update({
+        latest[(str(p["kullanici_id"]), workday)] = p
+    if not latest:
+        return summary
+
+    if existing is None:
+        user_ids = sorted({user for user, _ in latest})
+        workdays = sorted({workday for _, workday in latest})
+        existing = fetch_duzenli_rows(user_ids, workdays[0], workdays[-1])
+
+    inserts = []
+    updates = []
+    for key, p in latest.items():
+        row = existing.get(key)
+        if row is None:
+            inserts.append(dict(p))
+        elif row.get("admin_locked"):
+            summary["locked"] += 1
+        elif _same_ts(row.get("giris_tarihi"), p["giris_tarihi"]) and \
+                _same_ts(row.get("cikis_tarihi"), p["cikis_tarihi"]):
+            summary["unchanged"] += 1
+        else:
+            updates.append({
+                "id": row["id"],
+                "kullanici_id": row["kullanici_id"],
+                "workday_date": p["workday_date"],
                 "giris_tarihi": p["giris_tarihi"],
                 "cikis_tarihi": p["cikis_tarihi"],
                 "admin_locked": False  # Cihazdan gelen veri kilidi açar
-            }).eq("id", row["id"]).execute()
-            if getattr(upd, 'error', None):
-                print("Hata düzenli tablo update:", getattr(upd, 'error', None))
+            })
+
+    table = supabase.table
+    for label, rows, send in (
+        ("updated", updates, lambda chunk: table("personel_giris_cikis_duzenli")
+            .upsert(chunk, on_conflict="id", returning="minimal").execute()),
+        ("inserted", inserts, lambda chunk: table("personel_giris_cikis_duzenli")
+            .insert(chunk, returning="minimal").execute()),
+    ):
+        for chunk in _chunks(rows, chunk_size):
+            try:
+                res = send(chunk)
+                err = getattr(res, 'error', None)
+            except Exception as e:
+                err = e
+            if not err:
+                summary[label] += len(chunk)
+            elif label == "inserted":
+                log.warning(f"⚠️ Düzenli tablo toplu ekleme başarısız ({len(chunk)} kayıt), "
+                            f"kayıtlar tek tek deneniyor: {err}")
+                _retry_inserts(chunk, summary)
             else:
-                print(f"Düzenli kayıt güncellendi: {p}")
-        else:
-            # Ekle
-            insert_payload = dict(p)
-            res = supabase.table("personel_giris_cikis_duzenli").insert(insert_payload).execute()
-            if getattr(res, 'error', None):
-                print("Hata düzenli tablo insert:", getattr(res, 'error', None))
+                log.error(f"Hata düzenli tablo toplu yazma ({len(chunk)} kayıt): {err}")
+                summary["failed"] += len(chunk)
+
+    log.info(f"Düzenli kayıtlar: {summary['inserted']} eklendi, {summary['updated']} güncellendi, "
+             f"{summary['unchanged']} aynı, {summary['locked']} kilitli, {summary['failed']} hatalı")
+    return summary
+
+def _retry_inserts(chunk, summary):
+    """Toplu insert'i başarısız olan parçayı satır satır yaz.
+    Ön okumadan sonra trigger ya da başka bir süreç aynı (kullanici_id, workday_date)
+    satırını oluşturmuş olabilir; o satır eklenmez, güncellenir (admin kilitliyse dokunulmaz).
+    """
+    workdays = sorted(p["workday_date"] for p in chunk)
+    try:
+        existing = fetch_duzenli_rows(sorted({str(p["kullanici_id"]) for p in chunk}),
+                                      workdays[0], workdays[-1])
+    except Exception as e:
+        log.error(f"Hata düzenli kayıtlar okunamadı ({len(chunk)} kayıt): {e}")
+        summary["failed"] += len(chunk)
+        return
+    for p in chunk:
+        row = existing.get((str(p["kullanici_id"]), p["workday_date"]))
+        if row is not None and row.get("admin_locked"):
+            summary["locked"] += 1
+            continue
+        try:
+            if row is None:
+                label = "inserted"
+                res = supabase.table("personel_giris_cikis_duzenli") \
+                    .insert(p, returning="minimal").execute()
             else:
-                print(f"Düzenli kayıt eklendi: {insert_payload}")
+                label = "updated"
+                res = supabase.table("personel_giris_cikis_duzenli") \
+                    .upsert(dict(p, id=row["id"], kullanici_id=row["kullanici_id"]),
+                            on_conflict="id", returning="minimal").execute()
+            err = getattr(res, 'error', None)
+        except Exception as e:
+            err = e
+        if err:
+            log.error(f"Hata düzenli kayıt yazma ({p['kullanici_id']} {p['workday_date']}): {err}")
+            summary["failed"] += 1
+        else:
+            summary[label] += 1
+
+def affected_partitions(raw_rows, day_start_hour=None):
+    """Ham kayıtların dokunduğu (kullanici_id, workday_date) bölümleri"""
+    partitions = set()
+    for row in raw_rows:
+        workday = pairing.workday_of(row["giris_tarihi"], day_start_hour)
+        if workday:
+            partitions.add((str(row["kullanici_id"]), workday))
+    return partitions
+
+def fetch_duzenli_rows(user_ids, start_date, end_date):
+    """Kullanıcıların iş günü aralığındaki düzenli kayıtları {(kullanici_id, workday_date): satır}"""
+    rows = select_all(lambda: supabase.table("personel_giris_cikis_duzenli")
+                      .select("id,kullanici_id,giris_tarihi,cikis_tarihi,workday_date,admin_locked")
+                      .in_("kullanici_id", list(user_ids))
+                      .gte("workday_date", start_date)
+                      .lte("workday_date", end_date)
+                      .order("id", desc=False))
+    return {(str(r["kullanici_id"]), str(r["workday_date"])[:10]): r for r in rows}
+
+def _same_ts(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return str(a).replace("T", " ")[:19] == str(b).replace("T", " ")[:19]
+
+def repair_partitions(partitions, day_start_hour=None):
+    """Yalnızca verilen (kullanici_id, workday_date) bölümlerinin çiftlerini yeniden hesapla.
+    Bölümler iş gününe göre gruplanır; her iş günü için yalnızca o günün kullanıcılarının
+    o güne ait ham ve düzenli kayıtları (sayfalı) okunur. Çiftler mevcut düzenli kayıtlarla
+    karşılaştırılır ve sadece gerçekten değişen çiftler yazılır; admin_locked kayıtlara dokunulmaz.
+    """
+    summary = {"partitions": len(partitions), "changed": 0, "unchanged": 0, "locked": 0}
+    if not partitions:
+        return summary
+    if day_start_hour is None:
+        day_start_hour = int(os.getenv("SYNC_DAY_START_HOUR", "5"))
 
-def main():
-    zk = ZK('192.168.0.139', port=4370)
+    users_by_workday = {}
+    for user, workday in partitions:
+        users_by_workday.setdefault(workday, set()).add(user)
+
+    raw = []
+    existing = {}
+    for workday, users in sorted(users_by_workday.items()):
+        user_ids = sorted(users)
+        # İş günü day_start_hour'da başlar, ertesi gün day_start_hour'da biter
+        start_ts = f"{workday} {day_start_hour:02d}:00:00"
+        end_day = (datetime.fromisoformat(workday) + timedelta(days=1)).date().isoformat()
+        end_ts = f"{end_day} {day_start_hour:02d}:00:00"
+        raw.extend(select_all(lambda: supabase.table("personel_giris_cikis")
+                              .select("id,kullanici_id,giris_tarihi")
+                              .in_("kullanici_id", user_ids)
+                              .gte("giris_tarihi", start_ts)
+                              .lt("giris_tarihi", end_ts)
+                              .order("id", desc=False)))
+        existing.update(fetch_duzenli_rows(user_ids, workday, workday))
+    raw.sort(key=lambda r: r["id"])
+
+    # Aynı iş günü için birden çok çift çıkarsa, save_pairs'te olduğu gibi sonuncusu geçerli
+    latest = {}
+    for p in pairing.generate_pairs(raw, day_start_hour=day_start_hour):
+        latest[(str(p["kullanici_id"]), p["workday_date"])] = p
+
+    changed = []
+    for key, p in latest.items():
+        row = existing.get(key)
+        if row is not None:
+            if row.get("admin_locked"):
+                summary["locked"] += 1
+                continue
+            if _same_ts(row.get("giris_tarihi"), p["giris_tarihi"]) and \
+                    _same_ts(row.get("cikis_tarihi"), p["cikis_tarihi"]):
+                summary["unchanged"] += 1
+                continue
+        changed.append(p)
+
+    summary["changed"] = len(changed)
+    if changed:
+        summary["saved"] = save_pairs(changed, existing=existing)
+    log.info(f"Artımlı eşleştirme: {summary['partitions']} bölüm, {summary['changed']} değişti, "
+             f"{summary['unchanged']} aynı, {summary['locked']} kilitli")
+    return summary
+
+def enqueue_records(records_by_device, state):
+    """Cihazlardan gelen yeni kayıtları ağa çıkmadan önce yerel kuyruğa (pending) yaz.
+    Supabase'e ulaşılamasa bile kayıtlar burada kalıcıdır. Kuyruğa eklenen sayıyı döndürür.
+    """
+    queued = 0
+    with metrics.span("dedup"):
+        for device, attendance_records in records_by_device.items():
+            fresh = state.filter_new(device, attendance_records)
+            log.info(f"{device}: cihazda {len(attendance_records)} kayıt, {len(fresh)} yeni")
+            metrics.inc("punches_new", len(fresh))
+            state.journal(device, fresh)
+            queued += len(fresh)
+    return queued
+
+def drain_queue(state, batch_size=None, force=False):
+    """Kuyruğu sıra numarasına göre toplu partiler halinde Supabase'e boşalt.
+    Bir partide hata olursa boşaltma durur ve sonraki deneme üstel beklemeyle ertelenir
+    (SYNC_DRAIN_BACKOFF, en fazla SYNC_DRAIN_BACKOFF_MAX sn). Ağ geri gelince birikmiş
+    kayıtların tamamı aynı döngüde toplu gönderilir.
+    """
+    batch_size = batch_size or int(os.getenv("SYNC_DRAIN_BATCH_SIZE", "5000"))
+    totals = {"inserted": 0, "skipped": 0, "failed": 0, "failed_keys": [], "inserted_rows": [], "deferred": False}
+
+    deferred_until = None if force else state.drain_deferred_until()
+    if deferred_until:
+        depth, _ = state.queue_stats()
+        log.warning(f"⏳ Supabase'e gönderim ertelendi, kuyrukta {depth} kayıt "
+                    f"(sonraki deneme {deferred_until:%H:%M:%S})")
+        totals["deferred"] = True
+    else:
+        last_seq = 0
+        failed_batch = False
+        while True:
+            batch = state.pending_batch(batch_size, after_seq=last_seq)
+            if not batch:
+                break
+            last_seq = batch[-1][0]
+            with metrics.span("insert"):
+                stats = save_to_supabase([rec for _, _, rec in batch])
+            for key in ("inserted", "skipped", "failed"):
+                totals[key] += stats[key]
+                metrics.inc(key, stats[key])
+            totals["failed_keys"].extend(stats["failed_keys"])
+            totals["inserted_rows"].extend(stats["inserted_rows"])
+
+            failed = set(stats["failed_keys"])
+            by_device = {}
+            for _, device, rec in batch:
+                if _punch_key(rec["user_id"], _format_timestamp(rec["timestamp"])) not in failed:
+                    by_device.setdefault(device, []).append(rec)
+            for device, recs in by_device.items():
+                state.commit(device, recs)
+            if stats["failed"]:
+                failed_batch = True
+                break
+
+        if failed_batch:
+            delay = state.record_drain_failure(
+                float(os.getenv("SYNC_DRAIN_BACKOFF", "30")),
+                float(os.getenv("SYNC_DRAIN_BACKOFF_MAX", "1800")),
+            )
+            log.warning(f"⚠️ Supabase'e gönderilemeyen kayıtlar kuyrukta kaldı, {delay:.0f} sn sonra tekrar denenecek")
+        else:
+            state.record_drain_success()
+
+    depth, age = state.queue_stats()
+    metrics.gauge("queue_depth", depth)
+    metrics.gauge("queue_oldest_age_seconds", round(age or 0.0, 1))
+    if depth:
+        log.info(f"📦 Kuyruk: {depth} kayıt bekliyor, en eskisi {age or 0:.0f} sn önce")
+    return totals
+
+def sync_new_records(records_by_device, state=None):
+    """Yerel kuyruktan geçirerek yalnızca yeni kayıtları Supabase'e gönder.
+    records_by_device: {cihaz: kayıtlar}. Kayıtlar önce kuyruğa yazılır, sonra kuyruk
+    (önceki çalışmalardan kalanlar dahil) sırayla boşaltılır.
+    """
+    own_state = state is None
+    state = state or sync_state.SyncState()
     try:
-        conn = zk.connect()
-
-        # Kullanıcı ID -> isim eşlemesi
-        users = {user.user_id: user.name for user in conn.get_users()}
-        attendance = conn.get_attendance()
-
-        # ID → isim ekle ve cihaz alanlarını taşı
-        attendance_records = []
-        for a in attendance:
-            # Ham veriyi logla
-            punch_info = getattr(a, "punch", None)
-            status_info = getattr(a, "status", None)
-            print(f"Ham veri: UserID={a.user_id}, Time={a.timestamp}, Status={status_info}, Punch={punch_info}, UID={getattr(a, 'uid', 'N/A')}")
-            
-            # Punch bilgisini analiz et
-            is_entry = True  # Varsayılan olarak giriş
-            if punch_info is not None:
-                # Punch değeri 0 ise giriş, 1 ise çıkış olabilir (cihaza göre değişir)
-                if punch_info == 1:
-                    is_entry = False
-                    print(f"Çıkış tespit edildi: {a.user_id} - {a.timestamp}")
-                elif punch_info == 0:
-                    print(f"Giriş tespit edildi: {a.user_id} - {a.timestamp}")
+        replay, _ = state.queue_stats()
+        if replay:
+            log.info(f"Önceki çalışmadan kalan {replay} kayıt tekrar gönderiliyor")
+            metrics.inc("retries", replay)
+        enqueue_records(records_by_device, state)
+        return drain_queue(state)
+    finally:
+        if own_state:
+            state.close()
+
+def ingest_records(records_by_device, state=None):
+    """Normal yazma yolu: yeni kayıtları gönder, gerekirse etkilenen günleri yeniden eşleştir.
+    Hem periyodik sync (main) hem canlı mod (live.py) bunu kullanır.
+    """
+    stats = sync_new_records(records_by_device, state=state)
+    _repair_inserted(stats)
+    return stats
+
+def _repair_inserted(stats):
+    # Trigger yerine Python tarafında artımlı eşleştirme: SYNC_INCREMENTAL_PAIRING=true
+    if stats["inserted_rows"] and os.getenv("SYNC_INCREMENTAL_PAIRING", "false").lower() == "true":
+        with metrics.span("pairing"):
+            repair_partitions(affected_partitions(stats["inserted_rows"]))
+
+def _refresh_summaries(state, stats):
+    # Maaş ekranının okuduğu aylık özet (src/payroll.py): SYNC_PAYROLL_SUMMARY=true
+    if os.getenv("SYNC_PAYROLL_SUMMARY", "false").lower() == "true":
+        try:
+            with metrics.span("payroll"):
+                state.mark_payroll_months(payroll.months_of_rows(stats["inserted_rows"]))
+                payroll.refresh(state, recent=False)
+        except Exception as e:
+            log.warning(f"⚠️ Aylık özet güncellenemedi: {e}")
+    # İzin özetinin okuduğu yıllık çalışma günleri (src/rollup.py): SYNC_WORKDAY_ROLLUP=true
+    if os.getenv("SYNC_WORKDAY_ROLLUP", "false").lower() == "true":
+        try:
+            with metrics.span("rollup"):
+                rollup.update(rollup.years_of_partitions(affected_partitions(stats["inserted_rows"])), state)
+        except Exception as e:
+            log.warning(f"⚠️ Yıllık çalışma günü özeti güncellenemedi: {e}")
+
+def build_attendance_records(attendance, users, device=None, site=None):
+    """Cihaz kayıtlarına isim ekle, cihaz alanlarını ve kaynak cihazı taşı"""
+    attendance_records = []
+    # Okutma bazındaki izler yalnızca LOG_LEVEL=DEBUG iken üretilir
+    debug = log.isEnabledFor(logging.DEBUG)
+    for a in attendance:
+        punch_info = getattr(a, "punch", None)
+        status_info = getattr(a, "status", None)
+        if debug:
+            log.debug("Ham veri: UserID=%s, Time=%s, Status=%s, Punch=%s, UID=%s",
+                      a.user_id, a.timestamp, status_info, punch_info, getattr(a, 'uid', 'N/A'))
+
+        # Punch bilgisini analiz et
+        is_entry = True  # Varsayılan olarak giriş
+        if punch_info is not None:
+            # Punch değeri 0 ise giriş, 1 ise çıkış olabilir (cihaza göre değişir)
+            if punch_info == 1:
+                is_entry = False
+                if debug:
+                    log.debug("Çıkış tespit edildi: %s - %s", a.user_id, a.timestamp)
+            elif punch_info == 0:
+                if debug:
+                    log.debug("Giriş tespit edildi: %s - %s", a.user_id, a.timestamp)
+        else:
+            # Punch bilgisi yoksa, zaman aralığına göre tahmin et
+            hour = a.timestamp.hour
+            if 6 <= hour <= 12:  # Sabah 6-12 arası muhtemelen giriş
+                is_entry = True
+                if debug:
+                    log.debug("Sabah giriş tahmin edildi: %s - %s", a.user_id, a.timestamp)
+            elif 16 <= hour <= 23:  # Akşam 16-23 arası muhtemelen çıkış
+                is_entry = False
+                if debug:
+                    log.debug("Akşam çıkış tahmin edildi: %s - %s", a.user_id, a.timestamp)
             else:
-                # Punch bilgisi yoksa, zaman aralığına göre tahmin et
-                hour = a.timestamp.hour
-                if 6 <= hour <= 12:  # Sabah 6-12 arası muhtemelen giriş
-                    is_entry = True
-                    print(f"Sabah giriş tahmin edildi: {a.user_id} - {a.timestamp}")
-                elif 16 <= hour <= 23:  # Akşam 16-23 arası muhtemelen çıkış
-                    is_entry = False
-                    print(f"Akşam çıkış tahmin edildi: {a.user_id} - {a.timestamp}")
-                else:
-                    # Gece yarısı ve erken sabah için varsayılan giriş
-                    is_entry = True
-                    print(f"Gece/erken sabah giriş tahmin edildi: {a.user_id} - {a.timestamp}")
-            
-            attendance_records.append({
-                "user_id": a.user_id,
-                "name": users.get(a.user_id, "Bilinmiyor"),
-                "timestamp": a.timestamp,
-                "device_uid": getattr(a, "uid", None),
-                "status_code": status_info,
-                "verify_method": punch_info,
-                "is_entry": is_entry,  # Yeni alan
-            })
+                # Gece yarısı ve erken sabah için varsayılan giriş
+                is_entry = True
+                if debug:
+                    log.debug("Gece/erken sabah giriş tahmin edildi: %s - %s", a.user_id, a.timestamp)
+
+        attendance_records.append({
+            "user_id": a.user_id,
+            "name": users.get(a.user_id, "Bilinmiyor"),
+            "timestamp": a.timestamp,
+            "device_uid": getattr(a, "uid", None),
+            "status_code": status_info,
+            "verify_method": punch_info,
+            "is_entry": is_entry,  # Yeni alan
+            "device": device,
+            "site": site,
+        })
+    return attendance_records
+
+def _sync_cycle(zk_factory):
+    results = []
+    summary = {"devices": 0, "devices_failed": 0, "fetched": 0, "queued": 0, "inserted": 0,
+               "skipped": 0, "failed": 0, "queue_depth": 0, "error": None}
+    state = sync_state.SyncState()
+    try:
+        # Tüm cihazları eşzamanlı oku (cihaz listesi: SYNC_DEVICES / devices.json)
+        with metrics.span("collect"):
+            results = devices.collect(zk_factory=zk_factory, state=state)
+
+        users = {}
+        attendance = []
+        records_by_device = {}
+        with metrics.span("build_records"):
+            for result in results:
+                if result["error"]:
+                    continue
+                users.update(result["users"])
+                attendance.extend(result["attendance"])
+                records_by_device[result["device"]] = build_attendance_records(
+                    result["attendance"], result["users"], result["device"], result["site"]
+                )
+        summary["devices"] = len(results)
+        summary["devices_failed"] = sum(1 for r in results if r["error"])
+        summary["fetched"] = len(attendance)
+        metrics.inc("punches_read", len(attendance))
+        timestamps = [a.timestamp for a in attendance if isinstance(getattr(a, "timestamp", None), datetime)]
+        if timestamps:
+            # Cihazdaki en yeni kaydın bu döngüye kadar geçen süresi
+            metrics.gauge("cycle_lag_seconds", round((datetime.now() - max(timestamps)).total_seconds(), 1))
+        if not records_by_device:
+            log.warning("⚠️ Hiçbir cihazdan veri alınamadı")
+            if results:
+                summary["error"] = "Hiçbir cihazdan veri alınamadı"
+
+        # Kayıtlar ağa çıkmadan önce yerel kuyruğa yazılır; Supabase'e ulaşılamasa da kaybolmaz
+        replay, _ = state.queue_stats()
+        if replay:
+            log.info(f"Önceki çalışmadan kalan {replay} kayıt tekrar gönderiliyor")
+            metrics.inc("retries", replay)
+        summary["queued"] = enqueue_records(records_by_device, state)
+        devices.remember(results, state)
 
         # Personel kayıtlarını cihazdan otomatik oluşturmak istenirse açın:
         # SYNC_AUTO_CREATE_PERSONEL=true iken aktif olur. Varsayılan: kapalı.
-        if os.getenv("SYNC_AUTO_CREATE_PERSONEL", "false").lower() == "true":
-            ensure_personel(users, attendance)
-
-        save_to_supabase(attendance_records)
-        
-        # Cihazdaki verileri temizle (her sync'te)
-        if os.getenv("SYNC_CLEAR_DEVICE_DATA", "false").lower() == "true":
+        if users and os.getenv("SYNC_AUTO_CREATE_PERSONEL", "false").lower() == "true":
             try:
-                print("🧹 Cihazdaki veriler temizleniyor...")
-                # Cihazdaki tüm attendance verilerini sil
-                conn.clear_attendance()
-                print("✅ Cihazdaki veriler başarıyla temizlendi")
-            except Exception as clear_error:
-                print(f"⚠️ Cihaz temizleme hatası: {clear_error}")
-                print("Veriler Supabase'de güvende, devam ediliyor...")
-        else:
-            print("ℹ️ Cihaz temizleme kapalı (SYNC_CLEAR_DEVICE_DATA=false)")
-        
-        conn.disconnect()
+                with metrics.span("provision"):
+                    ensure_personel(users, attendance)
+            except Exception as e:
+                log.warning(f"⚠️ Personel oluşturulamadı: {e}")
+
+        stats = drain_queue(state)
+        _repair_inserted(stats)
+        _refresh_summaries(state, stats)
+        for key in ("inserted", "skipped", "failed"):
+            summary[key] = stats[key]
+        summary["queue_depth"], _ = state.queue_stats()
+        if stats["failed"]:
+            summary["error"] = f"{stats['failed']} kayıt Supabase'e gönderilemedi, kuyrukta bekliyor"
+
+        # Haftalık temizleme (src/clearing.py): yalnızca kuyruk boşken, doğrulanıp arşivlendikten sonra
+        with metrics.span("clearing"):
+            clearing.run(results, state, summary["queue_depth"])
 
         # Trigger otomatik olarak çalışacak, manuel işleme gerek yok
-        print("Ham veriler kaydedildi. Trigger otomatik olarak giriş-çıkış çiftlerini oluşturacak.")
+        log.info("Ham veriler kaydedildi. Trigger otomatik olarak giriş-çıkış çiftlerini oluşturacak.")
 
     except Exception as e:
-        print("Hata:", e)
+        log.exception(f"Hata: {e}")
+        summary["error"] = str(e) or e.__class__.__name__
+    finally:
+        devices.disconnect_all(results)
+        state.close()
+    return summary
+
+def main(zk_factory=devices.make_zk):
+    """Tek senkronizasyon döngüsü. Zamanlayıcı için özet istatistik döndürür.
+    Aşama süreleri ve sayaçlar logs/sync_status.json ve logs/pdks_sync.prom'a yazılır.
+    zk_factory: cihaz ayarından bağlantı nesnesi üreten fonksiyon (testlerde sahte cihaz).
+    """
+    with metrics.cycle() as cycle_metrics:
+        summary = _sync_cycle(zk_factory)
+        cycle_metrics.error = summary["error"]
+    # Döngü başına tek özet satırı (anahtar=değer), okutma bazında satır yok
+    log.log(logging.ERROR if summary["error"] else logging.INFO,
+            "Döngü özeti: " + " ".join(f"{k}={v}" for k, v in summary.items() if k != "error")
+            + (f" error={summary['error']!r}" if summary["error"] else ""),
+            extra={"sync_summary": summary})
+    return summary
 
 if __name__ == "__main__":
+    logsetup.configure("sync.log")
     main()
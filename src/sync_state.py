@@ -0,0 +1,349 @@
+"""Yerel senkronizasyon durumu (SQLite).
+
+Cihaz başına son işlenen zaman/seri numarasını (watermark), Supabase'e
+yazılmış kayıtların içerik özetlerini ve henüz onaylanmamış kayıtların
+"pending" günlüğünü tutar. Böylece her döngüde yalnızca yeni kayıtlar ağa çıkar,
+yarıda kalan bir döngünün kayıtları bir sonraki başlangıçta tekrar gönderilir.
+
+pending tablosu aynı zamanda giden kuyruktur (store-and-forward): kayıtlar ağa
+çıkmadan önce buraya yazılır (WAL modu), sıra numarasına göre toplu boşaltılır.
+Supabase'e ulaşılamazsa boşaltma üstel beklemeyle ertelenir; cihaz temizliği
+yalnızca kuyruk boşken yapılır.
+
+Saklama süresinin (SYNC_STATE_RETENTION_DAYS) gerisindeki kayıtların özetleri
+silinir; bu kayıtlar gönderilmiş sayılır ve atlanır. Atlanan her kayıt bir kez
+loglanır (skipped tablosu, cihaz temizlenince boşaltılır).
+Saati ileri olan bir cihazın kaydı watermark'ı geleceğe itip gerçek kayıtları bu
+sınırın gerisinde bırakmasın diye watermark şimdiki zaman + SYNC_CLOCK_SKEW_MINUTES
+(varsayılan 60) ile sınırlanır.
+
+device_snapshot tablosu cihazın son görülen kayıt/kullanıcı sayaçlarını ve
+kullanıcı listesini tutar; sayaçlar değişmediyse cihazdan indirme atlanır.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'sync_state.db'
+)
+
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+log = logging.getLogger("pdks.sync_state")
+
+
+def _ts_str(ts_val):
+    if isinstance(ts_val, datetime):
+        return ts_val.strftime(_TS_FORMAT)
+    return str(ts_val).replace("T", " ")[:19]
+
+
+def punch_hash(rec):
+    """Kaydın içerik özeti (cihaz seri numarası hariç, cihaz temizlenince değişir)"""
+    raw = "|".join(str(x) for x in (
+        str(rec["user_id"]).strip(),
+        _ts_str(rec["timestamp"]),
+        rec.get("status_code"),
+        rec.get("verify_method"),
+    ))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SyncState:
+    """Cihaz watermark'ı, gönderilmiş kayıt özetleri ve pending günlüğü"""
+
+    def __init__(self, path=None, retention_days=None):
+        self.path = path or os.getenv("SYNC_STATE_DB", DEFAULT_STATE_PATH)
+        self.retention = timedelta(days=int(
+            retention_days if retention_days is not None
+            else os.getenv("SYNC_STATE_RETENTION_DAYS", "45")
+        ))
+        self.max_skew = timedelta(minutes=int(os.getenv("SYNC_CLOCK_SKEW_MINUTES", "60")))
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        # WAL: okuma/yazma birbirini beklemez; FULL: onaylanan kuyruk kaydı elektrik kesintisinde kaybolmaz
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watermark (
+                device TEXT PRIMARY KEY,
+                last_timestamp TEXT,
+                last_serial INTEGER,
+                updated_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS seen (
+                hash TEXT PRIMARY KEY,
+                device TEXT,
+                timestamp TEXT
+            );
+            CREATE INDEX IF NOT EXISTS seen_timestamp ON seen(timestamp);
+            CREATE TABLE IF NOT EXISTS pending (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                hash TEXT UNIQUE,
+                device TEXT,
+                payload TEXT,
+                created_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS skipped (
+                hash TEXT PRIMARY KEY,
+                device TEXT,
+                timestamp TEXT
+            );
+            CREATE TABLE IF NOT EXISTS device_snapshot (
+                device TEXT PRIMARY KEY,
+                records INTEGER,
+                users_fp TEXT,
+                users TEXT,
+                full_at REAL,
+                updated_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def watermark(self, device):
+        """(last_timestamp, last_serial) ya da (None, None)"""
+        row = self.conn.execute(
+            "SELECT last_timestamp, last_serial FROM watermark WHERE device = ?", (device,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _watermark_limit(self):
+        """Watermark'ın ulaşabileceği en ileri zaman (cihaz saati ileride olabilir)"""
+        return _ts_str(datetime.now() + self.max_skew)
+
+    def filter_new(self, device, records):
+        """Daha önce gönderilmemiş ve pending'de olmayan kayıtları döndür"""
+        last_ts, _ = self.watermark(device)
+        horizon = None
+        if last_ts:
+            last_ts = min(last_ts, self._watermark_limit())
+            horizon = _ts_str(datetime.strptime(last_ts, _TS_FORMAT) - self.retention)
+
+        fresh = []
+        old = []
+        for rec in records:
+            # Saklama süresinin gerisindeki kayıtların özeti silinmiştir; çoktan gönderilmiş sayılır
+            if horizon and _ts_str(rec["timestamp"]) < horizon:
+                old.append(rec)
+            else:
+                fresh.append(rec)
+        if old:
+            self._report_skipped(device, old, horizon)
+
+        hashes = [punch_hash(rec) for rec in fresh]
+        known = set()
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            marks = ",".join("?" * len(part))
+            for table in ("seen", "pending"):
+                known.update(h for (h,) in self.conn.execute(
+                    f"SELECT hash FROM {table} WHERE hash IN ({marks})", part
+                ))
+        return [rec for rec, h in zip(fresh, hashes) if h not in known]
+
+    def _report_skipped(self, device, records, horizon):
+        """Saklama süresi nedeniyle atlanan kayıtları, daha önce loglanmadıysa logla"""
+        rows = {punch_hash(rec): rec for rec in records}
+        hashes = list(rows)
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            marks = ",".join("?" * len(part))
+            for (h,) in self.conn.execute(f"SELECT hash FROM skipped WHERE hash IN ({marks})", part):
+                rows.pop(h, None)
+        if not rows:
+            return
+        for rec in sorted(rows.values(), key=lambda r: _ts_str(r["timestamp"])):
+            log.warning(f"⚠️ {device}: kullanıcı {rec['user_id']} {_ts_str(rec['timestamp'])} kaydı saklama "
+                        f"süresinin ({self.retention.days} gün, sınır {horizon}) gerisinde, gönderilmiş sayılıp atlandı")
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO skipped (hash, device, timestamp) VALUES (?, ?, ?)",
+                [(h, device, _ts_str(rec["timestamp"])) for h, rec in rows.items()],
+            )
+
+    def journal(self, device, records):
+        """Kayıtları ağa çıkmadan önce pending günlüğüne yaz"""
+        now = datetime.now().strftime(_TS_FORMAT)
+        rows = []
+        for rec in records:
+            payload = dict(rec)
+            payload["timestamp"] = _ts_str(rec["timestamp"])
+            rows.append((punch_hash(rec), device, json.dumps(payload, ensure_ascii=False, default=str), now))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO pending (hash, device, payload, created_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def pending_records(self):
+        """Önceki çalışmalardan kalan pending kayıtları (device, record) olarak sırayla döndür"""
+        out = []
+        for device, payload in self.conn.execute("SELECT device, payload FROM pending ORDER BY seq"):
+            rec = json.loads(payload)
+            rec["timestamp"] = datetime.strptime(rec["timestamp"], _TS_FORMAT)
+            out.append((device, rec))
+        return out
+
+    def pending_batch(self, limit, after_seq=0):
+        """Kuyruktan sıra numarasına göre en fazla `limit` kayıt: [(seq, device, record)]"""
+        out = []
+        for seq, device, payload in self.conn.execute(
+            "SELECT seq, device, payload FROM pending WHERE seq > ? ORDER BY seq LIMIT ?", (after_seq, limit)
+        ):
+            rec = json.loads(payload)
+            rec["timestamp"] = datetime.strptime(rec["timestamp"], _TS_FORMAT)
+            out.append((seq, device, rec))
+        return out
+
+    def queue_stats(self):
+        """(kuyruktaki kayıt sayısı, en eski kaydın yaşı sn ya da None)"""
+        depth, oldest = self.conn.execute("SELECT COUNT(*), MIN(created_at) FROM pending").fetchone()
+        age = None
+        if oldest:
+            age = max(0.0, (datetime.now() - datetime.strptime(oldest, _TS_FORMAT)).total_seconds())
+        return depth, age
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, **values):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, None if v is None else str(v)) for k, v in values.items()],
+            )
+
+    def drain_deferred_until(self):
+        """Boşaltma ertelenmişse bir sonraki deneme zamanı, değilse None"""
+        value = self._meta("drain_next_at")
+        if not value:
+            return None
+        next_at = datetime.strptime(value, _TS_FORMAT)
+        return next_at if next_at > datetime.now() else None
+
+    def record_drain_failure(self, base_delay, max_delay):
+        """Başarısız boşaltmadan sonra bekleme süresini katla; bekleme sn döner"""
+        failures = int(self._meta("drain_failures", "0")) + 1
+        delay = min(max_delay, base_delay * 2 ** (failures - 1))
+        next_at = datetime.now() + timedelta(seconds=delay)
+        self._set_meta(drain_failures=failures, drain_next_at=next_at.strftime(_TS_FORMAT))
+        return delay
+
+    def record_drain_success(self):
+        self._set_meta(drain_failures=0, drain_next_at=None)
+
+    def payroll_cursor(self):
+        """Aylık özet işinin son işlediği düzenli kayıt id'si ve yeniden hesaplanacak aylar"""
+        last_id = int(self._meta("payroll_last_id", "0"))
+        months = set(json.loads(self._meta("payroll_months", "[]")))
+        return last_id, months
+
+    def mark_payroll_months(self, months):
+        """Aylık özette yeniden hesaplanacak ayları (YYYY-MM) işaretle"""
+        months = set(months)
+        if not months:
+            return
+        _, pending = self.payroll_cursor()
+        if not months - pending:
+            return
+        self._set_meta(payroll_months=json.dumps(sorted(pending | months)))
+
+    def save_payroll_cursor(self, last_id, done_months):
+        """Özeti yazılan ayları işaretten çıkar, düzenli kayıt id'sini ilerlet"""
+        _, pending = self.payroll_cursor()
+        self._set_meta(payroll_last_id=int(last_id),
+                       payroll_months=json.dumps(sorted(pending - set(done_months))))
+
+    def pending_rollup_years(self):
+        """Yıllık çalışma günü özetinde yeniden sayılacak {(kullanici_id, yıl)}"""
+        return {(str(user), int(year)) for user, year in json.loads(self._meta("rollup_years", "[]"))}
+
+    def mark_rollup_years(self, keys):
+        keys = {(str(user), int(year)) for user, year in keys}
+        pending = self.pending_rollup_years()
+        if keys - pending:
+            self._set_meta(rollup_years=json.dumps(sorted(pending | keys)))
+
+    def clear_rollup_years(self, keys):
+        pending = self.pending_rollup_years()
+        done = {(str(user), int(year)) for user, year in keys}
+        if pending & done:
+            self._set_meta(rollup_years=json.dumps(sorted(pending - done)))
+
+    def device_snapshot(self, device):
+        """Cihazın son görülen sayaçları: {"records", "users_fp", "users", "full_at"} ya da None"""
+        row = self.conn.execute(
+            "SELECT records, users_fp, users, full_at FROM device_snapshot WHERE device = ?", (device,)
+        ).fetchone()
+        if not row:
+            return None
+        return {"records": row[0], "users_fp": row[1],
+                "users": json.loads(row[2]) if row[2] else None, "full_at": row[3] or 0.0}
+
+    def save_device_snapshot(self, device, records, users_fp, users=None, full_at=None):
+        """Sayaçları kaydet; users / full_at verilmezse öncekiler korunur"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO device_snapshot (device, records, users_fp, users, full_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(device) DO UPDATE SET records = excluded.records, users_fp = excluded.users_fp, "
+                "users = COALESCE(excluded.users, users), full_at = COALESCE(excluded.full_at, full_at), "
+                "updated_at = excluded.updated_at",
+                (device, records, users_fp,
+                 None if users is None else json.dumps(users, ensure_ascii=False),
+                 full_at, datetime.now().strftime(_TS_FORMAT)),
+            )
+
+    def forget_device_records(self, device):
+        """Cihaz temizlendi: sonraki döngüde kayıtlar sayaçtan bağımsız okunur"""
+        with self.conn:
+            self.conn.execute("UPDATE device_snapshot SET records = NULL WHERE device = ?", (device,))
+            # Cihazda artık yoklar; atlanan kayıt listesine gerek kalmadı
+            self.conn.execute("DELETE FROM skipped WHERE device = ?", (device,))
+
+    def commit(self, device, records):
+        """Supabase'de kalıcı olan kayıtları pending'den çıkar, watermark'ı ilerlet"""
+        if not records:
+            return
+        rows = [(punch_hash(rec), device, _ts_str(rec["timestamp"])) for rec in records]
+        max_ts = max(r[2] for r in rows)
+        limit = self._watermark_limit()
+        if max_ts > limit:
+            future = sorted(r[2] for r in rows if r[2] > limit)
+            log.warning(f"⚠️ {device}: {len(future)} kayıt ileri tarihli (en ileri {future[-1]}), "
+                        f"cihaz saatini kontrol edin; watermark {limit} ile sınırlandı")
+        serials = [int(rec["device_uid"]) for rec in records
+                   if str(rec.get("device_uid") or "").isdigit()]
+        max_serial = max(serials) if serials else None
+        last_ts, last_serial = self.watermark(device)
+
+        with self.conn:
+            self.conn.executemany("DELETE FROM pending WHERE hash = ?", [(r[0],) for r in rows])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen (hash, device, timestamp) VALUES (?, ?, ?)", rows
+            )
+            if last_ts and last_ts > max_ts:
+                max_ts = last_ts
+            # Eski sürümde geleceğe itilmiş watermark da geri çekilir
+            max_ts = min(max_ts, limit)
+            if last_serial is not None and (max_serial is None or last_serial > max_serial):
+                max_serial = last_serial
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermark (device, last_timestamp, last_serial, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (device, max_ts, max_serial, datetime.now().strftime(_TS_FORMAT)),
+            )
+            # Saklama süresinin gerisindeki özetlere artık ihtiyaç yok
+            horizon = _ts_str(datetime.strptime(max_ts, _TS_FORMAT) - self.retention)
+            self.conn.execute("DELETE FROM seen WHERE device = ? AND timestamp < ?", (device, horizon))
@@ -0,0 +1,84 @@
+"""Artımlı yedek zincirinin geri yüklenmesi (sahte PostgREST sunucusuyla).
+
+Çalıştırma:
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import fake_postgrest  # noqa: E402
+
+
+class RestoreChainTest(unittest.TestCase):
+    def setUp(self):
+        self.server, self.store = fake_postgrest.serve()
+        os.environ.update({
+            "SUPABASE_URL": f"http://127.0.0.1:{self.server.server_port}",
+            "SUPABASE_SERVICE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.x",
+            "SUPABASE_HTTP2": "false",
+        })
+        import backup_database
+        from src import db
+        self.backup = backup_database
+        self.db = db
+        db.close_client()
+        self.root = tempfile.mkdtemp(prefix="pdks_test_")
+        self.old_root = backup_database.BACKUPS_ROOT
+        backup_database.BACKUPS_ROOT = self.root
+
+    def tearDown(self):
+        self.backup.BACKUPS_ROOT = self.old_root
+        self.db.close_client()
+        self.server.shutdown()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _maas(self, kullanici_id, aylik_maas, updated_at):
+        return {"id": kullanici_id, "kullanici_id": kullanici_id, "aylik_maas": aylik_maas,
+                "hedef_saat": 240, "aktif": True, "updated_at": updated_at}
+
+    def test_base_and_increment_with_updated_row(self):
+        table = self.store.table("maas_ayarlari")
+        for i in range(1, 4):
+            table.insert(self._maas(i, 1000 * i, f"2026-10-0{i}T10:00:00"))
+        base = self.backup.create_backup(use_gzip=False)
+
+        # Yedek klasör adı saniye çözünürlüklü
+        time.sleep(1.1)
+        table.rows[1].update(aylik_maas=2500, updated_at="2026-10-05T10:00:00")
+        increment = self.backup.create_backup(use_gzip=False, incremental=True)
+        self.assertEqual(self.backup.backup_chain(increment), [base, increment])
+
+        self.store.reset()
+        self.backup.restore_backup(increment)
+
+        restored = {r["id"]: r["aylik_maas"] for r in self.store.table("maas_ayarlari").rows}
+        self.assertEqual(restored, {1: 1000, 2: 2500, 3: 3000})
+        self.assertFalse(os.path.exists(os.path.join(increment, self.backup.CHECKPOINT_NAME)))
+
+    def test_restore_chunks_have_unique_keys(self):
+        table = self.store.table("maas_ayarlari")
+        for i in range(1, 4):
+            table.insert(self._maas(i, 1000 * i, f"2026-10-0{i}T10:00:00"))
+        self.backup.create_backup(use_gzip=False)
+        time.sleep(1.1)
+        table.rows[0].update(aylik_maas=1500, updated_at="2026-10-06T10:00:00")
+        increment = self.backup.create_backup(use_gzip=False, incremental=True)
+
+        chunks = list(self.backup.restore_chunks(increment, "maas_ayarlari", 500))
+        for _, chunk in chunks:
+            keys = [r["id"] for r in chunk]
+            self.assertEqual(len(keys), len(set(keys)))
+        # Yarıda kalan geri yükleme: okunan satır sayısı kadar atlanır
+        read = sum(n for n, _ in chunks)
+        self.assertEqual(list(self.backup.restore_chunks(increment, "maas_ayarlari", 500, skip=read)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
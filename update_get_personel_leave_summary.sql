@@ -1,5 +1,8 @@
 -- get_personel_leave_summary RPC: calisma_tipi alanını ekler.
--- add_calisma_tipi.sql çalıştırıldıktan sonra Supabase SQL Editor'da çalıştırın.
+-- total_working_days personel_yillik_calisma özetinden okunur; özeti olmayan
+-- personel için düzenli kayıtlar sayılır.
+-- add_calisma_tipi.sql ve add_personel_yillik_calisma.sql çalıştırıldıktan sonra
+-- Supabase SQL Editor'da çalıştırın.
 --
 -- Dönüş tipi değiştiği için önce mevcut fonksiyon silinir.
 
@@ -34,7 +37,19 @@ AS $$
     COALESCE(p.manuel_kullanilan_izin, 0) AS manuel_kullanilan_izin,
     COALESCE(p.devreden_yillik_izin, 0) AS devreden_yillik_izin,
     COALESCE(izin.used_leave, 0) AS used_leave,
-    COALESCE(att.total_working_days, 0) AS total_working_days
+    COALESCE(
+      (SELECT SUM(y.calisilan_gun)::bigint
+       FROM personel_yillik_calisma y
+       WHERE y.kullanici_id = p.kullanici_id),
+      -- COALESCE tembel değerlendirilir: tarama yalnızca özet yoksa yapılır
+      (SELECT COUNT(DISTINCT COALESCE(
+         g.workday_date::text,
+         split_part(g.giris_tarihi::text, 'T', 1)
+       ))
+       FROM personel_giris_cikis_duzenli g
+       WHERE g.kullanici_id = p.kullanici_id),
+      0
+    ) AS total_working_days
   FROM personel p
   LEFT JOIN LATERAL (
     SELECT SUM(
@@ -45,13 +60,5 @@ AS $$
       AND t.durum = 'onaylandi'
       AND t.izin_tipi = 'yillik_izin'
   ) izin ON true
-  LEFT JOIN LATERAL (
-    SELECT COUNT(DISTINCT COALESCE(
-      g.workday_date::text,
-      split_part(g.giris_tarihi::text, 'T', 1)
-    )) AS total_working_days
-    FROM personel_giris_cikis_duzenli g
-    WHERE g.kullanici_id = p.kullanici_id
-  ) att ON true
   ORDER BY p.isim, p.soyisim;
 $$;